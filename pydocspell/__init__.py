@@ -1,4 +1,22 @@
 from .apiwrapper import APIWrapper
+from .asyncapiwrapper import AsyncAPIWrapper
 from .metadata import UploadMetadata
+from .bulk import BulkUploader, UploadResult
+from .items import BulkItemUpdater, ItemResult
+from .search import ItemSearch
+from .download import DownloadResult, DownloadStatus
+from .sync import CollectiveMirror, SyncStore
+from .cache import ResponseCache
+from .resolver import MetadataResolver
+from .packing import ArchivePacker, PackResult
+from .journal import ImportJournal, ImportState, JournaledImport
+from .watch import WatchIngest
+from .fleet import FleetResult, UploadFleet
+from .multinode import MultiNodeAPIWrapper
+from .dedup import Deduplicator, HashIndex
+from .concurrency import AdaptiveLimiter
+from .throttle import QueueThrottle
+from .metrics import Metrics, PrometheusExporter
+from .auth import FileTokenStore, KeyringTokenStore, MemoryTokenStore
 
 VERSION = '0.0.0'
@@ -1,19 +1,75 @@
 import requests
 from requests.adapters import HTTPAdapter, Retry
-from requests_toolbelt.multipart import encoder
+import contextlib
+import copy
 import logging
+import os
+import socket
 import re
 import enum
 import datetime
+import functools
+import threading
+import time
+import weakref
 
 from .metadata import UploadMetadata
+from .concurrency import Slot
+from .throttle import QueueThrottle
+from .search import ItemSearch
+from .metrics import body_size
+from .auth import AuthToken, SessionRefresher
+from .download import DownloadResult, DownloadStatus, PartialFile
+from .cache import ResponseCache
+from .util.lazyfile import LazyFile, as_file
+from .util.multipart import ReplayableMultipartEncoder
+from .util.tracing import short_repr
+from .util.jsonstream import iter_records
 
 logger = logging.getLogger(__name__)
 
 
+class PoolAdapter(HTTPAdapter):
+    def __init__(self, *, socket_options=None, **kwargs):
+        # set before HTTPAdapter.__init__ builds the pool manager
+        self._socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self._socket_options is not None:
+            kwargs["socket_options"] = self._socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+
+def keepalive_socket_options(idle):
+    from urllib3.connection import HTTPConnection
+
+    options = [*HTTPConnection.default_socket_options]
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    for name, value in (
+        ("TCP_KEEPIDLE", idle),
+        ("TCP_KEEPINTVL", max(1, idle // 4)),
+        ("TCP_KEEPCNT", 4),
+    ):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
 class APIWrapper:
     DEFAULT_VERSION = 1
     DEFAULT_API_PATH = "/api/v{version}"
+    AUTH_HEADER = "X-Docspell-Auth"
+    # stored sessions about to expire are not worth reusing
+    MIN_SESSION_REUSE = 10
+    DEFAULT_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    # statuses that say an upload was not processed, and may be resent
+    UPLOAD_RETRY_STATUSES = frozenset((429, 503))
+    # Only these read-mostly endpoints are cached. The processing queue
+    # and file checks change underneath any cache, and are never cached.
+    CACHEABLE_ENDPOINTS = re.compile(
+        r"api/info/version|sec/(tag|folder|organization)|sec/item/[^/]+"
+    )
 
     class State(enum.Enum):
         INIT = object()
@@ -54,12 +110,43 @@ class APIWrapper:
         timeout=(3.05, 12),
         version=DEFAULT_VERSION,
         debug=True,
+        fd_budget=None,
+        limiter=None,
+        metrics=None,
+        token_store=None,
+        auto_refresh=True,
+        pool_connections=requests.adapters.DEFAULT_POOLSIZE,
+        pool_maxsize=requests.adapters.DEFAULT_POOLSIZE,
+        pool_block=requests.adapters.DEFAULT_POOLBLOCK,
+        keepalive=None,
+        incremental_json=True,
+        cache=None,
     ):
-        self._session = session or requests.Session()
+        # Every thread gets its own Session, created on first use, but all
+        # of them mount the same adapters and thus share one pool of
+        # connections, as well as one cookie jar. Sessions are only held
+        # weakly beyond their thread, so that they go with it.
+        self._local = threading.local()
+        self._sessions = weakref.WeakSet()
+        self._cookies = requests.cookies.RequestsCookieJar()
+        self._adapters = []
+        self._lock = threading.RLock()
         self._timeout = timeout
         self._baseurl = baseurl.strip("/")
         self._state = APIWrapper.State.INIT
         self._debug = debug
+        self._fd_budget = fd_budget
+        self._limiter = limiter
+        self._throttle = None
+        self._metrics = metrics
+        self._token_store = token_store
+        self._incremental_json = incremental_json
+        self._cache = cache
+        self._auth = None
+        self._credentials = None
+        self._refresher = None
+        if auto_refresh:
+            self._refresher = SessionRefresher(self.refresh_session)
         if "/api/" in baseurl:
             logger.warning(
                 f"/api/ in base URL, ignoring {version=}: {baseurl=}"
@@ -70,20 +157,86 @@ class APIWrapper:
             self._apiurl = baseurl
         else:
             self._version = version
-            self._apiurl = APIWrapper.make_api_url(baseurl)
+            self._apiurl = APIWrapper.make_api_url(
+                self._baseurl, version=version
+            )
 
-            f"{baseurl}{APIWrapper.DEFAULT_API_PATH}".format(version=version)
+        # Endpoint URLs are built once per wrapper. The cache is bounded
+        # because many endpoints embed item IDs.
+        self._endpoint_url = functools.lru_cache(maxsize=1024)(
+            self._make_endpoint_url
+        )
 
-        retries = retries or Retry(
-            total=5, backoff_factor=1, status_forcelist=[502, 503, 504]
+        retries = Retry.from_int(
+            retries
+            or Retry(
+                total=5, backoff_factor=1, status_forcelist=[502, 503, 504]
+            )
+        )
+        pool_kwargs = dict(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            socket_options=(
+                None
+                if keepalive is None
+                else keepalive_socket_options(keepalive)
+            ),
+        )
+        http_adapter = PoolAdapter(max_retries=retries, **pool_kwargs)
+        self._adapters.append((self._baseurl, http_adapter))
+
+        # Upload bodies can be replayed, so uploads may also be retried,
+        # which urllib3 does not do for POST by default. Only when the
+        # server cannot have taken the upload though: not on read errors,
+        # nor on gateway errors, which may come after the upstream took
+        # it, as the server only skips duplicates if asked to with
+        # meta[skipDuplicates].
+        retries = retries.new(
+            read=0,
+            status_forcelist=frozenset(retries.status_forcelist or ())
+            & APIWrapper.UPLOAD_RETRY_STATUSES,
         )
-        http_adapter = HTTPAdapter(max_retries=retries)
-        self._session.mount(self._baseurl, http_adapter)
+        if retries.allowed_methods:
+            retries = retries.new(
+                allowed_methods=frozenset(retries.allowed_methods) | {"POST"}
+            )
+        upload_adapter = PoolAdapter(max_retries=retries, **pool_kwargs)
+        for prefix in ("sec/upload/", "open/upload/"):
+            self._adapters.append((f"{self._apiurl}/{prefix}", upload_adapter))
+
+        if session is not None:
+            self._cookies = session.cookies
+            self._adopt_session(session)
 
     version = property(lambda s: s._version)
     baseurl = property(lambda s: s._baseurl)
     apiurl = property(lambda s: s._apiurl)
     state = property(lambda s: s._state)
+    limiter = property(lambda s: s._limiter)
+    throttle = property(lambda s: s._throttle)
+    metrics = property(lambda s: s._metrics)
+    token_store = property(lambda s: s._token_store)
+    auth = property(lambda s: s._auth)
+    cache = property(lambda s: s._cache)
+    _session = property(lambda s: s._get_session())
+
+    def _adopt_session(self, session):
+        for prefix, adapter in self._adapters:
+            session.mount(prefix, adapter)
+        session.cookies = self._cookies
+        self._local.session = session
+        with self._lock:
+            self._sessions.add(session)
+        return session
+
+    def _get_session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            if self._state == APIWrapper.State.SHUTDOWN:
+                raise RuntimeError(f"{self} has been shut down")
+            session = self._adopt_session(requests.Session())
+        return session
 
     def __enter__(self):
         return self
@@ -104,10 +257,19 @@ class APIWrapper:
             except ImportError:
                 pass
 
-        self.logout()
-        self._session.close()
-        self._session = None
-        self._state = APIWrapper.State.SHUTDOWN
+        if self._throttle:
+            self._throttle.stop()
+        if self._token_store:
+            # keep the session alive for the next process to pick up
+            self._cancel_refresh()
+        else:
+            self.logout()
+        with self._lock:
+            for session in list(self._sessions):
+                session.close()
+            self._sessions.clear()
+            self._local = threading.local()
+            self._state = APIWrapper.State.SHUTDOWN
 
     def __str__(self):
         return f"<APIWrapper url={self.apiurl} {self.state}>"
@@ -119,7 +281,9 @@ class APIWrapper:
     def make_api_url(cls, baseurl, *, version=None):
         version = version or cls.DEFAULT_VERSION
         ret = f"{baseurl}{APIWrapper.DEFAULT_API_PATH}".format(version=version)
-        logger.debug(f"make_api_url({baseurl}, version={version}) → {ret}")
+        logger.debug(
+            "make_api_url(%s, version=%s) → %s", baseurl, version, ret
+        )
         return ret
 
     @classmethod
@@ -129,12 +293,19 @@ class APIWrapper:
         apiurl = apiurl or cls.make_api_url(baseurl, version=version)
         ret = "/".join((apiurl, endpoint))
         logger.debug(
-            f"make_endpoint_url({baseurl}, {endpoint}, "
-            f"apiurl={apiurl}, version={version}) → {ret}"
+            "make_endpoint_url(%s, %s, apiurl=%s, version=%s) → %s",
+            baseurl,
+            endpoint,
+            apiurl,
+            version,
+            ret,
         )
         return ret
 
-    def _request(
+    def _make_endpoint_url(self, endpoint, apiurl=None):
+        return "/".join((apiurl or self._apiurl, endpoint))
+
+    def _response(
         self,
         method,
         endpoint,
@@ -146,67 +317,291 @@ class APIWrapper:
         files=None,
         **kwargs,
     ):
-        url = APIWrapper.make_endpoint_url(
-            self._baseurl, endpoint, apiurl=apiurl
-        )
-        logger.debug(f"> {method} {url}")
-        if files:
-            logger.debug(f"> {files=}")
-        if data:
-            logger.debug(f"> {data=}")
-        if json:
-            logger.debug(f"> {json=}")
-        resp = self._session.request(
+        url = self._endpoint_url(endpoint, apiurl)
+        if logger.isEnabledFor(logging.DEBUG):
+            trace = {"method": method, "url": url}
+            logger.debug("> %s %s", method, url, extra=trace)
+            for name, payload in (("files", files), ("data", data)):
+                if payload:
+                    logger.debug(
+                        "> %s=%s", name, short_repr(payload), extra=trace
+                    )
+            if json:
+                logger.debug("> json=%s", short_repr(json), extra=trace)
+        sent_auth = self._auth
+        resp = self._send(
             method,
             url,
+            endpoint,
             params=params,
             json=json,
             files=files,
             data=data,
-            timeout=self._timeout,
             **kwargs,
         )
+        if self._session_expired(resp, endpoint):
+            resp.close()
+            self._reauthenticate(sent_auth)
+            if callable(getattr(data, "seek", None)):
+                data.seek(0)
+            resp = self._send(
+                method,
+                url,
+                endpoint,
+                params=params,
+                json=json,
+                files=files,
+                data=data,
+                **kwargs,
+            )
 
-        if resp.status_code == requests.codes.forbidden:
+        if resp.status_code in (
+            requests.codes.unauthorized,
+            requests.codes.forbidden,
+        ):
+            resp.close()
             activity = f"{method} {url}"
-            if self.state != APIWrapper.State.LOGGEDIN:
+            if (
+                self.state != APIWrapper.State.LOGGEDIN
+                or resp.status_code == requests.codes.unauthorized
+            ):
                 raise APIWrapper.NotAuthenticated(activity)
             raise APIWrapper.NotAuthorized(activity)
 
+        return resp
+
+    def _request(self, method, endpoint, **kwargs):
+        if (
+            self._cache is not None
+            and method == "GET"
+            and APIWrapper.CACHEABLE_ENDPOINTS.fullmatch(endpoint)
+        ):
+            return self._cached_request(endpoint, **kwargs)
+        resp = self._response(method, endpoint, **kwargs)
+        return self._json(method, resp)
+
+    def _json(self, method, resp):
         try:
             json = resp.json()
-            logger.debug(f"< {resp.status_code} {json=}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "< %s json=%s",
+                    resp.status_code,
+                    short_repr(json),
+                    extra={
+                        "method": method,
+                        "url": resp.url,
+                        "status": resp.status_code,
+                    },
+                )
             return json
         except requests.exceptions.JSONDecodeError:
             raise APIWrapper.EmptyResponse(resp.status_code)
 
+    def _cached_request(self, endpoint, *, headers=None, **kwargs):
+        url = self._endpoint_url(endpoint, kwargs.get("apiurl"))
+        key = ResponseCache.key(url, kwargs.get("params"))
+        entry = self._cache.get(key)
+        if entry is not None and entry.fresh:
+            return self._cache.value(entry)
+
+        headers = dict(headers or {})
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        resp = self._response("GET", endpoint, headers=headers, **kwargs)
+        if resp.status_code == requests.codes.not_modified and entry:
+            self._cache.refresh(entry)
+            return self._cache.value(entry)
+
+        json = self._json("GET", resp)
+        if resp.ok:
+            self._cache.put(
+                key,
+                copy.deepcopy(json),
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+            )
+        return json
+
+    def invalidate_cache(self, endpoint=None, *, apiurl=None):
+        # drops the cached responses for endpoint and below, or all of them
+        if self._cache is None:
+            return
+        if endpoint is None:
+            self._cache.invalidate()
+        else:
+            self._cache.invalidate(self._endpoint_url(endpoint, apiurl))
+
+    def _request_records(self, method, endpoint, *prefixes, **kwargs):
+        # Like _request, but parses the response as it arrives, and yields
+        # (prefix, record) tuples for the parts of it that prefixes select,
+        # so that large responses are never held in memory as a whole.
+        resp = self._response(method, endpoint, stream=True, **kwargs)
+        with contextlib.closing(resp):
+            resp.raw.decode_content = True
+            try:
+                yield from iter_records(
+                    resp.raw, *prefixes, incremental=self._incremental_json
+                )
+            except ValueError:
+                raise APIWrapper.EmptyResponse(resp.status_code)
+
+    def _send(self, method, url, endpoint, **kwargs):
+        if self._limiter:
+            limited = self._limiter.slot()
+        else:
+            limited = contextlib.nullcontext(Slot())
+        auth = self._auth
+        if auth is not None:
+            headers = kwargs.get("headers") or {}
+            kwargs["headers"] = {APIWrapper.AUTH_HEADER: auth.token, **headers}
+        start = time.monotonic()
+        with limited as slot:
+            try:
+                resp = self._session.request(
+                    method, url, timeout=self._timeout, **kwargs
+                )
+            except requests.exceptions.RequestException as e:
+                self._observe(method, endpoint, start, error=e)
+                raise
+            slot.status = resp.status_code
+            retries = getattr(resp.raw, "retries", None)
+            slot.retried = bool(getattr(retries, "history", None))
+        self._observe(
+            method, endpoint, start, resp=resp, streamed=kwargs.get("stream")
+        )
+        return resp
+
+    def _observe(
+        self, method, endpoint, start, *, resp=None, error=None, streamed=False
+    ):
+        if not self._metrics:
+            return
+        if resp is None:
+            self._metrics.observe_request(
+                method,
+                endpoint,
+                latency=time.monotonic() - start,
+                error=error,
+            )
+            return
+
+        retries = getattr(resp.raw, "retries", None)
+        if streamed:
+            # reading the body here would defeat streaming it
+            received = int(resp.headers.get("Content-Length", 0))
+        else:
+            received = len(resp.content)
+        self._metrics.observe_request(
+            method,
+            endpoint,
+            latency=time.monotonic() - start,
+            status=resp.status_code,
+            bytes_sent=body_size(resp.request.body),
+            bytes_received=received,
+            retries=len(getattr(retries, "history", None) or ()),
+        )
+
     def get_docspell_version(self):
         resp = self._request("GET", "api/info/version", apiurl=self.baseurl)
         return resp
 
+    def _set_auth(self, auth):
+        with self._lock:
+            self._auth = auth
+            if auth is None:
+                return
+            if self._token_store:
+                self._token_store.save(auth)
+            if self._refresher and auth.remaining > 0:
+                self._refresher.schedule(auth)
+
+    def _cancel_refresh(self):
+        if self._refresher:
+            self._refresher.cancel()
+
     def login(self, collective, username, password, rememberme=True):
-        data = {
-            "account": "/".join((collective, username)),
-            "password": password,
-            "rememberMe": rememberme,
-        }
-        resp = self._request("POST", "open/auth/login", json=data)
-        self._state = APIWrapper.State.LOGGEDIN
-        self._state.set_info(f"user={collective}/{username}")
-        logger.info(f"Logged in as {collective}/{username}")
+        account = "/".join((collective, username))
+        self.invalidate_cache()
+        self._credentials = (collective, username, password, rememberme)
+        stored = self._token_store and self._token_store.load(account)
+        if stored and stored.remaining > APIWrapper.MIN_SESSION_REUSE:
+            self._set_auth(stored)
+            resp = stored.as_auth_result()
+            logger.info(f"Reusing stored session for {account}")
+        else:
+            data = {
+                "account": account,
+                "password": password,
+                "rememberMe": rememberme,
+            }
+            resp = self._request("POST", "open/auth/login", json=data)
+            if "token" in resp:
+                self._set_auth(AuthToken.from_auth_result(account, resp))
+            logger.info(f"Logged in as {account}")
+        with self._lock:
+            self._state = APIWrapper.State.LOGGEDIN
+            self._state.set_info(f"user={account}")
         return resp
 
+    def refresh_session(self):
+        resp = self._request("POST", "sec/auth/session")
+        self._set_auth(AuthToken.from_auth_result(self._auth.account, resp))
+        logger.debug("Session refreshed")
+        return resp
+
+    def _session_expired(self, resp, endpoint):
+        if self._credentials is None or not endpoint.startswith("sec/"):
+            return False
+        if endpoint.startswith("sec/auth/"):
+            return False
+        if resp.status_code == requests.codes.unauthorized:
+            return True
+        return (
+            resp.status_code == requests.codes.forbidden
+            and self._auth is not None
+            and self._auth.expired
+        )
+
+    def _reauthenticate(self, sent_auth):
+        with self._lock:
+            if self._auth is not sent_auth:
+                # another thread got a new session in the meantime
+                return
+            logger.info("Session expired, logging in again")
+            if self._token_store and sent_auth:
+                self._token_store.clear(sent_auth.account)
+            self._set_auth(None)
+            self.login(*self._credentials)
+
     def logout(self):
-        if self.state == APIWrapper.State.LOGGEDIN:
+        self._cancel_refresh()
+        with self._lock:
+            if self.state != APIWrapper.State.LOGGEDIN:
+                return {}
             try:
                 self._request("POST", "sec/auth/logout")
             except APIWrapper.EmptyResponse as e:
                 if e.status_code != 200:
                     raise
+            if self._token_store and self._auth:
+                self._token_store.clear(self._auth.account)
+            self._set_auth(None)
+            self.invalidate_cache()
             self._state = APIWrapper.State.LOGGEDOUT
             logger.info("Logged out")
         return {}
 
+    def throttle_uploads(self, *, background=True, **kwargs):
+        if self._throttle:
+            self._throttle.stop()
+        self._throttle = QueueThrottle(self, **kwargs)
+        if background:
+            self._throttle.start()
+        return self._throttle
+
     def _upload_multiple(
         self,
         endpoint,
@@ -215,33 +610,49 @@ class APIWrapper:
         transfer_cb=None,
         metadata=None,
     ):
+        if self._throttle:
+            self._throttle.wait()
+
         formdata = []
         if metadata:
             formdata.append(("meta", metadata.to_json()))
 
+        # Paths and openers are only opened when the encoder gets to them,
+        # and closed right after, so their descriptors stay within budget.
+        lazyfiles = []
         for fileobj, name in file_and_name_tuples:
-            formdata.append(("file", (name, fileobj)))
+            fileobj = as_file(fileobj, name, budget=self._fd_budget)
+            if isinstance(fileobj, LazyFile):
+                lazyfiles.append(fileobj)
+            formdata.append(("file", (name or fileobj.name, fileobj)))
 
-        enc = encoder.MultipartEncoder(formdata)
-        if callable(transfer_cb):
-            enc = encoder.MultipartEncoderMonitor(enc, transfer_cb)
-
-        resp = self._request(
-            "POST",
-            endpoint,
-            data=enc,
-            headers={"Content-Type": enc.content_type},
-        )
+        try:
+            if not callable(transfer_cb):
+                transfer_cb = None
+            enc = ReplayableMultipartEncoder(formdata, callback=transfer_cb)
+
+            resp = self._request(
+                "POST",
+                endpoint,
+                data=enc,
+                headers={"Content-Type": enc.content_type},
+            )
+            if self._metrics:
+                self._metrics.observe_encoding(
+                    "POST", endpoint, enc.encode_seconds
+                )
+        finally:
+            for fileobj in lazyfiles:
+                fileobj.close()
         return resp
 
     def _upload_single(
         self, endpoint, fileobj, name=None, *, transfer_cb=None, metadata=None
     ):
-        if not callable(getattr(fileobj, "read", None)):
-            raise ValueError(f"{fileobj=} is not an open file/stream")
-
+        fileobj = as_file(fileobj, name, budget=self._fd_budget)
         name = name or fileobj.name
-        if metadata and metadata.multiple:
+        # archives with flattenArchives are meant to become many items
+        if metadata and metadata.multiple and not metadata.flattenArchives:
             logger.warning(f"meta[multiple] but single file {name}")
         return self._upload_multiple(
             endpoint,
@@ -300,26 +711,220 @@ class APIWrapper:
             )
         return resp
 
-    def set_item_date(self, itemid, date):
+    @staticmethod
+    def _date_timestamp(date):
         date = datetime.datetime(date.year, date.month, date.day, 12, 0, 0)
-        timestamp = int(date.strftime("%s000"))
+        return int(date.strftime("%s000"))
+
+    def set_item_date(self, itemid, date):
         resp = self._request(
-            "PUT", f"sec/item/{itemid}/date", json={"date": timestamp}
+            "PUT",
+            f"sec/item/{itemid}/date",
+            json={"date": APIWrapper._date_timestamp(date)},
         )
+        self.invalidate_cache(f"sec/item/{itemid}")
+        return resp
+
+    def set_items_date(self, itemids, date):
+        resp = self._request(
+            "PUT",
+            "sec/items/date",
+            json={
+                "items": list(itemids),
+                "date": APIWrapper._date_timestamp(date),
+            },
+        )
+        self.invalidate_cache("sec/item")
         return resp
 
     def confirm_item(self, itemid, *, confirm=True):
         action = "confirm" if confirm else "unconfirm"
         resp = self._request("POST", f"sec/item/{itemid}/{action}")
+        self.invalidate_cache(f"sec/item/{itemid}")
         return resp
 
     def unconfirm_item(self, itemid):
         return self.confirm_item(itemid, confirm=False)
 
+    def confirm_items(self, itemids, *, confirm=True):
+        action = "confirm" if confirm else "unconfirm"
+        resp = self._request(
+            "POST", f"sec/items/{action}", json={"ids": list(itemids)}
+        )
+        self.invalidate_cache("sec/item")
+        return resp
+
+    def unconfirm_items(self, itemids):
+        return self.confirm_items(itemids, confirm=False)
+
+    def set_item_folder(self, itemid, folder):
+        resp = self._request(
+            "PUT", f"sec/item/{itemid}/folder", json={"id": folder}
+        )
+        self.invalidate_cache(f"sec/item/{itemid}")
+        return resp
+
+    def set_items_folder(self, itemids, folder):
+        resp = self._request(
+            "PUT",
+            "sec/items/folder",
+            json={"items": list(itemids), "ref": folder},
+        )
+        self.invalidate_cache("sec/item")
+        return resp
+
+    def _download(self, endpoint, path, *, chunk_size=None):
+        # Resumes into an existing .part file from the same representation
+        # with a range request, or revalidates a complete file by its ETag.
+        target = PartialFile(path)
+        etag, part_etag = target.etag, target.part_etag
+        offset = target.part_size
+        headers = {}
+        if offset and part_etag:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = part_etag
+        elif etag:
+            headers["If-None-Match"] = etag
+
+        resp = self._response("GET", endpoint, stream=True, headers=headers)
+        with contextlib.closing(resp):
+            if resp.status_code == requests.codes.not_modified:
+                logger.debug(f"{path} is unchanged")
+                return DownloadResult(
+                    path=target.path,
+                    status=DownloadStatus.UNCHANGED,
+                    size=os.path.getsize(target.path),
+                    etag=etag,
+                )
+
+            resumed = resp.status_code == requests.codes.partial_content
+            content_range = resp.headers.get("Content-Range", "")
+            if "Range" in headers and (
+                resp.status_code == requests.codes.range_not_satisfiable
+                or (
+                    resumed
+                    and not content_range.startswith(f"bytes {offset}-")
+                )
+            ):
+                logger.info(f"Cannot resume {target.part}, starting over")
+                target.discard()
+                resp.close()
+                return self._download(endpoint, path, chunk_size=chunk_size)
+            resp.raise_for_status()
+
+            etag = resp.headers.get("ETag") or (part_etag if resumed else None)
+            chunk_size = chunk_size or APIWrapper.DEFAULT_DOWNLOAD_CHUNK_SIZE
+            with target.open(resume=resumed, etag=etag) as f:
+                for chunk in resp.iter_content(chunk_size):
+                    f.write(chunk)
+            target.commit()
+
+        status = (
+            DownloadStatus.RESUMED if resumed else DownloadStatus.DOWNLOADED
+        )
+        logger.debug(f"{path} {status.value}")
+        return DownloadResult(
+            path=target.path,
+            status=status,
+            size=os.path.getsize(target.path),
+            etag=etag,
+        )
+
+    def download_attachment(self, attachid, path, *, chunk_size=None):
+        return self._download(
+            f"sec/attachment/{attachid}", path, chunk_size=chunk_size
+        )
+
+    def download_original(self, attachid, path, *, chunk_size=None):
+        return self._download(
+            f"sec/attachment/{attachid}/original", path, chunk_size=chunk_size
+        )
+
+    @staticmethod
+    def _item_query(query, offset, limit, with_details, search_mode):
+        itemquery = {
+            "query": query,
+            "offset": offset,
+            "withDetails": with_details,
+        }
+        if limit is not None:
+            itemquery["limit"] = limit
+        if search_mode is not None:
+            itemquery["searchMode"] = search_mode
+        return itemquery
+
+    def search_items(
+        self,
+        query,
+        *,
+        offset=0,
+        limit=None,
+        with_details=False,
+        search_mode=None,
+    ):
+        itemquery = APIWrapper._item_query(
+            query, offset, limit, with_details, search_mode
+        )
+        resp = self._request("POST", "sec/item/search", json=itemquery)
+        return resp
+
+    def iter_search_items(
+        self,
+        query,
+        *,
+        offset=0,
+        limit=None,
+        with_details=False,
+        search_mode=None,
+    ):
+        itemquery = APIWrapper._item_query(
+            query, offset, limit, with_details, search_mode
+        )
+        for _, item in self._request_records(
+            "POST", "sec/item/search", "groups.item.items.item", json=itemquery
+        ):
+            yield item
+
+    def iter_items(self, query, **kwargs):
+        return ItemSearch(self, query, **kwargs)
+
     def get_job_queue(self):
         resp = self._request("GET", "sec/queue/state")
         return resp
 
+    def iter_job_queue(self, *sections):
+        # yields (section, job) tuples, where section is one of progress,
+        # queued and completed
+        sections = sections or ("progress", "queued", "completed")
+        for prefix, job in self._request_records(
+            "GET", "sec/queue/state", *(f"{s}.item" for s in sections)
+        ):
+            yield prefix.partition(".")[0], job
+
+    def _get_list(self, endpoint, query=None):
+        params = {"q": query} if query else None
+        resp = self._request("GET", endpoint, params=params)
+        return resp
+
+    def get_tags(self, query=None):
+        return self._get_list("sec/tag", query)
+
+    def get_folders(self, query=None):
+        return self._get_list("sec/folder", query)
+
+    def get_organizations(self, query=None):
+        return self._get_list("sec/organization", query)
+
+    def get_item(self, itemid):
+        resp = self._request("GET", f"sec/item/{itemid}")
+        return resp
+
+    def iter_item_attachments(self, itemid):
+        for _, attachment in self._request_records(
+            "GET", f"sec/item/{itemid}", "attachments.item"
+        ):
+            yield attachment
+
     def addon_update(self, addon_id, *, sync=False):
         resp = self._request(
             "PUT", f"sec/addon/archive/{addon_id}", params={"sync": sync}
@@ -0,0 +1,373 @@
+from requests_toolbelt.multipart import encoder
+import asyncio
+import logging
+import re
+import functools
+import os
+
+from .apiwrapper import APIWrapper
+from .util.lazyfile import DEFAULT_BUDGET, as_file
+from .util.tracing import short_repr
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAPIWrapper:
+    DEFAULT_VERSION = APIWrapper.DEFAULT_VERSION
+    DEFAULT_API_PATH = APIWrapper.DEFAULT_API_PATH
+    DEFAULT_CHUNK_SIZE = 64 * 1024
+
+    State = APIWrapper.State
+    NotAuthenticated = APIWrapper.NotAuthenticated
+    NotAuthorized = APIWrapper.NotAuthorized
+    EmptyResponse = APIWrapper.EmptyResponse
+
+    make_api_url = APIWrapper.make_api_url
+    make_endpoint_url = APIWrapper.make_endpoint_url
+
+    def __init__(
+        self,
+        baseurl,
+        *,
+        client=None,
+        retries=5,
+        timeout=(3.05, 12),
+        limits=None,
+        version=DEFAULT_VERSION,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        fd_budget=None,
+    ):
+        if httpx is None:
+            raise ImportError("AsyncAPIWrapper requires httpx")
+
+        if client is None:
+            connect, read = timeout
+            transport = httpx.AsyncHTTPTransport(
+                retries=retries, limits=limits or httpx.Limits()
+            )
+            client = httpx.AsyncClient(
+                transport=transport,
+                timeout=httpx.Timeout(read, connect=connect),
+            )
+        self._client = client
+        self._chunk_size = chunk_size
+        self._fd_budget = fd_budget or DEFAULT_BUDGET
+        # made on first use, within the event loop
+        self._fd_slots = None
+        self._baseurl = baseurl.strip("/")
+        self._state = AsyncAPIWrapper.State.INIT
+        if "/api/" in baseurl:
+            logger.warning(
+                f"/api/ in base URL, ignoring {version=}: {baseurl=}"
+            )
+            self._version = int(re.search(r"/v(\d)", baseurl).group(1))
+            parts = baseurl.split("/api")
+            self._baseurl = parts[0]
+            self._apiurl = baseurl
+        else:
+            self._version = version
+            self._apiurl = AsyncAPIWrapper.make_api_url(
+                self._baseurl, version=version
+            )
+
+        self._endpoint_url = functools.lru_cache(maxsize=1024)(
+            self._make_endpoint_url
+        )
+
+    version = property(lambda s: s._version)
+    baseurl = property(lambda s: s._baseurl)
+    apiurl = property(lambda s: s._apiurl)
+    state = property(lambda s: s._state)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._client is None:
+            return
+        try:
+            await self.logout()
+        finally:
+            await self._client.aclose()
+            self._client = None
+            self._state = AsyncAPIWrapper.State.SHUTDOWN
+
+    def __str__(self):
+        return f"<AsyncAPIWrapper url={self.apiurl} {self.state}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def _make_endpoint_url(self, endpoint, apiurl=None):
+        return "/".join((apiurl or self._apiurl, endpoint))
+
+    def _slots(self):
+        if self._fd_slots is None:
+            self._fd_slots = asyncio.Semaphore(self._fd_budget.size)
+        return self._fd_slots
+
+    async def _request(
+        self,
+        method,
+        endpoint,
+        *,
+        apiurl=None,
+        params=None,
+        json=None,
+        content=None,
+        **kwargs,
+    ):
+        url = self._endpoint_url(endpoint, apiurl)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            trace = {"method": method, "url": url}
+            logger.debug("> %s %s", method, url, extra=trace)
+            if json:
+                logger.debug("> json=%s", short_repr(json), extra=trace)
+        resp = await self._client.request(
+            method,
+            url,
+            params=params,
+            json=json,
+            content=content,
+            **kwargs,
+        )
+
+        if resp.status_code == httpx.codes.FORBIDDEN:
+            activity = f"{method} {url}"
+            if self.state != AsyncAPIWrapper.State.LOGGEDIN:
+                raise AsyncAPIWrapper.NotAuthenticated(activity)
+            raise AsyncAPIWrapper.NotAuthorized(activity)
+
+        try:
+            json = resp.json()
+            if debug:
+                logger.debug(
+                    "< %s json=%s",
+                    resp.status_code,
+                    short_repr(json),
+                    extra=dict(trace, status=resp.status_code),
+                )
+            return json
+        except ValueError:
+            raise AsyncAPIWrapper.EmptyResponse(resp.status_code)
+
+    async def get_docspell_version(self):
+        resp = await self._request(
+            "GET", "api/info/version", apiurl=self.baseurl
+        )
+        return resp
+
+    async def login(self, collective, username, password, rememberme=True):
+        data = {
+            "account": "/".join((collective, username)),
+            "password": password,
+            "rememberMe": rememberme,
+        }
+        resp = await self._request("POST", "open/auth/login", json=data)
+        self._state = AsyncAPIWrapper.State.LOGGEDIN
+        self._state.set_info(f"user={collective}/{username}")
+        logger.info(f"Logged in as {collective}/{username}")
+        return resp
+
+    async def logout(self):
+        if self.state == AsyncAPIWrapper.State.LOGGEDIN:
+            try:
+                await self._request("POST", "sec/auth/logout")
+            except AsyncAPIWrapper.EmptyResponse as e:
+                if e.status_code != 200:
+                    raise
+            self._state = AsyncAPIWrapper.State.LOGGEDOUT
+            logger.info("Logged out")
+        return {}
+
+    async def _stream_body(self, enc):
+        # The multipart body is built by the same encoder the synchronous
+        # wrapper uses, so transfer callbacks see identical monitors. It
+        # reads from disk, so it does so off the event loop.
+        while chunk := await asyncio.to_thread(enc.read, self._chunk_size):
+            yield chunk
+
+    async def _upload_multiple(
+        self,
+        endpoint,
+        file_and_name_tuples,
+        *,
+        transfer_cb=None,
+        metadata=None,
+    ):
+        formdata = []
+        if metadata:
+            formdata.append(("meta", metadata.to_json()))
+
+        # Paths and openers become LazyFiles, which take a slot of the
+        # budget to open; openers are even opened right away, to measure
+        # them. The encoder then reads the files one after the other, and
+        # each closes at its end, so an upload never has more than one of
+        # them open. Uploads thus wait for a slot here, without blocking
+        # the event loop, and LazyFiles are only made and read in threads,
+        # where waiting for the budget cannot block it either.
+        file_and_name_tuples = list(file_and_name_tuples)
+        lazy = any(
+            not callable(getattr(fileobj, "read", None))
+            for fileobj, _ in file_and_name_tuples
+        )
+        if lazy:
+            await self._slots().acquire()
+        lazyfiles = []
+        try:
+            for fileobj, name in file_and_name_tuples:
+                if not callable(getattr(fileobj, "read", None)):
+                    fileobj = await asyncio.to_thread(
+                        as_file, fileobj, name, budget=self._fd_budget
+                    )
+                    lazyfiles.append(fileobj)
+                formdata.append(("file", (name or fileobj.name, fileobj)))
+
+            enc = encoder.MultipartEncoder(formdata)
+            if callable(transfer_cb):
+                enc = encoder.MultipartEncoderMonitor(enc, transfer_cb)
+
+            resp = await self._request(
+                "POST",
+                endpoint,
+                content=self._stream_body(enc),
+                headers={
+                    "Content-Type": enc.content_type,
+                    "Content-Length": str(enc.len),
+                },
+            )
+        finally:
+            for fileobj in lazyfiles:
+                fileobj.close()
+            if lazy:
+                self._slots().release()
+        return resp
+
+    async def _upload_single(
+        self, endpoint, fileobj, name=None, *, transfer_cb=None, metadata=None
+    ):
+        # not opened here, but in _upload_multiple, once there is a slot
+        if not name and isinstance(fileobj, os.PathLike):
+            name = os.path.basename(fileobj)
+        name = name or getattr(fileobj, "name", None)
+        # archives with flattenArchives are meant to become many items
+        if metadata and metadata.multiple and not metadata.flattenArchives:
+            logger.warning(f"meta[multiple] but single file {name}")
+        return await self._upload_multiple(
+            endpoint,
+            ((fileobj, name),),
+            transfer_cb=transfer_cb,
+            metadata=metadata,
+        )
+
+    async def upload_multiple(
+        self, file_and_name_tuples, *, transfer_cb=None, metadata=None
+    ):
+        return await self._upload_multiple(
+            "sec/upload/item",
+            file_and_name_tuples,
+            transfer_cb=transfer_cb,
+            metadata=metadata,
+        )
+
+    async def upload(
+        self, fileobj, name=None, *, transfer_cb=None, metadata=None
+    ):
+        return await self._upload_single(
+            "sec/upload/item",
+            fileobj,
+            name,
+            transfer_cb=transfer_cb,
+            metadata=metadata,
+        )
+
+    async def upload_multiple_via_source(
+        self, source, file_and_name_tuples, *, transfer_cb=None, metadata=None
+    ):
+        return await self._upload_multiple(
+            f"open/upload/item/{source}",
+            file_and_name_tuples,
+            transfer_cb=transfer_cb,
+            metadata=metadata,
+        )
+
+    async def upload_via_source(
+        self, source, fileobj, name=None, *, transfer_cb=None, metadata=None
+    ):
+        return await self._upload_single(
+            f"open/upload/item/{source}",
+            fileobj,
+            name,
+            transfer_cb=transfer_cb,
+            metadata=metadata,
+        )
+
+    async def check_file_exists(self, sha256sum):
+        resp = await self._request("GET", f"sec/checkfile/{sha256sum}")
+        if resp.get("exists") is False:
+            logger.warning(
+                f"Docspell says no file with SHA256 {sha256sum}, "
+                "but the the file could exist, see "
+                "https://github.com/eikek/docspell/issues/2328"
+            )
+        return resp
+
+    async def set_item_date(self, itemid, date):
+        resp = await self._request(
+            "PUT",
+            f"sec/item/{itemid}/date",
+            json={"date": APIWrapper._date_timestamp(date)},
+        )
+        return resp
+
+    async def set_items_date(self, itemids, date):
+        resp = await self._request(
+            "PUT",
+            "sec/items/date",
+            json={
+                "items": list(itemids),
+                "date": APIWrapper._date_timestamp(date),
+            },
+        )
+        return resp
+
+    async def confirm_item(self, itemid, *, confirm=True):
+        action = "confirm" if confirm else "unconfirm"
+        resp = await self._request("POST", f"sec/item/{itemid}/{action}")
+        return resp
+
+    async def unconfirm_item(self, itemid):
+        return await self.confirm_item(itemid, confirm=False)
+
+    async def confirm_items(self, itemids, *, confirm=True):
+        action = "confirm" if confirm else "unconfirm"
+        resp = await self._request(
+            "POST", f"sec/items/{action}", json={"ids": list(itemids)}
+        )
+        return resp
+
+    async def unconfirm_items(self, itemids):
+        return await self.confirm_items(itemids, confirm=False)
+
+    async def get_job_queue(self):
+        resp = await self._request("GET", "sec/queue/state")
+        return resp
+
+    async def addon_update(self, addon_id, *, sync=False):
+        resp = await self._request(
+            "PUT",
+            f"sec/addon/archive/{addon_id}",
+            params={"sync": "true" if sync else "false"},
+        )
+        if "message" in resp:
+            logger.info(resp["message"])
+        return resp
@@ -0,0 +1,199 @@
+from attrs import define, asdict
+import abc
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import keyring
+except ImportError:
+    keyring = None
+
+logger = logging.getLogger(__name__)
+
+
+@define(kw_only=True)
+class AuthToken:
+    account: str
+    token: str
+    valid_until: float
+
+    remaining = property(lambda s: s.valid_until - time.time())
+    expired = property(lambda s: s.remaining <= 0)
+
+    @classmethod
+    def from_auth_result(cls, account, resp):
+        return cls(
+            account=account,
+            token=resp["token"],
+            valid_until=time.time() + resp.get("validMs", 0) / 1000,
+        )
+
+    def as_auth_result(self):
+        # what the server's login response would have been
+        collective, _, user = self.account.partition("/")
+        return {
+            "collective": collective,
+            "user": user,
+            "success": True,
+            "message": "Reusing stored session",
+            "token": self.token,
+            "validMs": int(self.remaining * 1000),
+        }
+
+    def __str__(self):
+        return f"<AuthToken {self.account} valid for {self.remaining:.0f}s>"
+
+    def __repr__(self):
+        return str(self)
+
+
+class TokenStore(abc.ABC):
+    @abc.abstractmethod
+    def load(self, account):
+        pass
+
+    @abc.abstractmethod
+    def save(self, token):
+        pass
+
+    @abc.abstractmethod
+    def clear(self, account):
+        pass
+
+
+class MemoryTokenStore(TokenStore):
+    def __init__(self):
+        self._tokens = {}
+
+    def load(self, account):
+        return self._tokens.get(account)
+
+    def save(self, token):
+        self._tokens[token.account] = token
+
+    def clear(self, account):
+        self._tokens.pop(account, None)
+
+
+class FileTokenStore(TokenStore):
+    def __init__(self, path):
+        self._path = os.fspath(path)
+        self._lock = threading.Lock()
+
+    path = property(lambda s: s._path)
+
+    def __str__(self):
+        return f"<FileTokenStore path={self._path}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def _read(self):
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logger.warning(f"Ignoring corrupt token store {self._path}")
+            return {}
+
+    def _write(self, tokens):
+        # Write to a private temporary file and rename it into place, so
+        # concurrent processes never see a partial store.
+        dirname = os.path.dirname(os.path.abspath(self._path))
+        fd, tmp = tempfile.mkstemp(dir=dirname, prefix=".pydocspell-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(tokens, f)
+            os.replace(tmp, self._path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def load(self, account):
+        with self._lock:
+            data = self._read().get(account)
+        return AuthToken(**data) if data else None
+
+    def save(self, token):
+        with self._lock:
+            tokens = self._read()
+            tokens[token.account] = asdict(token)
+            self._write(tokens)
+
+    def clear(self, account):
+        with self._lock:
+            tokens = self._read()
+            if tokens.pop(account, None) is not None:
+                self._write(tokens)
+
+
+class KeyringTokenStore(TokenStore):
+    DEFAULT_SERVICE = "pydocspell"
+
+    def __init__(self, service=DEFAULT_SERVICE):
+        if keyring is None:
+            raise ImportError("KeyringTokenStore requires keyring")
+        self._service = service
+
+    def __str__(self):
+        return f"<KeyringTokenStore service={self._service}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def load(self, account):
+        data = keyring.get_password(self._service, account)
+        return AuthToken(**json.loads(data)) if data else None
+
+    def save(self, token):
+        keyring.set_password(
+            self._service, token.account, json.dumps(asdict(token))
+        )
+
+    def clear(self, account):
+        try:
+            keyring.delete_password(self._service, account)
+        except keyring.errors.PasswordDeleteError:
+            pass
+
+
+class SessionRefresher:
+    # Renews the session once refresh_fraction of its validity has passed,
+    # from a daemon timer thread.
+
+    DEFAULT_REFRESH_FRACTION = 0.8
+
+    def __init__(self, refresh, *, refresh_fraction=DEFAULT_REFRESH_FRACTION):
+        self._refresh = refresh
+        self._refresh_fraction = refresh_fraction
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def schedule(self, token):
+        delay = max(0.0, token.remaining * self._refresh_fraction)
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._run)
+            self._timer.name = "pydocspell-session-refresh"
+            self._timer.daemon = True
+            self._timer.start()
+        logger.debug("Session refresh in %.0fs", delay)
+
+    def cancel(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _run(self):
+        try:
+            self._refresh()
+        except Exception as e:
+            logger.warning(f"Could not refresh session: {e!r}")
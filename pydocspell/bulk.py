@@ -0,0 +1,235 @@
+from attrs import define, evolve
+from concurrent import futures
+import collections
+import logging
+import os
+
+from .metadata import UploadMetadata
+from .util.batching import batched_by_size, file_size
+
+logger = logging.getLogger(__name__)
+
+
+@define(kw_only=True)
+class UploadResult:
+    index: int
+    name: (str, type(None)) = None
+    sha256: (str, type(None)) = None
+    skipped: bool = False
+    response: (dict, type(None)) = None
+    exception: (BaseException, type(None)) = None
+
+    ok = property(lambda s: s.exception is None)
+
+
+class BulkUploader:
+    DEFAULT_WORKERS = 4
+
+    def __init__(
+        self,
+        api,
+        *,
+        workers=DEFAULT_WORKERS,
+        max_in_flight=None,
+        source=None,
+        metadata=None,
+        transfer_cb=None,
+        ordered=False,
+        dedup=None,
+        max_batch_bytes=None,
+        max_batch_files=None,
+        resolver=None,
+    ):
+        if workers < 1:
+            raise ValueError(f"{workers=} must be at least 1")
+        self._api = api
+        self._workers = workers
+        self._max_in_flight = max_in_flight or 2 * workers
+        if self._max_in_flight < workers:
+            raise ValueError(f"{max_in_flight=} must not be below {workers=}")
+        self._source = source
+        self._metadata = metadata
+        self._transfer_cb = transfer_cb
+        self._ordered = ordered
+        self._dedup = dedup
+        self._max_batch_bytes = max_batch_bytes
+        self._max_batch_files = max_batch_files
+        if self.batching:
+            # Without meta[multiple], Docspell would turn each batch into
+            # a single item with many attachments.
+            self._metadata = evolve(
+                metadata or UploadMetadata(), multiple=True
+            )
+        if resolver is not None:
+            # fail on unknown folders or tags before uploading anything
+            self._metadata = resolver.normalize(self._metadata)
+
+    workers = property(lambda s: s._workers)
+    max_in_flight = property(lambda s: s._max_in_flight)
+    ordered = property(lambda s: s._ordered)
+    max_batch_bytes = property(lambda s: s._max_batch_bytes)
+    max_batch_files = property(lambda s: s._max_batch_files)
+    batching = property(
+        lambda s: bool(s._max_batch_bytes or s._max_batch_files)
+    )
+
+    def __str__(self):
+        return (
+            f"<BulkUploader api={self._api} workers={self._workers} "
+            f"max_in_flight={self._max_in_flight}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    @staticmethod
+    def _file_and_name(item):
+        fileobj, name = item if isinstance(item, tuple) else (item, None)
+        if name:
+            return fileobj, name
+        if isinstance(fileobj, os.PathLike):
+            return fileobj, os.path.basename(fileobj)
+        return fileobj, getattr(fileobj, "name", None)
+
+    def _send(self, file_and_name_tuples):
+        kwargs = dict(transfer_cb=self._transfer_cb, metadata=self._metadata)
+        if self.batching:
+            if self._source:
+                return self._api.upload_multiple_via_source(
+                    self._source, file_and_name_tuples, **kwargs
+                )
+            return self._api.upload_multiple(file_and_name_tuples, **kwargs)
+
+        ((fileobj, name),) = file_and_name_tuples
+        if self._source:
+            return self._api.upload_via_source(
+                self._source, fileobj, name, **kwargs
+            )
+        return self._api.upload(fileobj, name, **kwargs)
+
+    def _upload_unit(self, unit):
+        # A unit is a list of (index, (fileobj, name)) tuples that are sent
+        # in one request; without batching, it holds exactly one file.
+        results, to_send = [], []
+        for index, (fileobj, name) in unit:
+            result = UploadResult(index=index, name=name)
+            results.append(result)
+            if self._dedup:
+                try:
+                    result.sha256, result.skipped = self._dedup.check(fileobj)
+                except Exception as e:
+                    logger.warning(f"Hashing #{index} {name} failed: {e!r}")
+                    result.exception = e
+                    continue
+                if result.skipped:
+                    logger.debug(f"Skipping #{index} {name}, already exists")
+                    continue
+            to_send.append((result, (fileobj, name)))
+
+        if not to_send:
+            return results
+
+        try:
+            resp = self._send([fnt for _, fnt in to_send])
+            for result, _ in to_send:
+                logger.debug(f"Uploaded #{result.index} {result.name}")
+                result.response = resp
+                if self._dedup:
+                    self._dedup.record_uploaded(result.sha256)
+
+        except Exception as e:
+            names = ", ".join(str(result.name) for result, _ in to_send)
+            logger.warning(f"Upload of {names} failed: {e!r}")
+            for result, _ in to_send:
+                result.exception = e
+
+        return results
+
+    @staticmethod
+    def _sized(items):
+        # A file that cannot be sized becomes an UploadResult right away,
+        # as it would fail its whole batch otherwise.
+        for index, (fileobj, name) in items:
+            try:
+                size = file_size((fileobj, name))
+            except OSError as e:
+                logger.warning(f"Cannot upload #{index} {name}: {e!r}")
+                yield UploadResult(index=index, name=name, exception=e), None
+                continue
+            yield (index, (fileobj, name)), size
+
+    def _units(self, files):
+        # Yields lists of (index, (fileobj, name)) tuples to send, and
+        # UploadResults of files that failed before that.
+        items = (
+            (index, BulkUploader._file_and_name(item))
+            for index, item in enumerate(files)
+        )
+        if not self.batching:
+            return ([item] for item in items)
+
+        def units():
+            batches = batched_by_size(
+                BulkUploader._sized(items),
+                max_bytes=self._max_batch_bytes,
+                max_files=self._max_batch_files,
+                size=lambda item: item[1] or 0,
+            )
+            for batch in batches:
+                # failed files split their batch, to keep the indices of
+                # ordered results ascending
+                unit = []
+                for item, _ in batch:
+                    if not isinstance(item, UploadResult):
+                        unit.append(item)
+                        continue
+                    if unit:
+                        yield unit
+                        unit = []
+                    yield item
+                if unit:
+                    yield unit
+
+        return units()
+
+    def _drain(self, pending, *, block):
+        if self._ordered:
+            while pending and (block or pending[0].done()):
+                yield from pending.popleft().result()
+                block = False
+        elif pending:
+            done, _ = futures.wait(
+                pending,
+                timeout=None if block else 0,
+                return_when=futures.FIRST_COMPLETED,
+            )
+            for fut in done:
+                pending.remove(fut)
+                yield from fut.result()
+
+    def upload(self, files):
+        # files is consumed lazily, so that no more than max_in_flight
+        # requests are ever queued or running, no matter its length.
+        executor = futures.ThreadPoolExecutor(
+            max_workers=self._workers, thread_name_prefix="pydocspell-bulk"
+        )
+        pending = collections.deque() if self._ordered else set()
+        add = pending.append if self._ordered else pending.add
+        try:
+            for unit in self._units(files):
+                if len(pending) >= self._max_in_flight:
+                    yield from self._drain(pending, block=True)
+                if isinstance(unit, UploadResult):
+                    # queued like the others, to keep ordered results so
+                    fut = futures.Future()
+                    fut.set_result([unit])
+                    add(fut)
+                else:
+                    add(executor.submit(self._upload_unit, unit))
+                yield from self._drain(pending, block=False)
+
+            while pending:
+                yield from self._drain(pending, block=True)
+
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
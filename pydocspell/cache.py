@@ -0,0 +1,103 @@
+from attrs import define
+import collections
+import copy
+import threading
+import time
+
+
+@define(kw_only=True)
+class CacheEntry:
+    value: object
+    etag: (str, type(None)) = None
+    last_modified: (str, type(None)) = None
+    expires: float = 0.0
+
+    fresh = property(lambda s: time.monotonic() < s.expires)
+    validatable = property(lambda s: bool(s.etag or s.last_modified))
+
+
+class ResponseCache:
+    # Least recently used entries go first once maxsize is reached. An
+    # entry is served as is for ttl seconds; after that, it is revalidated
+    # with the server if it came with an ETag or Last-Modified header, and
+    # fetched again otherwise.
+
+    DEFAULT_MAXSIZE = 256
+    DEFAULT_TTL = 60
+
+    def __init__(self, *, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        if maxsize < 1:
+            raise ValueError(f"{maxsize=} must be at least 1")
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = 0
+
+    maxsize = property(lambda s: s._maxsize)
+    ttl = property(lambda s: s._ttl)
+    hits = property(lambda s: s._hits)
+    misses = property(lambda s: s._misses)
+
+    def __str__(self):
+        return (
+            f"<ResponseCache entries={len(self._entries)} "
+            f"maxsize={self._maxsize} ttl={self._ttl}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(url, params=None):
+        return url, tuple(sorted((params or {}).items()))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += entry.fresh
+            self._misses += not entry.fresh
+            return entry
+
+    def value(self, entry):
+        # callers get their own copy, lest they modify the cached one
+        return copy.deepcopy(entry.value)
+
+    def put(self, key, value, *, etag=None, last_modified=None):
+        entry = CacheEntry(
+            value=value,
+            etag=etag,
+            last_modified=last_modified,
+            expires=time.monotonic() + self._ttl,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def refresh(self, entry):
+        entry.expires = time.monotonic() + self._ttl
+
+    def invalidate(self, prefix=None):
+        # drops the entries for the URL prefix and everything below it, or
+        # all of them
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+                return
+            below = prefix.rstrip("/") + "/"
+            for key in [
+                key
+                for key in self._entries
+                if key[0] == prefix or key[0].startswith(below)
+            ]:
+                del self._entries[key]
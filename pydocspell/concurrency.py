@@ -0,0 +1,120 @@
+from attrs import define
+import contextlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@define(kw_only=True)
+class Slot:
+    status: (int, type(None)) = None
+    retried: bool = False
+    latency: (float, type(None)) = None
+    error: (BaseException, type(None)) = None
+
+    congested = property(
+        lambda s: s.error is not None
+        or s.retried
+        or (s.status is not None and (s.status == 429 or s.status >= 500))
+    )
+
+
+class AdaptiveLimiter:
+    # Additive increase, multiplicative decrease, as TCP does it: every
+    # good response grows the limit by increase/limit, i.e. by about
+    # increase per round of requests, while a 5xx, 429, retry, connection
+    # error or (if given) a response slower than latency_target shrinks
+    # it by decrease. Shrinking happens at most once per cooldown, lest a
+    # burst of failures from one overloaded moment collapse the limit.
+
+    def __init__(
+        self,
+        *,
+        initial=4,
+        minimum=1,
+        maximum=64,
+        increase=1.0,
+        decrease=0.5,
+        latency_target=None,
+        cooldown=1.0,
+    ):
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError(f"Need 1 ≤ {minimum=} ≤ {initial=} ≤ {maximum=}")
+        if not 0 < decrease < 1:
+            raise ValueError(f"{decrease=} must be between 0 and 1")
+        self._limit = float(initial)
+        self._minimum = minimum
+        self._maximum = maximum
+        self._increase = increase
+        self._decrease = decrease
+        self._latency_target = latency_target
+        self._cooldown = cooldown
+        self._last_decrease = float("-inf")
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    limit = property(lambda s: max(s._minimum, int(s._limit)))
+    in_flight = property(lambda s: s._in_flight)
+    minimum = property(lambda s: s._minimum)
+    maximum = property(lambda s: s._maximum)
+
+    def __str__(self):
+        return (
+            f"<AdaptiveLimiter limit={self.limit} "
+            f"in_flight={self._in_flight}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    def acquire(self, *, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: self._in_flight < self.limit, timeout=timeout
+            ):
+                raise TimeoutError(f"No slot became free in {self}")
+            self._in_flight += 1
+
+    def release(self, slot=None):
+        with self._cond:
+            self._in_flight -= 1
+            if slot is not None:
+                self._record(slot)
+            self._cond.notify_all()
+
+    def _record(self, slot):
+        congested = slot.congested or (
+            self._latency_target is not None
+            and slot.latency is not None
+            and slot.latency > self._latency_target
+        )
+        if not congested:
+            self._limit = min(
+                self._maximum, self._limit + self._increase / self._limit
+            )
+            return
+
+        now = time.monotonic()
+        if now - self._last_decrease < self._cooldown:
+            return
+        self._last_decrease = now
+        limit = max(self._minimum, self._limit * self._decrease)
+        if int(limit) != int(self._limit):
+            logger.info(f"Concurrency limit down to {int(limit)} after {slot}")
+        self._limit = limit
+
+    @contextlib.contextmanager
+    def slot(self, *, timeout=None):
+        self.acquire(timeout=timeout)
+        slot = Slot()
+        start = time.monotonic()
+        try:
+            yield slot
+        except Exception as e:
+            slot.error = e
+            raise
+        finally:
+            slot.latency = time.monotonic() - start
+            self.release(slot)
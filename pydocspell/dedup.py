@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .util.hashing import HashingService
+from .util.lazyfile import LazyFile, as_file
+
+logger = logging.getLogger(__name__)
+
+
+class HashIndex:
+    DEFAULT_NEGATIVE_TTL = 3600
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS hashes (
+            sha256 TEXT PRIMARY KEY,
+            present INTEGER NOT NULL,
+            checked REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path=":memory:", *, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self._path = str(path)
+        self._negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        with self._db:
+            self._db.execute(HashIndex.SCHEMA)
+
+    path = property(lambda s: s._path)
+    negative_ttl = property(lambda s: s._negative_ttl)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __str__(self):
+        return f"<HashIndex path={self._path}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM hashes WHERE present"
+            ).fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def lookup(self, sha256):
+        # True and False are answers, None means the index does not know
+        # (any more, in the case of expired negative results).
+        with self._lock:
+            row = self._db.execute(
+                "SELECT present, checked FROM hashes WHERE sha256 = ?",
+                (sha256,),
+            ).fetchone()
+        if row is None:
+            return None
+        present, checked = row
+        if present:
+            return True
+        if time.time() - checked < self._negative_ttl:
+            return False
+        return None
+
+    def add(self, sha256, *, present=True):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?)",
+                (sha256, bool(present), time.time()),
+            )
+
+    def discard(self, sha256):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM hashes WHERE sha256 = ?", (sha256,))
+
+
+class Deduplicator:
+    DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        api,
+        index=None,
+        *,
+        hasher=None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ):
+        self._api = api
+        self._index = index if index is not None else HashIndex()
+        self._hasher = hasher or HashingService(processes=1)
+        self._chunk_size = chunk_size
+
+    index = property(lambda s: s._index)
+    hasher = property(lambda s: s._hasher)
+
+    def __str__(self):
+        return f"<Deduplicator api={self._api} index={self._index}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def hash_file(self, fileobj):
+        # Hash in chunks and rewind, so the caller can still upload it.
+        pos = fileobj.tell()
+        digest = hashlib.sha256()
+        while chunk := fileobj.read(self._chunk_size):
+            digest.update(chunk)
+        fileobj.seek(pos)
+        return digest.hexdigest()
+
+    def exists(self, sha256):
+        known = self._index.lookup(sha256)
+        if known is not None:
+            return known
+
+        resp = self._api.check_file_exists(sha256)
+        present = bool(resp.get("exists"))
+        self._index.add(sha256, present=present)
+        return present
+
+    def check(self, fileobj):
+        if isinstance(fileobj, os.PathLike):
+            sha256 = self._hasher.hash_path(fileobj)
+        else:
+            # openers are opened for hashing, and again for the upload
+            fileobj = as_file(fileobj)
+            try:
+                sha256 = self.hash_file(fileobj)
+            finally:
+                if isinstance(fileobj, LazyFile):
+                    fileobj.close()
+        return sha256, self.exists(sha256)
+
+    def record_uploaded(self, sha256):
+        self._index.add(sha256, present=True)
+
+    def check_paths(self, paths):
+        for path, sha256 in self._hasher.hash_paths(paths):
+            yield path, sha256, self.exists(sha256)
+
+    def filter_paths(self, paths):
+        for path, sha256, present in self.check_paths(paths):
+            if present:
+                logger.info(f"Skipping {path}, {sha256=} already exists")
+                continue
+            yield path
+
+    def filter(self, file_and_name_tuples):
+        for fileobj, name in file_and_name_tuples:
+            sha256, present = self.check(fileobj)
+            if present:
+                logger.info(f"Skipping {name}, {sha256=} already exists")
+                continue
+            yield fileobj, name
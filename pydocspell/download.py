@@ -0,0 +1,110 @@
+from attrs import define
+import enum
+import logging
+import os
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadStatus(enum.Enum):
+    DOWNLOADED = "downloaded"
+    RESUMED = "resumed"
+    UNCHANGED = "unchanged"
+
+
+@define(kw_only=True)
+class DownloadResult:
+    path: str
+    status: DownloadStatus
+    size: int
+    etag: (str, type(None)) = None
+
+    changed = property(lambda s: s.status != DownloadStatus.UNCHANGED)
+
+
+def _read_text(path):
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _write_text(path, text):
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix=".pydocspell-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class PartialFile:
+    # A download goes to <path>.part first, and is renamed to path once
+    # complete. The ETag of each lives next to it in a .etag file, so that
+    # an interrupted download can resume only from the same representation,
+    # and a complete one can be revalidated.
+
+    PART_SUFFIX = ".part"
+    ETAG_SUFFIX = ".etag"
+
+    def __init__(self, path):
+        self._path = os.fspath(path)
+        self._part = self._path + PartialFile.PART_SUFFIX
+
+    path = property(lambda s: s._path)
+    part = property(lambda s: s._part)
+
+    def __str__(self):
+        return f"<PartialFile path={self._path}>"
+
+    def __repr__(self):
+        return str(self)
+
+    @property
+    def etag(self):
+        if not os.path.exists(self._path):
+            return None
+        return _read_text(self._path + PartialFile.ETAG_SUFFIX)
+
+    @property
+    def part_etag(self):
+        return _read_text(self._part + PartialFile.ETAG_SUFFIX)
+
+    @property
+    def part_size(self):
+        try:
+            return os.path.getsize(self._part)
+        except FileNotFoundError:
+            return 0
+
+    def open(self, *, resume, etag=None):
+        if resume:
+            return open(self._part, "ab")
+        _remove(self._part + PartialFile.ETAG_SUFFIX)
+        if etag:
+            _write_text(self._part + PartialFile.ETAG_SUFFIX, etag)
+        return open(self._part, "wb")
+
+    def commit(self):
+        os.replace(self._part, self._path)
+        part_etag = self._part + PartialFile.ETAG_SUFFIX
+        if os.path.exists(part_etag):
+            os.replace(part_etag, self._path + PartialFile.ETAG_SUFFIX)
+        else:
+            _remove(self._path + PartialFile.ETAG_SUFFIX)
+
+    def discard(self):
+        _remove(self._part)
+        _remove(self._part + PartialFile.ETAG_SUFFIX)
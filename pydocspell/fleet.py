@@ -0,0 +1,203 @@
+from attrs import define
+from concurrent import futures
+import logging
+import multiprocessing
+import os
+import pathlib
+import queue
+
+from .apiwrapper import APIWrapper
+from .bulk import BulkUploader
+
+logger = logging.getLogger(__name__)
+
+# the uploader and progress queue of a worker process, see _init_worker
+_worker = None
+
+
+@define(kw_only=True)
+class FleetResult:
+    index: int
+    path: str
+    pid: int
+    response: (dict, type(None)) = None
+    # exceptions do not all survive pickling, so only their repr does
+    error: (str, type(None)) = None
+
+    ok = property(lambda s: s.error is None)
+
+
+@define(kw_only=True)
+class FleetProgress:
+    pid: int
+    index: int
+    ok: bool
+    # totals across the fleet, this file included
+    done: int = 0
+    failed: int = 0
+
+
+def _init_worker(baseurl, api_kwargs, uploader_kwargs, progress):
+    global _worker
+    api = APIWrapper(baseurl, **api_kwargs)
+    _worker = BulkUploader(api, **uploader_kwargs), progress
+
+
+def _upload_shard(shard):
+    # shard is a list of (index, path) tuples
+    uploader, progress = _worker
+    pid = os.getpid()
+    paths = [pathlib.Path(path) for _, path in shard]
+    results = []
+    for result in uploader.upload(paths):
+        index, path = shard[result.index]
+        error = None if result.ok else repr(result.exception)
+        results.append(
+            FleetResult(
+                index=index,
+                path=path,
+                pid=pid,
+                response=result.response,
+                error=error,
+            )
+        )
+        if progress is not None:
+            progress.put((pid, index, error is None))
+    return results
+
+
+class UploadFleet:
+    # Uploads through a source, which needs no login, from several
+    # processes at once, so that hashing, encoding and TLS are not all
+    # bound to one core. Every process has its own APIWrapper and thus its
+    # own connection pool; paths are handed out in shards of shard_size as
+    # processes become free, so that a slow shard does not hold up the
+    # others.
+
+    DEFAULT_SHARD_SIZE = 32
+    PROGRESS_INTERVAL = 0.2
+
+    def __init__(
+        self,
+        baseurl,
+        source,
+        *,
+        processes=None,
+        workers=BulkUploader.DEFAULT_WORKERS,
+        shard_size=DEFAULT_SHARD_SIZE,
+        max_in_flight=None,
+        metadata=None,
+        max_batch_bytes=None,
+        max_batch_files=None,
+        progress_cb=None,
+        mp_context=None,
+        **kwargs,
+    ):
+        # The remaining kwargs are for the APIWrapper of every process, and
+        # like metadata, need to be picklable.
+        self._processes = processes or os.cpu_count() or 1
+        if shard_size < 1:
+            raise ValueError(f"{shard_size=} must be at least 1")
+        self._shard_size = shard_size
+        self._max_in_flight = max_in_flight or 2 * self._processes
+        self._progress_cb = progress_cb
+        # forking would copy the threads and sockets of this process
+        self._context = mp_context or multiprocessing.get_context("spawn")
+        kwargs.setdefault("debug", False)
+        self._initargs = (
+            baseurl,
+            kwargs,
+            dict(
+                workers=workers,
+                source=source,
+                metadata=metadata,
+                max_batch_bytes=max_batch_bytes,
+                max_batch_files=max_batch_files,
+            ),
+        )
+        self._done = self._failed = 0
+
+    processes = property(lambda s: s._processes)
+    shard_size = property(lambda s: s._shard_size)
+    done = property(lambda s: s._done)
+    failed = property(lambda s: s._failed)
+
+    def __str__(self):
+        return (
+            f"<UploadFleet processes={self._processes} "
+            f"shard_size={self._shard_size}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    def _shards(self, paths):
+        shard = []
+        for index, path in enumerate(paths):
+            shard.append((index, os.fspath(path)))
+            if len(shard) >= self._shard_size:
+                yield shard
+                shard = []
+        if shard:
+            yield shard
+
+    def _report(self, progress):
+        while True:
+            try:
+                pid, index, ok = progress.get_nowait()
+            except queue.Empty:
+                return
+            self._done += ok
+            self._failed += not ok
+            if self._progress_cb:
+                self._progress_cb(
+                    FleetProgress(
+                        pid=pid,
+                        index=index,
+                        ok=ok,
+                        done=self._done,
+                        failed=self._failed,
+                    )
+                )
+
+    def _drain(self, pending, progress, *, block):
+        while True:
+            done, _ = futures.wait(
+                pending,
+                timeout=UploadFleet.PROGRESS_INTERVAL if block else 0,
+                return_when=futures.FIRST_COMPLETED,
+            )
+            self._report(progress)
+            for fut in done:
+                pending.remove(fut)
+                yield from fut.result()
+            if done or not block or not pending:
+                return
+
+    def upload(self, paths):
+        # Yields a FleetResult per path, as their shards complete. paths is
+        # consumed lazily, so that no more than max_in_flight shards are
+        # ever queued or running.
+        self._done = self._failed = 0
+        progress = self._context.Queue()
+        executor = futures.ProcessPoolExecutor(
+            max_workers=self._processes,
+            mp_context=self._context,
+            initializer=_init_worker,
+            initargs=(*self._initargs, progress),
+        )
+        pending = set()
+        try:
+            for shard in self._shards(paths):
+                if len(pending) >= self._max_in_flight:
+                    yield from self._drain(pending, progress, block=True)
+                pending.add(executor.submit(_upload_shard, shard))
+                yield from self._drain(pending, progress, block=False)
+
+            while pending:
+                yield from self._drain(pending, progress, block=True)
+
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self._report(progress)
+            progress.close()
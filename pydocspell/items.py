@@ -0,0 +1,176 @@
+from attrs import define
+from concurrent import futures
+import collections
+import itertools
+import logging
+
+from .apiwrapper import APIWrapper
+
+logger = logging.getLogger(__name__)
+
+
+@define(kw_only=True)
+class ItemResult:
+    itemid: str
+    response: (dict, type(None)) = None
+    exception: (BaseException, type(None)) = None
+
+    ok = property(lambda s: s.exception is None)
+
+
+class BulkItemUpdater:
+    DEFAULT_CHUNK_SIZE = 500
+    DEFAULT_WORKERS = 8
+    # what a Docspell without the multi-item endpoints answers
+    UNSUPPORTED = (404, 405)
+
+    class Failed(Exception):
+        pass
+
+    def __init__(
+        self,
+        api,
+        *,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        workers=DEFAULT_WORKERS,
+        max_in_flight=None,
+        multi=True,
+    ):
+        if chunk_size < 1:
+            raise ValueError(f"{chunk_size=} must be at least 1")
+        if workers < 1:
+            raise ValueError(f"{workers=} must be at least 1")
+        self._api = api
+        self._chunk_size = chunk_size
+        self._workers = workers
+        self._max_in_flight = max_in_flight or 2 * workers
+        if self._max_in_flight < workers:
+            raise ValueError(f"{max_in_flight=} must not be below {workers=}")
+        self._multi = multi
+
+    chunk_size = property(lambda s: s._chunk_size)
+    workers = property(lambda s: s._workers)
+    max_in_flight = property(lambda s: s._max_in_flight)
+    multi = property(lambda s: s._multi)
+
+    def __str__(self):
+        return (
+            f"<BulkItemUpdater api={self._api} workers={self._workers} "
+            f"chunk_size={self._chunk_size} multi={self._multi}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    @staticmethod
+    def _check(resp):
+        if isinstance(resp, dict) and resp.get("success") is False:
+            raise BulkItemUpdater.Failed(resp.get("message"))
+        return resp
+
+    def _single(self, itemid, single):
+        result = ItemResult(itemid=itemid)
+        try:
+            result.response = BulkItemUpdater._check(single(itemid))
+        except Exception as e:
+            logger.warning(f"Updating item {itemid} failed: {e!r}")
+            result.exception = e
+        return result
+
+    def _apply(self, unit, multi, single):
+        # Returns the results, and the item IDs that need to be resubmitted
+        # one by one, because the chunk could not be done in one go.
+        if len(unit) == 1 or not self._multi:
+            return [self._single(itemid, single) for itemid in unit], []
+
+        try:
+            resp = BulkItemUpdater._check(multi(unit))
+        except Exception as e:
+            if (
+                isinstance(e, APIWrapper.EmptyResponse)
+                and e.status_code in BulkItemUpdater.UNSUPPORTED
+            ):
+                if self._multi:
+                    logger.info("No multi-item endpoints, going one by one")
+                    self._multi = False
+            else:
+                # find out which of the items it was
+                logger.warning(
+                    f"Updating {len(unit)} items failed: {e!r}, "
+                    "retrying them one by one"
+                )
+            return [], unit
+
+        return [ItemResult(itemid=i, response=resp) for i in unit], []
+
+    def _units(self, itemids):
+        itemids = iter(itemids)
+        while True:
+            size = self._chunk_size if self._multi else 1
+            unit = list(itertools.islice(itemids, size))
+            if not unit:
+                return
+            yield unit
+
+    def _drain(self, pending, backlog, *, block):
+        if not pending:
+            return
+        done, _ = futures.wait(
+            pending,
+            timeout=None if block else 0,
+            return_when=futures.FIRST_COMPLETED,
+        )
+        for fut in done:
+            pending.remove(fut)
+            results, retry = fut.result()
+            backlog.extend(retry)
+            yield from results
+
+    def _run(self, itemids, multi, single):
+        # Results come in order of completion, one per item ID; itemids is
+        # consumed lazily, so no more than max_in_flight requests are ever
+        # queued or running.
+        executor = futures.ThreadPoolExecutor(
+            max_workers=self._workers, thread_name_prefix="pydocspell-items"
+        )
+        pending, backlog = set(), collections.deque()
+        units = self._units(itemids)
+        try:
+            while True:
+                unit = [backlog.popleft()] if backlog else next(units, None)
+                if unit is None:
+                    if not pending:
+                        break
+                    yield from self._drain(pending, backlog, block=True)
+                    continue
+                if len(pending) >= self._max_in_flight:
+                    yield from self._drain(pending, backlog, block=True)
+                pending.add(executor.submit(self._apply, unit, multi, single))
+                yield from self._drain(pending, backlog, block=False)
+
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def confirm(self, itemids):
+        return self._run(
+            itemids, self._api.confirm_items, self._api.confirm_item
+        )
+
+    def unconfirm(self, itemids):
+        return self._run(
+            itemids, self._api.unconfirm_items, self._api.unconfirm_item
+        )
+
+    def set_date(self, itemids, date):
+        return self._run(
+            itemids,
+            lambda ids: self._api.set_items_date(ids, date),
+            lambda itemid: self._api.set_item_date(itemid, date),
+        )
+
+    def set_folder(self, itemids, folder):
+        return self._run(
+            itemids,
+            lambda ids: self._api.set_items_folder(ids, folder),
+            lambda itemid: self._api.set_item_folder(itemid, folder),
+        )
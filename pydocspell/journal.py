@@ -0,0 +1,329 @@
+from attrs import define
+import enum
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+
+from .bulk import BulkUploader
+from .util.hashing import sha256_path
+
+logger = logging.getLogger(__name__)
+
+
+class ImportState(enum.Enum):
+    IN_FLIGHT = "in_flight"
+    HASHED = "hashed"
+    UPLOADED = "uploaded"
+    EXISTS = "exists"
+    FAILED = "failed"
+
+
+# nothing left to do for files in these states, unless they changed
+DONE = frozenset((ImportState.UPLOADED, ImportState.EXISTS))
+# files in these states may have been uploaded by a run that died
+UNFINISHED = frozenset((ImportState.IN_FLIGHT, ImportState.HASHED))
+
+
+@define(kw_only=True)
+class JournalEntry:
+    path: str
+    state: ImportState
+    size: int
+    mtime_ns: int
+    sha256: (str, type(None)) = None
+    response: (dict, type(None)) = None
+    itemid: (str, type(None)) = None
+    error: (str, type(None)) = None
+
+    done = property(lambda s: s.state in DONE)
+
+    def matches(self, stat):
+        return (self.size, self.mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+
+
+class ImportJournal:
+    DEFAULT_COMMIT_EVERY = 500
+    DEFAULT_COMMIT_INTERVAL = 2.0
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sha256 TEXT,
+            response TEXT,
+            itemid TEXT,
+            error TEXT,
+            updated REAL NOT NULL
+        )
+    """
+
+    def __init__(
+        self,
+        path,
+        *,
+        commit_every=DEFAULT_COMMIT_EVERY,
+        commit_interval=DEFAULT_COMMIT_INTERVAL,
+    ):
+        # Writes are committed in batches of commit_every, or after
+        # commit_interval seconds, whichever comes first. What a crash
+        # loses is at worst some uploads, which the next run retries.
+        self._path = str(path)
+        self._commit_every = commit_every
+        self._commit_interval = commit_interval
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(ImportJournal.SCHEMA)
+        self._uncommitted = 0
+        self._committed = time.monotonic()
+
+    path = property(lambda s: s._path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __str__(self):
+        return f"<ImportJournal path={self._path}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM files"
+            ).fetchone()
+        return count
+
+    def _commit(self):
+        self._db.commit()
+        self._uncommitted = 0
+        self._committed = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self._db.close()
+
+    def get(self, path):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path, state, size, mtime_ns, sha256, response, "
+                "itemid, error FROM files WHERE path = ?",
+                (os.fspath(path),),
+            ).fetchone()
+        if row is None:
+            return None
+        path, state, size, mtime_ns, sha256, response, itemid, error = row
+        return JournalEntry(
+            path=path,
+            state=ImportState(state),
+            size=size,
+            mtime_ns=mtime_ns,
+            sha256=sha256,
+            response=json.loads(response) if response else None,
+            itemid=itemid,
+            error=error,
+        )
+
+    def record(self, entry):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry.path,
+                    entry.state.value,
+                    entry.size,
+                    entry.mtime_ns,
+                    entry.sha256,
+                    json.dumps(entry.response) if entry.response else None,
+                    entry.itemid,
+                    entry.error,
+                    time.time(),
+                ),
+            )
+            self._uncommitted += 1
+            if (
+                self._uncommitted >= self._commit_every
+                or time.monotonic() - self._committed >= self._commit_interval
+            ):
+                self._commit()
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT state, COUNT(*) FROM files GROUP BY state"
+            ).fetchall()
+        return {ImportState(state): count for state, count in rows}
+
+
+class _JournalingDeduplicator:
+    # Stands in for the Deduplicator of the BulkUploader, to reuse hashes
+    # from the journal and to record new ones.
+
+    def __init__(self, dedup, journal, entries):
+        self._dedup = dedup
+        self._journal = journal
+        self._entries = entries
+
+    def check(self, path):
+        entry = self._entries[os.fspath(path)]
+        if entry.sha256 is None:
+            entry.sha256, present = self._dedup.check(path)
+            entry.state = ImportState.HASHED
+            self._journal.record(entry)
+        else:
+            present = self._dedup.exists(entry.sha256)
+        return entry.sha256, present
+
+    def record_uploaded(self, sha256):
+        self._dedup.record_uploaded(sha256)
+
+
+@define(kw_only=True)
+class ImportResult:
+    entry: JournalEntry
+    exception: (BaseException, type(None)) = None
+    # whether the journal said it was done already
+    journaled: bool = False
+
+    path = property(lambda s: s.entry.path)
+    state = property(lambda s: s.entry.state)
+    ok = property(lambda s: s.exception is None)
+
+
+class JournaledImport:
+    def __init__(self, api, journal, *, dedup=None, **kwargs):
+        # the remaining kwargs are for the BulkUploader doing the uploads
+        self._api = api
+        self._journal = journal
+        self._dedup = dedup
+        self._entries = {}
+        if dedup is not None:
+            kwargs["dedup"] = _JournalingDeduplicator(
+                dedup, journal, self._entries
+            )
+        self._uploader = BulkUploader(api, **kwargs)
+
+    journal = property(lambda s: s._journal)
+    uploader = property(lambda s: s._uploader)
+
+    def __str__(self):
+        return (
+            f"<JournaledImport journal={self._journal} "
+            f"uploader={self._uploader}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    def _pending(self, paths, done):
+        for path in paths:
+            path = pathlib.Path(path)
+            entry = self._journal.get(path)
+            try:
+                stat = path.stat()
+            except OSError as e:
+                logger.warning(f"Cannot import {path}: {e!r}")
+                if entry is None:
+                    entry = JournalEntry(
+                        path=os.fspath(path),
+                        state=ImportState.FAILED,
+                        size=0,
+                        mtime_ns=0,
+                    )
+                entry.state = ImportState.FAILED
+                entry.error = repr(e)
+                self._journal.record(entry)
+                done.append(ImportResult(entry=entry, exception=e))
+                continue
+            if entry is not None and entry.matches(stat):
+                if entry.done:
+                    done.append(ImportResult(entry=entry, journaled=True))
+                    continue
+                if entry.state in UNFINISHED:
+                    # Commits are batched, so the upload may well have
+                    # gone through; ask the server before sending it again.
+                    try:
+                        if entry.sha256 is None:
+                            entry.sha256 = sha256_path(path)
+                        exists = self._api.check_file_exists(entry.sha256)
+                    except Exception as e:
+                        logger.warning(f"Cannot check {path}: {e!r}")
+                        entry.state = ImportState.FAILED
+                        entry.error = repr(e)
+                        self._journal.record(entry)
+                        done.append(ImportResult(entry=entry, exception=e))
+                        continue
+                    if exists.get("exists"):
+                        logger.info(f"{path} was uploaded before, skipping")
+                        entry.state = ImportState.EXISTS
+                        entry.error = None
+                        self._journal.record(entry)
+                        done.append(ImportResult(entry=entry))
+                        continue
+            else:
+                # a new file, or one that changed since: hash it again
+                entry = JournalEntry(
+                    path=os.fspath(path),
+                    state=ImportState.IN_FLIGHT,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                )
+            entry.state = ImportState.IN_FLIGHT
+            entry.error = None
+            self._entries[entry.path] = entry
+            self._journal.record(entry)
+            yield path, path.name
+
+    def _finish(self, result, path):
+        entry = self._entries.pop(os.fspath(path))
+        if result.exception is not None:
+            entry.state = ImportState.FAILED
+            entry.error = repr(result.exception)
+        elif result.skipped:
+            entry.state = ImportState.EXISTS
+        else:
+            entry.state = ImportState.UPLOADED
+            entry.response = result.response
+            if isinstance(result.response, dict):
+                entry.itemid = result.response.get("itemId")
+        self._journal.record(entry)
+        return ImportResult(entry=entry, exception=result.exception)
+
+    def run(self, paths):
+        # Yields an ImportResult per path. Files the journal has as done,
+        # and that did not change since, are neither hashed nor uploaded
+        # again; everything else is. What was in flight when a previous
+        # run died is only uploaded again if the server does not have it.
+        done, submitted = [], {}
+
+        def pending():
+            pending = self._pending(paths, done)
+            for index, (path, name) in enumerate(pending):
+                submitted[index] = path
+                yield path, name
+
+        try:
+            for result in self._uploader.upload(pending()):
+                yield from done
+                done.clear()
+                yield self._finish(result, submitted.pop(result.index))
+            yield from done
+        finally:
+            self._journal.flush()
@@ -0,0 +1,211 @@
+from attrs import define, Factory
+import bisect
+import collections
+import re
+import threading
+
+DEFAULT_BUCKETS = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120,
+)  # fmt: skip
+
+# Docspell IDs, source IDs and SHA-256 sums are long, static path
+# segments short; folding the former keeps the number of labels bounded.
+_ID_SEGMENT = re.compile(r"(?<=/)[0-9A-Za-z_-]{16,}(?=/|$)")
+
+
+def endpoint_label(endpoint):
+    return _ID_SEGMENT.sub("{id}", f"/{endpoint}")[1:]
+
+
+def body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return getattr(body, "len", 0)
+
+
+@define
+class Histogram:
+    buckets: tuple = DEFAULT_BUCKETS
+    # the last count is for values above the largest bucket
+    counts: list = Factory(
+        lambda self: [0] * (len(self.buckets) + 1), takes_self=True
+    )
+    sum: float = 0.0
+    count: int = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for le, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            yield le, total
+
+
+@define(kw_only=True)
+class EndpointMetrics:
+    requests: int = 0
+    statuses: collections.Counter = Factory(collections.Counter)
+    errors: collections.Counter = Factory(collections.Counter)
+    latency: Histogram = Factory(Histogram)
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    retries: int = 0
+    encode_seconds: float = 0.0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "statuses": dict(self.statuses),
+            "errors": dict(self.errors),
+            "latency": {
+                "buckets": dict(self.latency.cumulative()),
+                "sum": self.latency.sum,
+                "count": self.latency.count,
+            },
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "retries": self.retries,
+            "encode_seconds": self.encode_seconds,
+        }
+
+
+class Metrics:
+    def __init__(self, *, buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def __str__(self):
+        return f"<Metrics endpoints={len(self._endpoints)}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def _get(self, method, endpoint):
+        key = (method, endpoint_label(endpoint))
+        if key not in self._endpoints:
+            self._endpoints[key] = EndpointMetrics(
+                latency=Histogram(self._buckets)
+            )
+        return self._endpoints[key]
+
+    def observe_request(
+        self,
+        method,
+        endpoint,
+        *,
+        latency,
+        status=None,
+        error=None,
+        bytes_sent=0,
+        bytes_received=0,
+        retries=0,
+    ):
+        with self._lock:
+            m = self._get(method, endpoint)
+            m.requests += 1
+            m.latency.observe(latency)
+            if status is not None:
+                m.statuses[status] += 1
+            if error is not None:
+                m.errors[type(error).__name__] += 1
+            m.bytes_sent += bytes_sent
+            m.bytes_received += bytes_received
+            m.retries += retries
+
+    def observe_encoding(self, method, endpoint, seconds):
+        with self._lock:
+            self._get(method, endpoint).encode_seconds += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: m.as_dict() for key, m in sorted(self._endpoints.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+class PrometheusExporter:
+    def __init__(self, metrics, *, prefix="pydocspell"):
+        self._metrics = metrics
+        self._prefix = prefix
+
+    def __str__(self):
+        return f"<PrometheusExporter {self._metrics}>"
+
+    def __repr__(self):
+        return str(self)
+
+    @staticmethod
+    def _labels(**labels):
+        def escape(value):
+            value = str(value).replace("\\", r"\\").replace("\n", r"\n")
+            return value.replace('"', r"\"")
+
+        inner = ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+        return f"{{{inner}}}"
+
+    @staticmethod
+    def _number(value):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value) if isinstance(value, float) else str(value)
+
+    def lines(self):
+        p = self._prefix
+        snapshot = self._metrics.snapshot()
+        series = collections.defaultdict(list)
+        for (method, endpoint), m in snapshot.items():
+            labels = dict(method=method, endpoint=endpoint)
+            for status, count in m["statuses"].items():
+                series["requests_total", "counter"].append(
+                    (self._labels(**labels, status=status), count)
+                )
+            for error, count in m["errors"].items():
+                series["errors_total", "counter"].append(
+                    (self._labels(**labels, error=error), count)
+                )
+            for name in ("bytes_sent", "bytes_received", "retries"):
+                series[f"{name}_total", "counter"].append(
+                    (self._labels(**labels), m[name])
+                )
+            series["encode_seconds_total", "counter"].append(
+                (self._labels(**labels), m["encode_seconds"])
+            )
+            latency = m["latency"]
+            for le, count in latency["buckets"].items():
+                series["request_duration_seconds_bucket", "histogram"].append(
+                    (self._labels(**labels, le=self._number(le)), count)
+                )
+            series["request_duration_seconds_sum", "histogram"].append(
+                (self._labels(**labels), latency["sum"])
+            )
+            series["request_duration_seconds_count", "histogram"].append(
+                (self._labels(**labels), latency["count"])
+            )
+
+        typed = set()
+        for (name, kind), samples in series.items():
+            family = name
+            if kind == "histogram":
+                family = name.rsplit("_", 1)[0]
+            if family not in typed:
+                typed.add(family)
+                yield f"# TYPE {p}_{family} {kind}"
+            for labels, value in samples:
+                yield f"{p}_{name}{labels} {self._number(value)}"
+
+    def render(self):
+        return "".join(f"{line}\n" for line in self.lines())
+
+    def write(self, fileobj):
+        fileobj.write(self.render())
@@ -0,0 +1,265 @@
+import requests
+from urllib3.exceptions import NewConnectionError, ReadTimeoutError
+import enum
+import logging
+import time
+
+from .apiwrapper import APIWrapper
+
+logger = logging.getLogger(__name__)
+
+# a node failing like this is taken out of rotation, unless it timed out
+# reading, see _read_timeout
+_NODE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.RetryError,
+)
+
+
+def _reason(e):
+    # what urllib3 gave up on, for errors requests wraps
+    return getattr(e.args[0], "reason", None) if e.args else None
+
+
+def _never_sent(e):
+    # whether the request died before reaching the node, so that it may be
+    # sent to another one, idempotent or not
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    return isinstance(e, requests.exceptions.ConnectionError) and isinstance(
+        _reason(e), NewConnectionError
+    )
+
+
+def _read_timeout(e):
+    # the node took the request, but is slow to answer, not gone
+    return isinstance(e, requests.exceptions.ReadTimeout) or isinstance(
+        _reason(e), ReadTimeoutError
+    )
+
+
+class Node:
+    def __init__(self, api):
+        self._api = api
+        self._outstanding = 0
+        self._healthy = True
+        self._checked = 0.0
+        self._version = None
+
+    api = property(lambda s: s._api)
+    baseurl = property(lambda s: s._api.baseurl)
+    outstanding = property(lambda s: s._outstanding)
+    healthy = property(lambda s: s._healthy)
+    version = property(lambda s: s._version)
+
+    def __str__(self):
+        state = "up" if self._healthy else "down"
+        return (
+            f"<Node url={self.baseurl} {state} "
+            f"outstanding={self._outstanding}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+
+class MultiNodeAPIWrapper(APIWrapper):
+    # Spreads requests across several Docspell server nodes, each with its
+    # own APIWrapper and thus its own connections and session. A node that
+    # cannot be reached is taken out of rotation until a health check, at
+    # most every health_interval seconds, finds it back. Requests that are
+    # safe to repeat, or that never reached the node, are then sent to
+    # another one. Uploads are not safe to repeat: the server only skips
+    # duplicates when asked to. A node that is merely slow to answer stays
+    # in rotation.
+
+    class Strategy(enum.Enum):
+        LEAST_OUTSTANDING = "least_outstanding"
+        ROUND_ROBIN = "round_robin"
+
+    class NoHealthyNode(Exception):
+        pass
+
+    DEFAULT_HEALTH_INTERVAL = 30
+    IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+    def __init__(
+        self,
+        baseurls,
+        *,
+        strategy=Strategy.LEAST_OUTSTANDING,
+        health_interval=DEFAULT_HEALTH_INTERVAL,
+        version=APIWrapper.DEFAULT_VERSION,
+        debug=True,
+        cache=None,
+        **kwargs,
+    ):
+        # The remaining kwargs are for the APIWrapper of every node. The
+        # cache is kept here, so that it is shared across nodes.
+        if not baseurls:
+            raise ValueError("Need at least one base URL")
+        if kwargs.get("session") or kwargs.get("token_store"):
+            raise ValueError("Cannot share a session or token store")
+        super().__init__(
+            baseurls[0],
+            version=version,
+            debug=debug,
+            cache=cache,
+            auto_refresh=False,
+            # upload bodies are built here, before a node is picked
+            fd_budget=kwargs.get("fd_budget"),
+            metrics=kwargs.get("metrics"),
+        )
+        self._strategy = MultiNodeAPIWrapper.Strategy(strategy)
+        self._health_interval = health_interval
+        self._nodes = [
+            Node(APIWrapper(url, version=version, debug=False, **kwargs))
+            for url in baseurls
+        ]
+        self._next = 0
+        self._login_args = None
+
+    nodes = property(lambda s: list(s._nodes))
+    strategy = property(lambda s: s._strategy)
+    healthy = property(lambda s: [n for n in s._nodes if n.healthy])
+
+    def __str__(self):
+        return (
+            f"<MultiNodeAPIWrapper nodes={len(self._nodes)} "
+            f"healthy={len(self.healthy)} {self.state}>"
+        )
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        try:
+            super().__exit__(exc_type, exc_value, exc_traceback)
+        finally:
+            for node in self._nodes:
+                node.api.__exit__(None, None, None)
+
+    def _mark_down(self, node, e):
+        with self._lock:
+            if node.healthy:
+                logger.warning(f"Taking {node.baseurl} out: {e!r}")
+            node._healthy = False
+            node._checked = time.monotonic()
+
+    def check_node(self, node):
+        # Asks the node for its version, and logs it in if it came back
+        # since login.
+        node._checked = time.monotonic()
+        try:
+            node._version = node.api.get_docspell_version()
+            if (
+                self._login_args
+                and node.api.state != APIWrapper.State.LOGGEDIN
+            ):
+                node.api.login(*self._login_args)
+        except Exception as e:
+            self._mark_down(node, e)
+            return False
+        if not node.healthy:
+            logger.info(f"Taking {node.baseurl} back in")
+        node._healthy = True
+        return True
+
+    def check_health(self):
+        return {node.baseurl: self.check_node(node) for node in self._nodes}
+
+    def _recheck(self):
+        now = time.monotonic()
+        for node in self._nodes:
+            if node.healthy:
+                continue
+            with self._lock:
+                due = now - node._checked >= self._health_interval
+                if due:
+                    # lest other threads check it too meanwhile
+                    node._checked = now
+            if due:
+                self.check_node(node)
+
+    def _pick(self, exclude=()):
+        self._recheck()
+        with self._lock:
+            nodes = [n for n in self._nodes if n.healthy and n not in exclude]
+            if not nodes:
+                return None
+            if self._strategy == MultiNodeAPIWrapper.Strategy.ROUND_ROBIN:
+                self._next += 1
+                node = nodes[self._next % len(nodes)]
+            else:
+                node = min(nodes, key=lambda n: n.outstanding)
+            node._outstanding += 1
+        return node
+
+    def _response(self, method, endpoint, *, apiurl=None, **kwargs):
+        # apiurl is relative to the first node, for which this stands in
+        use_baseurl = apiurl is not None and apiurl == self._baseurl
+        tried = []
+        while True:
+            node = self._pick(exclude=tried)
+            if node is None:
+                raise MultiNodeAPIWrapper.NoHealthyNode(
+                    f"No node left for {method} {endpoint}"
+                )
+            tried.append(node)
+            try:
+                return node.api._response(
+                    method,
+                    endpoint,
+                    apiurl=node.baseurl if use_baseurl else None,
+                    **kwargs,
+                )
+            except _NODE_ERRORS as e:
+                idempotent = method in MultiNodeAPIWrapper.IDEMPOTENT_METHODS
+                if not _read_timeout(e):
+                    self._mark_down(node, e)
+                if not (idempotent or _never_sent(e)):
+                    raise
+                logger.info(f"Failing {method} {endpoint} over: {e!r}")
+                data = kwargs.get("data")
+                if callable(getattr(data, "seek", None)):
+                    data.seek(0)
+            finally:
+                with self._lock:
+                    node._outstanding -= 1
+
+    def login(self, collective, username, password, rememberme=True):
+        # every node gets a session of its own
+        self.invalidate_cache()
+        self._login_args = (collective, username, password, rememberme)
+        resp, error = None, None
+        for node in self.healthy:
+            try:
+                resp = node.api.login(*self._login_args)
+            except _NODE_ERRORS as e:
+                self._mark_down(node, e)
+                error = e
+        if resp is None:
+            raise error or MultiNodeAPIWrapper.NoHealthyNode("login")
+        with self._lock:
+            self._state = APIWrapper.State.LOGGEDIN
+            self._state.set_info(f"user={collective}/{username}")
+        return resp
+
+    def refresh_session(self):
+        # nodes refresh their own sessions, unless told otherwise
+        return {
+            node.baseurl: node.api.refresh_session() for node in self.healthy
+        }
+
+    def logout(self):
+        with self._lock:
+            self._login_args = None
+            if self.state != APIWrapper.State.LOGGEDIN:
+                return {}
+            for node in self._nodes:
+                try:
+                    node.api.logout()
+                except Exception as e:
+                    logger.warning(f"Logout from {node.baseurl}: {e!r}")
+            self.invalidate_cache()
+            self._state = APIWrapper.State.LOGGEDOUT
+            logger.info("Logged out")
+        return {}
@@ -0,0 +1,219 @@
+from attrs import define, evolve, Factory
+import io
+import logging
+import shutil
+import zipfile
+
+from .bulk import BulkUploader
+from .metadata import UploadMetadata
+from .util.batching import batched_by_size, file_size
+from .util.lazyfile import LazyFile, as_file
+
+logger = logging.getLogger(__name__)
+
+# local file header plus central directory entry, without the name
+_ZIP_ENTRY_OVERHEAD = 30 + 46
+_CHUNK_SIZE = 1024 * 1024
+
+
+def pack_zip(
+    file_and_name_tuples, *, compression=zipfile.ZIP_STORED, errors=None
+):
+    # Builds the archive in memory; each member is copied in chunks, so
+    # only the archive itself is ever held as a whole. With an errors
+    # list, files that cannot be opened are left out and reported there
+    # as (name, exception) tuples, instead of failing the whole archive.
+    buf, seen = io.BytesIO(), set()
+    with zipfile.ZipFile(buf, "w", compression=compression) as zf:
+        for index, (fileobj, name) in enumerate(file_and_name_tuples):
+            try:
+                fileobj = as_file(fileobj, name)
+                # read before adding the member, so that it is not left
+                # half written when the file cannot be opened
+                chunk = fileobj.read(_CHUNK_SIZE)
+            except OSError as e:
+                if errors is None:
+                    raise
+                logger.warning(f"Cannot pack {name}: {e!r}")
+                errors.append((name, e))
+                continue
+            member = f"{index}-{name}" if name in seen else name
+            seen.add(member)
+            try:
+                with zf.open(member, "w") as f:
+                    f.write(chunk)
+                    shutil.copyfileobj(fileobj, f, _CHUNK_SIZE)
+            finally:
+                if isinstance(fileobj, LazyFile):
+                    fileobj.close()
+    buf.seek(0)
+    return buf
+
+
+@define(kw_only=True)
+class PackResult:
+    index: int
+    name: str
+    members: list = Factory(list)
+    response: (dict, type(None)) = None
+    exception: (BaseException, type(None)) = None
+
+    ok = property(lambda s: s.exception is None)
+
+
+class ArchivePacker:
+    # Docspell unpacks archives uploaded with flattenArchives, and with
+    # multiple, turns every file in them into an item of its own. Packing
+    # many small files into one archive thus saves as many requests.
+
+    DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+    DEFAULT_MAX_FILES = 1000
+    DEFAULT_NAME = "pydocspell-{index:06d}.zip"
+
+    def __init__(
+        self,
+        api,
+        *,
+        max_bytes=DEFAULT_MAX_BYTES,
+        max_files=DEFAULT_MAX_FILES,
+        compression=zipfile.ZIP_STORED,
+        name=DEFAULT_NAME,
+        metadata=None,
+        **kwargs,
+    ):
+        # the remaining kwargs are for the BulkUploader doing the uploads
+        if not max_bytes and not max_files:
+            raise ValueError("Need max_bytes or max_files")
+        self._max_bytes = max_bytes
+        self._max_files = max_files
+        self._compression = compression
+        self._name = name
+        self._uploader = BulkUploader(
+            api,
+            metadata=evolve(
+                metadata or UploadMetadata(),
+                multiple=True,
+                flattenArchives=True,
+            ),
+            **kwargs,
+        )
+
+    max_bytes = property(lambda s: s._max_bytes)
+    max_files = property(lambda s: s._max_files)
+    uploader = property(lambda s: s._uploader)
+
+    def __str__(self):
+        return (
+            f"<ArchivePacker max_bytes={self._max_bytes} "
+            f"max_files={self._max_files} uploader={self._uploader}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    @staticmethod
+    def _packed_size(file_and_name):
+        _, name = file_and_name
+        return file_size(file_and_name) + _ZIP_ENTRY_OVERHEAD + 2 * len(name)
+
+    def _sized(self, files, index, failed):
+        # index is a one-element list holding the archive being filled
+        for position, item in enumerate(files):
+            file_and_name = BulkUploader._file_and_name(item)
+            if file_and_name[1] is None:
+                # archive members need a name
+                file_and_name = file_and_name[0], f"file-{position}"
+            try:
+                size = ArchivePacker._packed_size(file_and_name)
+            except OSError as e:
+                if failed is None:
+                    raise
+                _, name = file_and_name
+                logger.warning(f"Cannot pack {name}: {e!r}")
+                failed.append(
+                    PackResult(
+                        index=index[0], name=name, members=[name], exception=e
+                    )
+                )
+                continue
+            yield file_and_name, size
+
+    def _archives(self, files, failed):
+        index = [0]
+        batches = batched_by_size(
+            self._sized(files, index, failed),
+            max_bytes=self._max_bytes,
+            max_files=self._max_files,
+            size=lambda item: item[1],
+        )
+        for batch in batches:
+            batch = [file_and_name for file_and_name, _ in batch]
+            members = [member for _, member in batch]
+            name = self._name.format(index=index[0])
+            errors = None if failed is None else []
+            try:
+                archive = pack_zip(
+                    batch, compression=self._compression, errors=errors
+                )
+            except OSError as e:
+                if failed is None:
+                    raise
+                logger.warning(f"Cannot pack {name}: {e!r}")
+                failed.append(
+                    PackResult(
+                        index=index[0], name=name, members=members, exception=e
+                    )
+                )
+                index[0] += 1
+                continue
+
+            for member, e in errors or ():
+                members.remove(member)
+                failed.append(
+                    PackResult(
+                        index=index[0],
+                        name=member,
+                        members=[member],
+                        exception=e,
+                    )
+                )
+            if not members:
+                continue
+            logger.debug(
+                f"Packed {len(members)} files into {name}, "
+                f"{archive.getbuffer().nbytes} bytes"
+            )
+            yield index[0], archive, name, members
+            index[0] += 1
+
+    def archives(self, files, *, failed=None):
+        # Yields (archive, name, member names) tuples. Archives are only
+        # packed as they are asked for, so no more of them are in memory
+        # than are being uploaded. With a failed list, files that cannot
+        # be packed are left out and reported there as PackResults named
+        # after them, and so are archives that cannot be packed at all.
+        for _, archive, name, members in self._archives(files, failed):
+            yield archive, name, members
+
+    def upload(self, files):
+        # A file that cannot be read fails on its own, while the other
+        # files of its archive are still uploaded.
+        members, failed = {}, []
+
+        def archives():
+            for index, archive, name, names in self._archives(files, failed):
+                members[name] = index, names
+                yield archive, name
+
+        for result in self._uploader.upload(archives()):
+            while failed:
+                yield failed.pop(0)
+            index, names = members.pop(result.name)
+            yield PackResult(
+                index=index,
+                name=result.name,
+                members=names,
+                response=result.response,
+                exception=result.exception,
+            )
+        yield from failed
@@ -0,0 +1,122 @@
+from attrs import evolve
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataResolver:
+    # Maps names of folders, tags and organizations to their IDs. The lists
+    # are fetched on first use and again when a name is not found, but at
+    # most once per refresh_interval, so that many records with the same
+    # bad name do not each cost a round trip.
+
+    DEFAULT_REFRESH_INTERVAL = 30
+
+    # kind: (APIWrapper method, endpoint it reads)
+    KINDS = {
+        "folder": ("get_folders", "sec/folder"),
+        "tag": ("get_tags", "sec/tag"),
+        "organization": ("get_organizations", "sec/organization"),
+    }
+
+    class NotFound(Exception):
+        def __init__(self, kind, name):
+            super().__init__(f"No {kind} named or with ID {name!r}")
+            self._kind = kind
+            self._name = name
+
+        kind = property(lambda s: s._kind)
+        name = property(lambda s: s._name)
+
+    def __init__(self, api, *, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self._api = api
+        self._refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        # kind: (IDs, casefolded names to IDs, time of fetch)
+        self._index = {}
+
+    refresh_interval = property(lambda s: s._refresh_interval)
+
+    def __str__(self):
+        kinds = ",".join(sorted(self._index))
+        return f"<MetadataResolver api={self._api} loaded={kinds}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def _fetch(self, kind):
+        getter, endpoint = MetadataResolver.KINDS[kind]
+        # a cached response is what is being refreshed
+        self._api.invalidate_cache(endpoint)
+        entries = getattr(self._api, getter)().get("items") or ()
+        ids = {entry["id"] for entry in entries}
+        names = {entry["name"].casefold(): entry["id"] for entry in entries}
+        logger.debug(f"Loaded {len(ids)} {kind} entries")
+        self._index[kind] = (ids, names, time.monotonic())
+
+    def _lookup(self, kind, name):
+        ids, names, _ = self._index[kind]
+        if name in ids:
+            return name
+        return names.get(name.casefold())
+
+    def refresh(self, kind=None):
+        with self._lock:
+            for each in [kind] if kind else MetadataResolver.KINDS:
+                self._fetch(each)
+
+    def resolve(self, kind, name):
+        if kind not in MetadataResolver.KINDS:
+            raise ValueError(f"Cannot resolve {kind=}")
+        with self._lock:
+            if kind not in self._index:
+                self._fetch(kind)
+            found = self._lookup(kind, name)
+            if found is None:
+                _, _, fetched = self._index[kind]
+                if time.monotonic() - fetched >= self._refresh_interval:
+                    self._fetch(kind)
+                    found = self._lookup(kind, name)
+        if found is None:
+            raise MetadataResolver.NotFound(kind, name)
+        return found
+
+    def folder_id(self, name):
+        return self.resolve("folder", name)
+
+    def tag_id(self, name):
+        return self.resolve("tag", name)
+
+    def organization_id(self, name):
+        return self.resolve("organization", name)
+
+    def problems(self, metadata):
+        # what normalize would complain about, as NotFound exceptions
+        ret = []
+        if metadata.folder:
+            try:
+                self.folder_id(metadata.folder)
+            except MetadataResolver.NotFound as e:
+                ret.append(e)
+        for tag in metadata.tags:
+            try:
+                self.tag_id(tag)
+            except MetadataResolver.NotFound as e:
+                ret.append(e)
+        return ret
+
+    def normalize(self, metadata):
+        # Returns a copy with folder and tags given by ID, so that Docspell
+        # need not look them up for every upload, and unknown names are
+        # caught before anything is uploaded.
+        if metadata is None:
+            return None
+        folder = metadata.folder and self.folder_id(metadata.folder)
+        tags = []
+        for tag in metadata.tags:
+            tag = self.tag_id(tag)
+            if tag not in tags:
+                tags.append(tag)
+        return evolve(metadata, folder=folder, tags=tags)
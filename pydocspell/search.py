@@ -0,0 +1,126 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# put on the queue after the last page
+_DONE = object()
+
+
+class ItemSearch:
+    DEFAULT_PAGE_SIZE = 100
+    DEFAULT_PREFETCH = 1
+
+    def __init__(
+        self,
+        api,
+        query,
+        *,
+        page_size=DEFAULT_PAGE_SIZE,
+        prefetch=DEFAULT_PREFETCH,
+        offset=0,
+        with_details=False,
+        search_mode=None,
+    ):
+        if page_size < 1:
+            raise ValueError(f"{page_size=} must be at least 1")
+        if prefetch < 1:
+            raise ValueError(f"{prefetch=} must be at least 1")
+        self._api = api
+        self._query = query
+        self._page_size = page_size
+        self._prefetch = prefetch
+        self._offset = offset
+        self._with_details = with_details
+        self._search_mode = search_mode
+        # Holds at most prefetch pages, so that no more than that, plus
+        # the page being consumed and the one being fetched, are in memory.
+        self._pages = queue.Queue(maxsize=prefetch)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    query = property(lambda s: s._query)
+    page_size = property(lambda s: s._page_size)
+    prefetch = property(lambda s: s._prefetch)
+
+    def __str__(self):
+        return (
+            f"<ItemSearch query={self._query!r} "
+            f"page_size={self._page_size} prefetch={self._prefetch}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def _put(self, obj):
+        if not self._stopped.is_set():
+            self._pages.put(obj)
+
+    def _fetch(self, offset):
+        items = self._api.iter_search_items(
+            self._query,
+            offset=offset,
+            limit=self._page_size,
+            with_details=self._with_details,
+            search_mode=self._search_mode,
+        )
+        return list(items)
+
+    def _run(self):
+        # Docspell silently caps the page size (maxItemPageSize), so the
+        # end is reached with a page shorter than the longest seen so far.
+        offset, longest = self._offset, 0
+        try:
+            while not self._stopped.is_set():
+                items = self._fetch(offset)
+                logger.debug(f"Fetched {len(items)} items at {offset=}")
+                if items:
+                    self._put(items)
+                if not items or len(items) < longest:
+                    break
+                longest = max(longest, len(items))
+                offset += len(items)
+            self._put(_DONE)
+        except Exception as e:
+            self._put(e)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="pydocspell-search", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stopped.set()
+        # unblock the fetching thread, should it be waiting on a full queue
+        while True:
+            try:
+                self._pages.get_nowait()
+            except queue.Empty:
+                break
+
+    def pages(self):
+        self.start()
+        try:
+            while True:
+                page = self._pages.get()
+                if page is _DONE:
+                    return
+                if isinstance(page, BaseException):
+                    raise page
+                yield page
+        finally:
+            self.close()
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from page
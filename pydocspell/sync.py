@@ -0,0 +1,351 @@
+from attrs import define, Factory
+from concurrent import futures
+import datetime
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class SyncStore:
+    SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS items (
+            id TEXT PRIMARY KEY,
+            created INTEGER,
+            updated INTEGER,
+            data TEXT NOT NULL,
+            fingerprint TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS attachments (
+            id TEXT PRIMARY KEY,
+            itemid TEXT NOT NULL,
+            name TEXT,
+            path TEXT NOT NULL,
+            etag TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """,
+    )
+
+    def __init__(self, path=":memory:"):
+        self._path = str(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        with self._db:
+            for statement in SyncStore.SCHEMA:
+                self._db.execute(statement)
+            columns = {
+                row[1] for row in self._db.execute("PRAGMA table_info(items)")
+            }
+            if "fingerprint" not in columns:
+                # stores from before change detection
+                self._db.execute(
+                    "ALTER TABLE items ADD COLUMN fingerprint TEXT"
+                )
+
+    path = property(lambda s: s._path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __str__(self):
+        return f"<SyncStore path={self._path}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM items"
+            ).fetchone()
+        return count
+
+    def __contains__(self, itemid):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM items WHERE id = ?", (itemid,)
+            ).fetchone()
+        return row is not None
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def get_item(self, itemid):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM items WHERE id = ?", (itemid,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def created(self, itemid):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT created FROM items WHERE id = ?", (itemid,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def fingerprint(self, itemid):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT fingerprint FROM items WHERE id = ?", (itemid,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def attachments(self, itemid):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, name, path, etag FROM attachments "
+                "WHERE itemid = ? ORDER BY id",
+                (itemid,),
+            ).fetchall()
+        return [dict(zip(("id", "name", "path", "etag"), r)) for r in rows]
+
+    def put_item(self, item, downloads, *, fingerprint=None):
+        # downloads maps attachment IDs to their DownloadResult
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO items "
+                "(id, created, updated, data, fingerprint) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    item["id"],
+                    item.get("created"),
+                    item.get("updated"),
+                    json.dumps(item),
+                    fingerprint,
+                ),
+            )
+            self._db.execute(
+                "DELETE FROM attachments WHERE itemid = ?", (item["id"],)
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO attachments VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        attachment["id"],
+                        item["id"],
+                        attachment.get("name"),
+                        downloads[attachment["id"]].path,
+                        downloads[attachment["id"]].etag,
+                    )
+                    for attachment in item.get("attachments") or ()
+                    if attachment["id"] in downloads
+                ],
+            )
+
+    def get_state(self, key, default=None):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM state WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_state(self, key, value):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO state VALUES (?, ?)",
+                (key, json.dumps(value)),
+            )
+
+    high_water = property(lambda s: s.get_state("high_water"))
+
+
+@define(kw_only=True)
+class ItemSyncResult:
+    itemid: str
+    created: (int, type(None)) = None
+    skipped: bool = False
+    downloads: list = Factory(list)
+    exception: (BaseException, type(None)) = None
+
+    ok = property(lambda s: s.exception is None)
+
+
+class CollectiveMirror:
+    DEFAULT_WORKERS = 4
+    STORE_NAME = ".pydocspell-sync.sqlite"
+
+    def __init__(
+        self,
+        api,
+        directory,
+        *,
+        store=None,
+        query="",
+        workers=DEFAULT_WORKERS,
+        max_in_flight=None,
+        originals=True,
+        page_size=None,
+    ):
+        if workers < 1:
+            raise ValueError(f"{workers=} must be at least 1")
+        self._api = api
+        self._directory = os.fspath(directory)
+        os.makedirs(self._directory, exist_ok=True)
+        self._store = store or SyncStore(
+            os.path.join(self._directory, CollectiveMirror.STORE_NAME)
+        )
+        self._query = query
+        self._workers = workers
+        self._max_in_flight = max_in_flight or 2 * workers
+        if self._max_in_flight < workers:
+            raise ValueError(f"{max_in_flight=} must not be below {workers=}")
+        self._originals = originals
+        self._page_size = page_size
+
+    directory = property(lambda s: s._directory)
+    store = property(lambda s: s._store)
+    workers = property(lambda s: s._workers)
+
+    def __str__(self):
+        return (
+            f"<CollectiveMirror api={self._api} "
+            f"directory={self._directory} workers={self._workers}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    @staticmethod
+    def _fingerprint(record):
+        # what the search results show of an item; highlighting depends on
+        # the query rather than on the item
+        record = {k: v for k, v in record.items() if k != "highlighting"}
+        data = json.dumps(record, sort_keys=True).encode()
+        return hashlib.sha256(data).hexdigest()
+
+    def _search_query(self, full, changes):
+        # The query language only knows dates, and local and server time
+        # zones may differ, so a day of overlap is searched again; items
+        # already in the store are skipped anyway.
+        mark = None if full or changes else self._store.high_water
+        if mark is None:
+            return self._query
+        since = datetime.datetime.fromtimestamp(
+            mark / 1000, datetime.timezone.utc
+        ).date() - datetime.timedelta(days=1)
+        return f"{self._query} created>={since.isoformat()}".strip()
+
+    def _unchanged(self, record, fingerprint, changes):
+        if changes:
+            return self._store.fingerprint(record["id"]) == fingerprint
+        return record["id"] in self._store
+
+    def _attachment_path(self, itemid, attachment):
+        name = os.path.basename(attachment.get("name") or "") or "file"
+        return os.path.join(self._directory, itemid, attachment["id"], name)
+
+    def _sync_item(self, itemid, fingerprint):
+        result = ItemSyncResult(itemid=itemid)
+        try:
+            item = self._api.get_item(itemid)
+            result.created = item.get("created")
+            downloads = {}
+            download = (
+                self._api.download_original
+                if self._originals
+                else self._api.download_attachment
+            )
+            for attachment in item.get("attachments") or ():
+                path = self._attachment_path(itemid, attachment)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                downloads[attachment["id"]] = download(attachment["id"], path)
+            itemdir = os.path.join(self._directory, itemid)
+            os.makedirs(itemdir, exist_ok=True)
+            with open(os.path.join(itemdir, "item.json"), "w") as f:
+                json.dump(item, f)
+            self._store.put_item(item, downloads, fingerprint=fingerprint)
+            result.downloads = list(downloads.values())
+            logger.debug(f"Synced item {itemid}")
+        except Exception as e:
+            logger.warning(f"Syncing item {itemid} failed: {e!r}")
+            result.exception = e
+        return result
+
+    def _drain(self, pending, *, block):
+        if not pending:
+            return
+        done, _ = futures.wait(
+            pending,
+            timeout=None if block else 0,
+            return_when=futures.FIRST_COMPLETED,
+        )
+        for fut in done:
+            pending.remove(fut)
+            yield fut.result()
+
+    def _run(self, full, changes):
+        kwargs = {}
+        if self._page_size is not None:
+            kwargs["page_size"] = self._page_size
+        search = self._api.iter_items(
+            self._search_query(full, changes), **kwargs
+        )
+        executor = futures.ThreadPoolExecutor(
+            max_workers=self._workers, thread_name_prefix="pydocspell-sync"
+        )
+        pending = set()
+        try:
+            with search:
+                for record in search:
+                    itemid = record["id"]
+                    fingerprint = CollectiveMirror._fingerprint(record)
+                    if not full and self._unchanged(
+                        record, fingerprint, changes
+                    ):
+                        yield ItemSyncResult(
+                            itemid=itemid,
+                            created=self._store.created(itemid),
+                            skipped=True,
+                        )
+                        continue
+                    if len(pending) >= self._max_in_flight:
+                        yield from self._drain(pending, block=True)
+                    pending.add(
+                        executor.submit(self._sync_item, itemid, fingerprint)
+                    )
+                    yield from self._drain(pending, block=False)
+
+            while pending:
+                yield from self._drain(pending, block=True)
+
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def sync(self, *, full=False, changes=False):
+        # Yields an ItemSyncResult per item found. By default, only items
+        # created since the high-water mark are searched for and fetched,
+        # which keeps nightly runs over large collectives short, but
+        # misses edits to items synced before. With changes, every item
+        # the query finds is listed, and those whose search result differs
+        # from the one they were synced with are fetched again; edits that
+        # do not show in search results, such as notes, are only picked up
+        # by a full sync. The mark only moves once all items succeeded, so
+        # that failed items are searched for, and retried, by the next run.
+        mark, failed = self._store.high_water or 0, False
+        for result in self._run(full, changes):
+            failed |= not result.ok
+            mark = max(mark, result.created or 0)
+            yield result
+
+        if failed:
+            logger.warning("Some items failed, keeping the high-water mark")
+        elif mark:
+            self._store.set_state("high_water", mark)
@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def count_jobs(queue_state):
+    # Docspell's JobQueueState lists jobs in progress, queued and recently
+    # completed; only the first two are backlog.
+    return len(queue_state.get("progress") or ()) + len(
+        queue_state.get("queued") or ()
+    )
+
+
+class QueueThrottle:
+    DEFAULT_HIGH_WATER = 50
+    DEFAULT_INTERVAL = 30
+
+    def __init__(
+        self,
+        api,
+        *,
+        high_water=DEFAULT_HIGH_WATER,
+        low_water=None,
+        interval=DEFAULT_INTERVAL,
+        count=count_jobs,
+    ):
+        low_water = high_water // 2 if low_water is None else low_water
+        if not 0 <= low_water < high_water:
+            raise ValueError(f"Need 0 ≤ {low_water=} < {high_water=}")
+        self._api = api
+        self._high_water = high_water
+        self._low_water = low_water
+        self._interval = interval
+        self._count = count
+        self._backlog = None
+        self._sampled = None
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    high_water = property(lambda s: s._high_water)
+    low_water = property(lambda s: s._low_water)
+    interval = property(lambda s: s._interval)
+    backlog = property(lambda s: s._backlog)
+    paused = property(lambda s: not s._resumed.is_set())
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def __str__(self):
+        state = "paused" if self.paused else "running"
+        return (
+            f"<QueueThrottle {state} backlog={self._backlog} "
+            f"low={self._low_water} high={self._high_water}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    def sample(self):
+        try:
+            backlog = self._count(self._api.get_job_queue())
+        except Exception as e:
+            logger.warning(f"Could not sample the job queue: {e!r}")
+            return self._backlog
+
+        self._backlog = backlog
+        self._sampled = time.monotonic()
+        if not self.paused and backlog >= self._high_water:
+            logger.info(f"Pausing uploads, {backlog} jobs in the queue")
+            self._resumed.clear()
+        elif self.paused and backlog <= self._low_water:
+            logger.info(f"Resuming uploads, {backlog} jobs in the queue")
+            self._resumed.set()
+        return backlog
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.sample()
+            self._stopped.wait(self._interval)
+
+    def start(self):
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="pydocspell-throttle", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        # never leave anyone waiting on a throttle that no longer samples
+        self._resumed.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def wait(self, *, timeout=None):
+        # Without the sampling thread, the queue is sampled on demand,
+        # at most once per interval, and while paused.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._thread is None and (
+                self._sampled is None
+                or time.monotonic() - self._sampled >= self._interval
+            ):
+                self.sample()
+            if not self.paused:
+                return
+
+            wait = self._interval
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    raise TimeoutError(f"Uploads still paused by {self}")
+            self._resumed.wait(wait)
@@ -0,0 +1,7 @@
+from .unique_ids import make_unique_id
+from .hashing import HashingService, sha256_path
+from .batching import batched_by_size
+from .lazyfile import FileDescriptorBudget, LazyFile
+from .multipart import ReplayableMultipartEncoder
+from .tracing import short_repr
+from .jsonstream import iter_records
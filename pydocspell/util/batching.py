@@ -0,0 +1,28 @@
+import os
+
+from requests.utils import super_len
+
+
+def file_size(file_and_name):
+    fileobj, _ = file_and_name
+    if isinstance(fileobj, os.PathLike):
+        return os.path.getsize(fileobj)
+    return super_len(fileobj)
+
+
+def batched_by_size(items, *, max_bytes=None, max_files=None, size=file_size):
+    # A single item larger than max_bytes still makes up a batch of its own.
+    batch, batch_bytes = [], 0
+    for item in items:
+        item_bytes = size(item)
+        if batch and (
+            (max_files and len(batch) >= max_files)
+            or (max_bytes and batch_bytes + item_bytes > max_bytes)
+        ):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(item)
+        batch_bytes += item_bytes
+
+    if batch:
+        yield batch
@@ -0,0 +1,116 @@
+from concurrent import futures
+import collections
+import hashlib
+import logging
+import mmap
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 4 * 1024 * 1024
+
+
+def sha256_path(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # empty files cannot be mapped
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return hashlib.sha256(m).hexdigest()
+
+
+class HashingService:
+    def __init__(self, *, processes=None, threshold=DEFAULT_THRESHOLD):
+        self._processes = processes or os.cpu_count() or 1
+        self._threshold = threshold
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    processes = property(lambda s: s._processes)
+    threshold = property(lambda s: s._threshold)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __str__(self):
+        return (
+            f"<HashingService processes={self._processes} "
+            f"threshold={self._threshold}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    def close(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_pool(self):
+        # hashers are shared between uploader threads
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = futures.ProcessPoolExecutor(self._processes)
+            return self._pool
+
+    def _submit(self, path):
+        # Files below the threshold are hashed right here, as shipping them
+        # to a worker process costs more than hashing them.
+        fut = futures.Future()
+        try:
+            if (
+                self._processes > 1
+                and os.path.getsize(path) >= self._threshold
+            ):
+                return self._get_pool().submit(sha256_path, path)
+            fut.set_result(sha256_path(path))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def hash_path(self, path):
+        return self._submit(path).result()
+
+    def hash_paths(self, paths, *, ordered=False, errors=None):
+        # Paths that cannot be hashed are skipped with a warning, and with
+        # an errors list, reported there as (path, exception) tuples.
+        max_in_flight = 2 * self._processes
+        pending = collections.deque()
+
+        def result(path, fut):
+            try:
+                yield path, fut.result()
+            except Exception as e:
+                logger.warning(f"Hashing {path} failed: {e!r}")
+                if errors is not None:
+                    errors.append((path, e))
+
+        def drain_ordered(block):
+            while pending and (block or pending[0][1].done()):
+                yield from result(*pending.popleft())
+                block = False
+
+        def drain_any(block):
+            done, _ = futures.wait(
+                [fut for _, fut in pending],
+                timeout=None if block else 0,
+                return_when=futures.FIRST_COMPLETED,
+            )
+            for item in [item for item in pending if item[1] in done]:
+                pending.remove(item)
+                yield from result(*item)
+
+        drain = drain_ordered if ordered else drain_any
+        for path in paths:
+            if len(pending) >= max_in_flight:
+                yield from drain(True)
+            pending.append((path, self._submit(path)))
+            yield from drain(False)
+
+        while pending:
+            yield from drain(True)
@@ -0,0 +1,69 @@
+import json
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None
+
+# Prefixes are given the way ijson takes them: dotted object keys, with
+# "item" standing for every element of an array, e.g. "groups.item.items.item"
+# for all items of all groups of a search result.
+
+_START = ("start_map", "start_array")
+_END = ("end_map", "end_array")
+
+
+def _walk(obj, path):
+    if not path:
+        yield obj
+        return
+    key, *rest = path
+    if key == "item" and isinstance(obj, list):
+        for element in obj:
+            yield from _walk(element, rest)
+    elif isinstance(obj, dict) and key in obj:
+        yield from _walk(obj[key], rest)
+
+
+def _parsed_records(fileobj, prefixes):
+    obj = json.load(fileobj)
+    for prefix in prefixes:
+        path = prefix.split(".") if prefix else []
+        for record in _walk(obj, path):
+            yield prefix, record
+
+
+def _streamed_records(fileobj, prefixes):
+    events = ijson.parse(fileobj, use_float=True)
+    for current, event, value in events:
+        if current not in prefixes:
+            continue
+        if event not in _START:
+            yield current, value
+            continue
+
+        # build the record from its events, as ijson.items does
+        prefix, depth, builder = current, 1, ObjectBuilder()
+        while depth:
+            builder.event(event, value)
+            _, event, value = next(events)
+            if event in _START:
+                depth += 1
+            elif event in _END:
+                depth -= 1
+        yield prefix, builder.value
+
+
+def iter_records(fileobj, *prefixes, incremental=True):
+    # Yields (prefix, record) tuples. With ijson, records are yielded as
+    # they are parsed from fileobj, in document order; without, the whole
+    # document is parsed first, and records are yielded prefix by prefix.
+    prefixes = prefixes or ("",)
+    if incremental and ijson is not None:
+        try:
+            yield from _streamed_records(fileobj, set(prefixes))
+        except ijson.JSONError as e:
+            raise ValueError(f"Invalid JSON: {e}") from e
+    else:
+        yield from _parsed_records(fileobj, prefixes)
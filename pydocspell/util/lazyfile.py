@@ -0,0 +1,155 @@
+import logging
+import os
+import threading
+
+from requests.utils import super_len
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def _default_budget_size():
+    if resource is None:
+        return 256
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return 1024
+    # leave the other half for sockets, databases and the like
+    return max(16, soft // 2)
+
+
+class FileDescriptorBudget:
+    def __init__(self, size=None):
+        self._size = size or _default_budget_size()
+        self._semaphore = threading.BoundedSemaphore(self._size)
+
+    size = property(lambda s: s._size)
+
+    def __str__(self):
+        return f"<FileDescriptorBudget size={self._size}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def acquire(self, *, timeout=None):
+        if not self._semaphore.acquire(timeout=timeout):
+            raise TimeoutError(f"No file descriptor available in {self}")
+
+    def release(self):
+        self._semaphore.release()
+
+
+DEFAULT_BUDGET = FileDescriptorBudget()
+
+
+class LazyFile:
+    # LazyFile deliberately has no fileno() and no __len__: the multipart
+    # encoder then reads from it directly and uses .len for the number of
+    # bytes left, instead of wrapping or copying it.
+
+    def __init__(self, source, name=None, *, size=None, budget=None):
+        if isinstance(source, (str, os.PathLike)):
+            path = os.fspath(source)
+            self._opener = lambda: open(path, "rb")
+            self._name = name or os.path.basename(path)
+            self._size = size if size is not None else os.path.getsize(path)
+        elif callable(source):
+            self._opener = source
+            self._name = name
+            self._size = size
+        else:
+            raise ValueError(f"{source=} is neither a path nor an opener")
+
+        self._budget = budget or DEFAULT_BUDGET
+        self._fileobj = None
+        self._pos = 0
+        if self._size is None:
+            # the encoder needs the length up front, so peek once
+            with self._open() as f:
+                self._size = super_len(f)
+            self._release()
+
+    name = property(lambda s: s._name)
+    size = property(lambda s: s._size)
+    len = property(lambda s: s._size - s._pos)
+    closed = property(lambda s: s._fileobj is None)
+
+    def __str__(self):
+        return f"<LazyFile name={self._name} size={self._size}>"
+
+    def __repr__(self):
+        return str(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def _open(self):
+        self._budget.acquire()
+        try:
+            return self._opener()
+        except BaseException:
+            self._budget.release()
+            raise
+
+    def _release(self):
+        self._budget.release()
+
+    def read(self, size=-1):
+        if self._pos >= self._size:
+            return b""
+        if self._fileobj is None:
+            self._fileobj = self._open()
+            if self._pos:
+                self._fileobj.seek(self._pos)
+
+        if size is None or size < 0 or size > self.len:
+            size = self.len
+        data = self._fileobj.read(size)
+        self._pos += len(data)
+        if not data and size:
+            self.close()
+            raise OSError(f"{self._name} shrank to {self._pos} bytes")
+        if self._pos >= self._size:
+            self.close()
+        return data
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += self._size
+        self._pos = max(0, min(pos, self._size))
+        if self._fileobj is not None:
+            if self._pos >= self._size:
+                self.close()
+            else:
+                self._fileobj.seek(self._pos)
+        return self._pos
+
+    def close(self):
+        if self._fileobj is not None:
+            try:
+                self._fileobj.close()
+            finally:
+                self._fileobj = None
+                self._release()
+
+
+def as_file(fileobj, name=None, *, budget=None):
+    # Plain strings are not taken for paths here, lest a file name passed
+    # in the wrong place gets uploaded as a file.
+    if callable(getattr(fileobj, "read", None)):
+        return fileobj
+    if isinstance(fileobj, os.PathLike) or callable(fileobj):
+        return LazyFile(fileobj, name, budget=budget)
+    raise ValueError(f"{fileobj=} is not an open file/stream")
@@ -0,0 +1,73 @@
+from requests_toolbelt.multipart import encoder
+import io
+import os
+import time
+
+
+class ReplayableMultipartEncoder:
+    # A MultipartEncoder can only be read once. This one remembers where its
+    # file fields started, and seek(0) rewinds them and builds a fresh
+    # encoder with the same boundary, so urllib3 can resend the body on a
+    # retry without it ever being held in memory as a whole.
+    #
+    # It also stands in for a MultipartEncoderMonitor: the callback gets
+    # this object, which has .bytes_read, .len and .encoder.
+
+    def __init__(self, fields, *, boundary=None, callback=None):
+        if hasattr(fields, "items"):
+            fields = fields.items()
+        self._fields = list(fields)
+        self._positions = []
+        for _, value in self._fields:
+            fileobj = value[1] if isinstance(value, tuple) else value
+            tell = getattr(fileobj, "tell", None)
+            if callable(tell) and callable(getattr(fileobj, "seek", None)):
+                self._positions.append((fileobj, tell()))
+            elif callable(getattr(fileobj, "read", None)):
+                self._positions.append((fileobj, None))
+
+        self.encoder = encoder.MultipartEncoder(
+            self._fields, boundary=boundary
+        )
+        self.callback = callback
+        self.bytes_read = 0
+        self.encode_seconds = 0.0
+
+    boundary_value = property(lambda s: s.encoder.boundary_value)
+    content_type = property(lambda s: s.encoder.content_type)
+    len = property(lambda s: s.encoder.len)
+
+    replayable = property(
+        lambda s: all(pos is not None for _, pos in s._positions)
+    )
+
+    def read(self, size=-1):
+        start = time.perf_counter()
+        data = self.encoder.read(size)
+        self.encode_seconds += time.perf_counter() - start
+        self.bytes_read += len(data)
+        if self.callback:
+            self.callback(self)
+        return data
+
+    def tell(self):
+        return self.bytes_read
+
+    def seek(self, pos, whence=os.SEEK_SET):
+        if whence != os.SEEK_SET or pos not in (0, self.bytes_read):
+            raise io.UnsupportedOperation("can only rewind to the start")
+        if pos == self.bytes_read:
+            return pos
+        if not self.replayable:
+            raise io.UnsupportedOperation("fields cannot be rewound")
+
+        for fileobj, start in self._positions:
+            fileobj.seek(start)
+        self.encoder = encoder.MultipartEncoder(
+            self._fields, boundary=self.boundary_value
+        )
+        self.bytes_read = 0
+        return 0
+
+    def to_string(self):
+        return self.read()
@@ -0,0 +1,41 @@
+import reprlib
+
+REDACTED = "********"
+SENSITIVE_KEYS = frozenset({"password", "token", "otp"})
+
+_repr = reprlib.Repr()
+_repr.maxstring = 120
+_repr.maxother = 120
+_repr.maxdict = 16
+_repr.maxlist = 16
+_repr.maxlevel = 3
+
+
+def redact(payload):
+    if isinstance(payload, dict):
+        return {
+            k: REDACTED if k in SENSITIVE_KEYS else redact(v)
+            for k, v in payload.items()
+        }
+    if isinstance(payload, (list, tuple)):
+        return type(payload)(redact(v) for v in payload)
+    return payload
+
+
+class LazyRepr:
+    # Defers the (redacted, truncated) repr until a handler actually
+    # formats the record, so disabled log levels never pay for it.
+
+    __slots__ = ("_payload",)
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def __str__(self):
+        return _repr.repr(redact(self._payload))
+
+    __repr__ = __str__
+
+
+def short_repr(payload):
+    return LazyRepr(payload)
@@ -0,0 +1,286 @@
+from attrs import define, evolve, Factory
+import logging
+import os
+import pathlib
+import threading
+import time
+
+from .metadata import UploadMetadata
+from .util.batching import batched_by_size
+
+try:
+    import pyinotify
+except ImportError:
+    pyinotify = None
+
+logger = logging.getLogger(__name__)
+
+
+def ignore_temporary(path):
+    # dot files and partial downloads are still being written
+    name = os.path.basename(path)
+    return name.startswith(".") or name.endswith((".part", ".tmp", "~"))
+
+
+@define(kw_only=True)
+class BatchResult:
+    paths: list = Factory(list)
+    response: (dict, type(None)) = None
+    exception: (BaseException, type(None)) = None
+
+    ok = property(lambda s: s.exception is None)
+
+
+class WatchIngest:
+    # A file is settled once closed after writing (or moved in) and then
+    # left alone for quiet seconds. Settled files are uploaded in batches
+    # once a batch is full, or once the oldest of them waited max_wait.
+
+    DEFAULT_QUIET = 2.0
+    DEFAULT_MAX_WAIT = 10.0
+    DEFAULT_MAX_BATCH_FILES = 50
+    DEFAULT_MAX_BATCH_BYTES = 64 * 1024 * 1024
+    DEFAULT_RETRY_DELAY = 60.0
+    POLL_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        api,
+        directories,
+        *,
+        source=None,
+        metadata=None,
+        transfer_cb=None,
+        quiet=DEFAULT_QUIET,
+        max_wait=DEFAULT_MAX_WAIT,
+        max_batch_files=DEFAULT_MAX_BATCH_FILES,
+        max_batch_bytes=DEFAULT_MAX_BATCH_BYTES,
+        retry_delay=DEFAULT_RETRY_DELAY,
+        done_dir=None,
+        delete=False,
+        recursive=True,
+        ignore=ignore_temporary,
+        clock=time.monotonic,
+    ):
+        # Files left in place would be uploaded again by the scan of the
+        # next run, so uploaded files are either moved or deleted.
+        if done_dir is not None and delete:
+            raise ValueError("Cannot both move and delete uploaded files")
+        if done_dir is None and not delete:
+            raise ValueError("Need done_dir or delete for uploaded files")
+        self._api = api
+        self._directories = [os.path.abspath(d) for d in directories]
+        self._source = source
+        # Without meta[multiple], Docspell would turn each batch into a
+        # single item with many attachments.
+        self._metadata = evolve(metadata or UploadMetadata(), multiple=True)
+        self._transfer_cb = transfer_cb
+        self._quiet = quiet
+        self._max_wait = max_wait
+        self._max_batch_files = max_batch_files
+        self._max_batch_bytes = max_batch_bytes
+        self._retry_delay = retry_delay
+        self._done_dir = done_dir and os.path.abspath(done_dir)
+        self._delete = delete
+        self._recursive = recursive
+        self._ignore = ignore
+        self._clock = clock
+        # path: when it was last written to, or when to retry it
+        self._pending = {}
+        # (path, when it settled), oldest first
+        self._settled = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    directories = property(lambda s: list(s._directories))
+    pending = property(lambda s: len(s._pending) + len(s._settled))
+
+    def __str__(self):
+        return (
+            f"<WatchIngest directories={self._directories} "
+            f"pending={self.pending}>"
+        )
+
+    def __repr__(self):
+        return str(self)
+
+    def notice(self, path, *, when=None):
+        path = os.path.abspath(path)
+        if self._ignore and self._ignore(path):
+            return
+        if self._done_dir and path.startswith(self._done_dir + os.sep):
+            return
+        with self._lock:
+            self._settled = [(p, t) for p, t in self._settled if p != path]
+            self._pending[path] = self._clock() if when is None else when
+
+    def touch(self, path):
+        # a write to a file already noticed restarts its quiet period
+        path = os.path.abspath(path)
+        with self._lock:
+            if path in self._pending:
+                self._pending[path] = self._clock()
+
+    def forget(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            self._pending.pop(path, None)
+            self._settled = [(p, t) for p, t in self._settled if p != path]
+
+    def scan(self):
+        # picks up what arrived while nobody was watching
+        for directory in self._directories:
+            for root, dirs, files in os.walk(directory):
+                if not self._recursive:
+                    dirs.clear()
+                if self._done_dir:
+                    dirs[:] = [
+                        d
+                        for d in dirs
+                        if os.path.join(root, d) != self._done_dir
+                    ]
+                for name in files:
+                    self.notice(os.path.join(root, name))
+
+    def _settle(self, now):
+        with self._lock:
+            for path, last in list(self._pending.items()):
+                if now - last >= self._quiet:
+                    del self._pending[path]
+                    self._settled.append((path, now))
+
+    def _next_batch(self, now, *, force=False):
+        with self._lock:
+            settled = [(p, t) for p, t in self._settled if os.path.exists(p)]
+            self._settled = settled
+            if not settled:
+                return None
+            batch = next(
+                batched_by_size(
+                    settled,
+                    max_bytes=self._max_batch_bytes,
+                    max_files=self._max_batch_files,
+                    size=lambda item: os.path.getsize(item[0]),
+                )
+            )
+            full = len(batch) < len(settled) or (
+                len(batch) == self._max_batch_files
+            )
+            if not (force or full or now - settled[0][1] >= self._max_wait):
+                return None
+            del settled[: len(batch)]
+            return [path for path, _ in batch]
+
+    def _upload(self, paths):
+        files = [
+            (pathlib.Path(path), os.path.basename(path)) for path in paths
+        ]
+        kwargs = dict(transfer_cb=self._transfer_cb, metadata=self._metadata)
+        if self._source:
+            return self._api.upload_multiple_via_source(
+                self._source, files, **kwargs
+            )
+        return self._api.upload_multiple(files, **kwargs)
+
+    def _done_path(self, path):
+        for directory in self._directories:
+            if path.startswith(directory + os.sep):
+                relpath = os.path.relpath(path, directory)
+                break
+        else:
+            relpath = os.path.basename(path)
+        target = os.path.join(self._done_dir, relpath)
+        base, ext = os.path.splitext(target)
+        count = 0
+        while os.path.exists(target):
+            count += 1
+            target = f"{base}.{count}{ext}"
+        return target
+
+    def _dispose(self, path):
+        try:
+            if self._delete:
+                os.unlink(path)
+            elif self._done_dir:
+                target = self._done_path(path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(path, target)
+        except OSError as e:
+            logger.warning(f"Could not clean up {path}: {e!r}")
+
+    def process(self, *, force=False):
+        # Uploads whatever batches are due, and returns their BatchResults;
+        # with force, does not wait for batches to fill up.
+        now = self._clock()
+        self._settle(now)
+        results = []
+        while (paths := self._next_batch(now, force=force)) is not None:
+            result = BatchResult(paths=paths)
+            try:
+                result.response = self._upload(paths)
+                logger.info(f"Uploaded {len(paths)} files")
+                for path in paths:
+                    self._dispose(path)
+            except Exception as e:
+                logger.warning(f"Uploading {len(paths)} files failed: {e!r}")
+                result.exception = e
+                for path in paths:
+                    # retry after the delay, and the quiet period
+                    self.notice(path, when=now + self._retry_delay)
+            results.append(result)
+        return results
+
+    def _handler(self):
+        watch = self
+
+        class Handler(pyinotify.ProcessEvent):
+            def process_IN_CLOSE_WRITE(self, event):
+                watch.notice(event.pathname)
+
+            def process_IN_MOVED_TO(self, event):
+                if not event.dir:
+                    watch.notice(event.pathname)
+
+            def process_IN_MODIFY(self, event):
+                watch.touch(event.pathname)
+
+            def process_IN_DELETE(self, event):
+                watch.forget(event.pathname)
+
+            def process_IN_MOVED_FROM(self, event):
+                watch.forget(event.pathname)
+
+        return Handler()
+
+    def run(self):
+        if pyinotify is None:
+            raise ImportError("WatchIngest.run requires pyinotify")
+        wm = pyinotify.WatchManager()
+        mask = (
+            pyinotify.IN_CLOSE_WRITE
+            | pyinotify.IN_MOVED_TO
+            | pyinotify.IN_MODIFY
+            | pyinotify.IN_DELETE
+            | pyinotify.IN_MOVED_FROM
+        )
+        notifier = pyinotify.Notifier(
+            wm, self._handler(), timeout=int(WatchIngest.POLL_INTERVAL * 1000)
+        )
+        try:
+            for directory in self._directories:
+                wm.add_watch(
+                    directory, mask, rec=self._recursive, auto_add=True
+                )
+            self.scan()
+            logger.info(f"Watching {', '.join(self._directories)}")
+            while not self._stopped.is_set():
+                if notifier.check_events():
+                    notifier.read_events()
+                    notifier.process_events()
+                self.process()
+            self.process(force=True)
+        finally:
+            notifier.stop()
+
+    def stop(self):
+        self._stopped.set()
@@ -1,5 +1,6 @@
 import pytest
 from expecter import expect
+import requests
 import requests_mock
 import functools
 import os
@@ -10,6 +11,12 @@ from collections import OrderedDict
 import hashlib
 from operator import itemgetter
 import datetime
+import gc
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from requests.adapters import Retry
 
 from pydocspell import APIWrapper
 
@@ -115,6 +122,7 @@ def describe_constructor():
         ver = 5
         api = APIWrapper(BASEURL, version=ver)
         expect(api.version) == ver
+        expect(api.apiurl) == APIWrapper.make_api_url(BASEURL, version=ver)
 
     def with_api_version_in_url(caplog):
         baseurl = f"{BASEURL}/api/v2"
@@ -136,6 +144,66 @@ def describe_context_manager():
         assert wrapper.state == APIWrapper.State.SHUTDOWN
 
 
+@pytest.mark.construct
+def describe_thread_safety():
+    def sessions_per_thread_share_a_pool(api):
+        sessions = [api._session]
+        thread = threading.Thread(target=lambda: sessions.append(api._session))
+        thread.start()
+        thread.join()
+        main, other = sessions
+        expect(main is other) is False
+        expect(main is api._session) is True
+        url = api.make_endpoint_url(BASEURL, "foo")
+        expect(main.get_adapter(url) is other.get_adapter(url)) is True
+        expect(main.cookies is other.cookies) is True
+
+    def sessions_go_with_their_threads(api):
+        for _ in range(20):
+            thread = threading.Thread(target=lambda: api._session)
+            thread.start()
+            thread.join()
+        gc.collect()
+        expect(len(api._sessions)) <= 1
+
+    def pool_settings():
+        api = APIWrapper(BASEURL, pool_maxsize=32, pool_block=True)
+        adapter = api._session.get_adapter(BASEURL)
+        expect(adapter.poolmanager.connection_pool_kw["maxsize"]) == 32
+        expect(adapter.poolmanager.connection_pool_kw["block"]) is True
+
+    def keepalive_settings():
+        api = APIWrapper(BASEURL, keepalive=60)
+        adapter = api._session.get_adapter(BASEURL)
+        options = adapter.poolmanager.connection_pool_kw["socket_options"]
+        expect(options).contains((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+    def concurrent_requests(authenticated_api):
+        api, _ = authenticated_api
+        errors = []
+
+        def confirm(itemid):
+            try:
+                api.confirm_item(itemid)
+            except Exception as e:
+                errors.append(e)
+
+        with requests_mock.Mocker() as mocker:
+            mocker.post(requests_mock.ANY, text='{"success": true}')
+            threads = [
+                threading.Thread(target=confirm, args=(f"item{i}",))
+                for i in range(16)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            expect(errors) == []
+            for request in mocker.request_history:
+                token = request.headers[APIWrapper.AUTH_HEADER]
+                expect(token) == api.auth.token
+
+
 @pytest.mark.util
 def describe_making_urls():
     def apiurl_without_version():
@@ -168,6 +236,72 @@ def describe_open_api():
     def get_docspell_version(params, returns, api):
         expect(api.get_docspell_version().get("version")) == returns["version"]
 
+
+@pytest.mark.api_generic
+def describe_request_logging():
+    @mock_me(
+        "POST",
+        "open/auth/login",
+        returns={"success": True, "token": MOCK_SESSION_KEY},
+    )
+    def redacts_credentials(params, returns, api, caplog):
+        caplog.set_level("DEBUG", logger="pydocspell.apiwrapper")
+        api.login(**CREDENTIALS)
+        expect(caplog.text).contains("open/auth/login")
+        if I_AM_BEING_MOCKED:
+            expect(caplog.text).does_not_contain(MOCK_SESSION_KEY)
+        expect(caplog.records[0].method) == "POST"
+
+
+@pytest.mark.api_generic
+def describe_streaming_responses():
+    QUEUE_STATE = {
+        "progress": [{"id": "j1"}],
+        "queued": [{"id": "j2"}, {"id": "j3"}],
+        "completed": [{"id": "j4"}],
+    }
+
+    @pytest.fixture(params=[True, False], ids=["incremental", "parsed"])
+    def streaming_api(request):
+        return APIWrapper(BASEURL, incremental_json=request.param)
+
+    def job_queue(streaming_api):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{BASEURL}/api/v1/sec/queue/state", json=QUEUE_STATE)
+            jobs = list(streaming_api.iter_job_queue("progress", "queued"))
+            expect(jobs) == [
+                ("progress", {"id": "j1"}),
+                ("queued", {"id": "j2"}),
+                ("queued", {"id": "j3"}),
+            ]
+            expect(len(list(streaming_api.iter_job_queue()))) == 4
+
+    def item_attachments(streaming_api):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(
+                f"{BASEURL}/api/v1/sec/item/abc",
+                json={"id": "abc", "attachments": [{"id": "a1"}]},
+            )
+            attachments = list(streaming_api.iter_item_attachments("abc"))
+            expect(attachments) == [{"id": "a1"}]
+
+    def empty_response(streaming_api):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{BASEURL}/api/v1/sec/item/abc", status_code=404)
+            with pytest.raises(APIWrapper.EmptyResponse):
+                list(streaming_api.iter_item_attachments("abc"))
+
+    def does_not_buffer_the_body(api):
+        body = BytesIO(b'{"attachments": [{"id": "a1"}, {"id": "a2"}]}')
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{BASEURL}/api/v1/sec/item/abc", body=body)
+            attachments = api.iter_item_attachments("abc")
+            expect(next(attachments)) == {"id": "a1"}
+            expect(body.closed) is False
+            expect(list(attachments)) == [{"id": "a2"}]
+            expect(body.closed) is True
+
+
 @pytest.mark.api_generic
 def describe_error_handling():
     @mock_me(
@@ -176,9 +310,7 @@ def describe_error_handling():
         apiurl=BASEURL,
         returns_fn=lambda s: "",
     )
-    def when_empty_response_received(
-        params, returns, api
-    ):
+    def when_empty_response_received(params, returns, api):
         with pytest.raises(APIWrapper.EmptyResponse):
             api.get_docspell_version().get("version")
 
@@ -246,6 +378,20 @@ def describe_api_upload():
         expect(resp["success"]) is returns["success"]
         expect(resp["message"]) == returns["message"]
 
+    @mock_me(
+        "POST",
+        "sec/upload/item",
+        returns={"success": True, "message": "Files submitted."},
+    )
+    def multiple_paths(params, returns, authenticated_api, tmp_path):
+        api, _ = authenticated_api
+        paths = []
+        for name in ("one", "two"):
+            paths.append(tmp_path / name)
+            paths[-1].write_bytes(ONEPIXELFILE)
+        resp = api.upload_multiple([(path, None) for path in paths])
+        expect(resp["success"]) is returns["success"]
+
     def when_nonfile_provided(api):
         with pytest.raises(ValueError):
             api.upload_via_source("source", "string")
@@ -358,6 +504,106 @@ def describe_api_upload():
         expect(resp["success"]) is returns["success"]
 
 
+@pytest.mark.api_files
+def describe_upload_retries():
+    @pytest.fixture
+    def flaky_server():
+        # fails the first request with the status at the front of statuses
+        bodies, statuses = [], [503]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                bodies.append(self.rfile.read(length))
+                if len(bodies) == 1:
+                    self.send_response(statuses[0])
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                reply = b'{"success": true}'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_port}", bodies, statuses
+        server.shutdown()
+        server.server_close()
+
+    def replays_the_whole_body(flaky_server, tmp_path):
+        baseurl, bodies, _ = flaky_server
+        retries = Retry(total=2, backoff_factor=0, status_forcelist=[503])
+        api = APIWrapper(baseurl, retries=retries)
+        path = tmp_path / "upload"
+        path.write_bytes(b"x" * 100_000)
+        with open(path, "rb") as f:
+            resp = api.upload(f)
+        expect(resp["success"]) is True
+        expect(len(bodies)) == 2
+        expect(bodies[0]) == bodies[1]
+        expect(bodies[1]).contains(b"x" * 100_000)
+
+    @pytest.fixture
+    def slow_server():
+        bodies = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                bodies.append(self.rfile.read(length))
+                time.sleep(0.5)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"http://127.0.0.1:{server.server_port}", bodies
+        server.shutdown()
+        server.server_close()
+
+    def read_timeouts_are_not_retried(slow_server):
+        baseurl, bodies = slow_server
+        retries = Retry(total=2, backoff_factor=0, status_forcelist=[503])
+        api = APIWrapper(baseurl, retries=retries, timeout=(1, 0.1))
+        with pytest.raises(requests.exceptions.RequestException):
+            api.upload(BytesIO(b"x"), "x.pdf")
+        expect(len(bodies)) == 1
+
+    def gateway_errors_are_not_retried(flaky_server):
+        # the upstream may have taken the upload before the proxy gave up
+        baseurl, bodies, statuses = flaky_server
+        for status in (502, 504):
+            bodies.clear()
+            statuses[:] = [status]
+            retries = Retry(
+                total=2, backoff_factor=0, status_forcelist=[502, 503, 504]
+            )
+            api = APIWrapper(baseurl, retries=retries)
+            with pytest.raises(APIWrapper.EmptyResponse):
+                api.upload(BytesIO(b"x"), "x.pdf")
+            expect(len(bodies)) == 1
+
+    def other_posts_are_not_retried(flaky_server):
+        baseurl, bodies, _ = flaky_server
+        retries = Retry(total=2, backoff_factor=0, status_forcelist=[503])
+        api = APIWrapper(baseurl, retries=retries)
+        with pytest.raises(APIWrapper.EmptyResponse):
+            api.confirm_item("id")
+        expect(len(bodies)) == 1
+
+
 @pytest.mark.api_metadata
 def describe_api_metadata():
     @mock_me(
@@ -0,0 +1,166 @@
+import pytest
+from expecter import expect
+import asyncio
+import json
+from io import BytesIO
+
+import httpx
+
+from pydocspell import AsyncAPIWrapper
+from pydocspell.util.lazyfile import FileDescriptorBudget
+
+BASEURL = "http://docspell.example.org"
+
+
+def make_api(handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncAPIWrapper(BASEURL, client=client)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.mark.async_api
+def describe_async_api():
+    def apiurl_is_derived_like_the_sync_wrapper():
+        api = make_api(lambda req: httpx.Response(200, json={}))
+        expect(api.apiurl) == f"{BASEURL}/api/v1"
+        expect(api.state) == AsyncAPIWrapper.State.INIT
+
+    def get_docspell_version():
+        def handler(req):
+            expect(str(req.url)) == f"{BASEURL}/api/info/version"
+            return httpx.Response(200, json={"version": "0.40.0"})
+
+        async def main():
+            async with make_api(handler) as api:
+                return await api.get_docspell_version()
+
+        expect(run(main())["version"]) == "0.40.0"
+
+    def when_empty_response_received():
+        async def main():
+            async with make_api(lambda req: httpx.Response(200)) as api:
+                await api.get_docspell_version()
+
+        with pytest.raises(AsyncAPIWrapper.EmptyResponse):
+            run(main())
+
+    def when_not_logged_in():
+        async def main():
+            async with make_api(lambda req: httpx.Response(403)) as api:
+                await api.confirm_item("id")
+
+        with pytest.raises(AsyncAPIWrapper.NotAuthenticated):
+            run(main())
+
+    def login_and_logout_on_exit():
+        calls = []
+
+        def handler(req):
+            calls.append(req.url.path)
+            if req.url.path.endswith("login"):
+                body = json.loads(req.content)
+                expect(body["account"]) == "coll/user"
+                return httpx.Response(200, json={"success": True})
+            return httpx.Response(200)
+
+        async def main():
+            async with make_api(handler) as api:
+                await api.login("coll", "user", "pass")
+                expect(api.state) == AsyncAPIWrapper.State.LOGGEDIN
+            return api
+
+        api = run(main())
+        expect(api.state) == AsyncAPIWrapper.State.SHUTDOWN
+        expect(calls) == ["/api/v1/open/auth/login", "/api/v1/sec/auth/logout"]
+
+    def multiple_via_source():
+        seen = {}
+
+        def handler(req):
+            seen["body"] = req.read()
+            seen["length"] = req.headers["content-length"]
+            return httpx.Response(200, json={"success": True})
+
+        async def main():
+            async with make_api(handler) as api:
+                files = [(BytesIO(b"one"), "one"), (BytesIO(b"two"), "two")]
+                return await api.upload_multiple_via_source("src", files)
+
+        expect(run(main())["success"]) is True
+        expect(int(seen["length"])) == len(seen["body"])
+        expect(seen["body"]).contains(b'filename="two"')
+
+    def many_uploads_in_flight():
+        async def handler(req):
+            await req.aread()
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"success": True})
+
+        async def main():
+            async with make_api(handler) as api:
+                return await asyncio.gather(
+                    *(api.upload(BytesIO(b"x"), f"{i}") for i in range(50))
+                )
+
+        expect(len(run(main()))) == 50
+
+    def uploads_wait_for_the_file_budget(tmp_path):
+        paths = []
+        # more of them than the default executor has threads
+        for i in range(64):
+            path = tmp_path / f"{i}.pdf"
+            path.write_bytes(b"x" * 64)
+            paths.append(path)
+
+        async def handler(req):
+            async for _ in req.stream:
+                await asyncio.sleep(0.001)
+            return httpx.Response(200, json={"success": True})
+
+        async def main():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            api = AsyncAPIWrapper(
+                BASEURL,
+                client=client,
+                chunk_size=8,
+                fd_budget=FileDescriptorBudget(1),
+            )
+            async with api:
+                return await asyncio.wait_for(
+                    asyncio.gather(*(api.upload(p) for p in paths)), 10
+                )
+
+        expect(len(run(main()))) == 64
+
+    def openers_wait_for_the_file_budget():
+        async def handler(req):
+            async for _ in req.stream:
+                await asyncio.sleep(0.001)
+            return httpx.Response(200, json={"success": True})
+
+        def opener():
+            return BytesIO(b"x" * 64)
+
+        async def main():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            api = AsyncAPIWrapper(
+                BASEURL,
+                client=client,
+                chunk_size=8,
+                fd_budget=FileDescriptorBudget(1),
+            )
+
+            async def upload(i):
+                # start while the uploads before are still streaming
+                await asyncio.sleep(i * 0.002)
+                return await api.upload(opener, f"{i}.pdf")
+
+            async with api:
+                return await asyncio.wait_for(
+                    asyncio.gather(*(upload(i) for i in range(8))), 10
+                )
+
+        expect(len(run(main()))) == 8
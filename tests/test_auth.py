@@ -0,0 +1,166 @@
+import pytest
+from expecter import expect
+import json
+import time
+import types
+import requests_mock
+
+from pydocspell import (
+    APIWrapper,
+    FileTokenStore,
+    KeyringTokenStore,
+    MemoryTokenStore,
+)
+from pydocspell import auth
+from pydocspell.auth import AuthToken, TokenStore
+
+BASEURL = "http://docspell.example.org"
+APIURL = f"{BASEURL}/api/v1"
+ACCOUNT = "coll/user"
+
+
+def auth_result(token, valid_ms=300_000):
+    return {
+        "collective": "coll",
+        "user": "user",
+        "success": True,
+        "message": "Login successful",
+        "token": token,
+        "validMs": valid_ms,
+    }
+
+
+@pytest.fixture
+def mocker():
+    with requests_mock.Mocker() as mocker:
+        yield mocker
+
+
+@pytest.mark.auth
+def describe_token_stores():
+    def file_store_round_trip(tmp_path):
+        path = tmp_path / "tokens.json"
+        token = AuthToken(account=ACCOUNT, token="t", valid_until=1e10)
+        FileTokenStore(path).save(token)
+        expect(FileTokenStore(path).load(ACCOUNT)) == token
+        expect(path.stat().st_mode & 0o077) == 0
+        FileTokenStore(path).clear(ACCOUNT)
+        expect(FileTokenStore(path).load(ACCOUNT)) is None
+
+    def file_store_ignores_corruption(tmp_path):
+        path = tmp_path / "tokens.json"
+        path.write_text("{")
+        expect(FileTokenStore(path).load(ACCOUNT)) is None
+
+    def stores_are_abstract():
+        with expect.raises(TypeError):
+            TokenStore()
+
+    def keyring_store_round_trip(monkeypatch):
+        class PasswordDeleteError(Exception):
+            pass
+
+        passwords = {}
+
+        def delete_password(service, account):
+            if (service, account) not in passwords:
+                raise PasswordDeleteError(account)
+            del passwords[service, account]
+
+        fake = types.SimpleNamespace(
+            get_password=lambda *key: passwords.get(key),
+            set_password=lambda *args: passwords.__setitem__(
+                args[:2], args[2]
+            ),
+            delete_password=delete_password,
+            errors=types.SimpleNamespace(
+                PasswordDeleteError=PasswordDeleteError
+            ),
+        )
+        monkeypatch.setattr(auth, "keyring", fake)
+        store = KeyringTokenStore("svc")
+        token = AuthToken(account=ACCOUNT, token="t", valid_until=1e10)
+        store.save(token)
+        expect(list(passwords)) == [("svc", ACCOUNT)]
+        expect(store.load(ACCOUNT)) == token
+        store.clear(ACCOUNT)
+        store.clear(ACCOUNT)
+        expect(store.load(ACCOUNT)) is None
+
+    def keyring_store_needs_keyring(monkeypatch):
+        monkeypatch.setattr(auth, "keyring", None)
+        with expect.raises(ImportError):
+            KeyringTokenStore()
+
+
+@pytest.mark.auth
+def describe_sessions():
+    def are_stored_after_login(mocker):
+        mocker.post(f"{APIURL}/open/auth/login", json=auth_result("t1"))
+        store = MemoryTokenStore()
+        api = APIWrapper(BASEURL, token_store=store, auto_refresh=False)
+        api.login("coll", "user", "pass")
+        expect(store.load(ACCOUNT).token) == "t1"
+        expect(store.load(ACCOUNT).remaining > 290) is True
+
+    def are_reused_without_logging_in(mocker):
+        store = MemoryTokenStore()
+        store.save(AuthToken.from_auth_result(ACCOUNT, auth_result("t1")))
+        mocker.get(f"{APIURL}/sec/queue/state", json={})
+        api = APIWrapper(BASEURL, token_store=store, auto_refresh=False)
+        api.login("coll", "user", "pass")
+        api.get_job_queue()
+        expect(mocker.call_count) == 1
+        expect(mocker.last_request.headers[APIWrapper.AUTH_HEADER]) == "t1"
+
+    def are_not_reused_when_about_to_expire(mocker):
+        store = MemoryTokenStore()
+        store.save(AuthToken.from_auth_result(ACCOUNT, auth_result("t1", 1)))
+        mocker.post(f"{APIURL}/open/auth/login", json=auth_result("t2"))
+        api = APIWrapper(BASEURL, token_store=store, auto_refresh=False)
+        api.login("coll", "user", "pass")
+        expect(api.auth.token) == "t2"
+
+    def are_renewed_on_expiry(mocker):
+        mocker.post(
+            f"{APIURL}/open/auth/login",
+            [{"json": auth_result("t1")}, {"json": auth_result("t2")}],
+        )
+        mocker.post(
+            f"{APIURL}/sec/item/abc/confirm",
+            [{"status_code": 401}, {"json": {"success": True}}],
+        )
+        api = APIWrapper(BASEURL, auto_refresh=False)
+        api.login("coll", "user", "pass")
+        expect(api.confirm_item("abc")["success"]) is True
+        expect(mocker.last_request.headers[APIWrapper.AUTH_HEADER]) == "t2"
+
+    def fail_when_renewal_does_not_help(mocker):
+        mocker.post(f"{APIURL}/open/auth/login", json=auth_result("t1"))
+        mocker.post(f"{APIURL}/sec/item/abc/confirm", status_code=401)
+        api = APIWrapper(BASEURL, auto_refresh=False)
+        api.login("coll", "user", "pass")
+        with pytest.raises(APIWrapper.NotAuthenticated):
+            api.confirm_item("abc")
+
+    def are_refreshed_in_the_background(mocker):
+        mocker.post(f"{APIURL}/open/auth/login", json=auth_result("t1", 50))
+        mocker.post(f"{APIURL}/sec/auth/session", json=auth_result("t2"))
+        mocker.post(f"{APIURL}/sec/auth/logout", text="{}")
+        api = APIWrapper(BASEURL)
+        api.login("coll", "user", "pass")
+        deadline = time.monotonic() + 2
+        while api.auth.token != "t2" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        expect(api.auth.token) == "t2"
+        expect(mocker.last_request.headers[APIWrapper.AUTH_HEADER]) == "t1"
+        api.logout()
+
+    def outlive_the_context_when_stored(mocker, tmp_path):
+        mocker.post(f"{APIURL}/open/auth/login", json=auth_result("t1"))
+        store = FileTokenStore(tmp_path / "tokens.json")
+        with APIWrapper(BASEURL, token_store=store) as api:
+            api.login("coll", "user", "pass")
+        expect(mocker.call_count) == 1
+        stored = json.loads((tmp_path / "tokens.json").read_text())
+        expect(stored[ACCOUNT]["token"]) == "t1"
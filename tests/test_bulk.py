@@ -0,0 +1,141 @@
+import pytest
+from expecter import expect
+import threading
+import time
+from io import BytesIO
+
+from pydocspell import APIWrapper, BulkUploader
+
+BASEURL = "http://docspell.example.org"
+
+
+class RecordingUpload:
+    def __init__(self, *, delay=0, fail=()):
+        self._lock = threading.Lock()
+        self._delay = delay
+        self._fail = fail
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    def __call__(self, endpoint, files, *, transfer_cb=None, metadata=None):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            self.calls.append(([name for _, name in files], metadata))
+            if len(files) > 1:
+                return {"success": True, "endpoint": endpoint}
+            ((fileobj, name),) = files
+            time.sleep(self._delay(name) if callable(self._delay) else 0)
+            if name in self._fail:
+                raise RuntimeError(name)
+            return {"success": True, "endpoint": endpoint, "name": name}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def api():
+    return APIWrapper(BASEURL)
+
+
+def files(n):
+    for i in range(n):
+        yield BytesIO(b"x"), f"{i}"
+
+
+@pytest.mark.bulk
+def describe_bulk_uploader():
+    def uploads_every_file(monkeypatch, api):
+        monkeypatch.setattr(api, "_upload_multiple", RecordingUpload())
+        results = list(BulkUploader(api).upload(files(20)))
+        expect(sorted(r.index for r in results)) == list(range(20))
+        expect(all(r.ok for r in results)) is True
+
+    def via_source(monkeypatch, api):
+        monkeypatch.setattr(api, "_upload_multiple", RecordingUpload())
+        (result,) = BulkUploader(api, source="src").upload(files(1))
+        expect(result.response["endpoint"]) == "open/upload/item/src"
+
+    def reports_failures_per_file(monkeypatch, api):
+        upload = RecordingUpload(fail=("3",))
+        monkeypatch.setattr(api, "_upload_multiple", upload)
+        results = list(BulkUploader(api).upload(files(5)))
+        (failed,) = [r for r in results if not r.ok]
+        expect(failed.name) == "3"
+        expect(isinstance(failed.exception, RuntimeError)) is True
+
+    def streams_in_order(monkeypatch, api):
+        upload = RecordingUpload(delay=lambda name: 0.01 * (10 - int(name)))
+        monkeypatch.setattr(api, "_upload_multiple", upload)
+        uploader = BulkUploader(api, workers=4, ordered=True)
+        results = list(uploader.upload(files(10)))
+        expect([r.index for r in results]) == list(range(10))
+
+    def bounds_work_in_flight(monkeypatch, api):
+        upload = RecordingUpload(delay=lambda name: 0.005)
+        monkeypatch.setattr(api, "_upload_multiple", upload)
+        pulled = []
+
+        def source():
+            for fnt in files(30):
+                pulled.append(fnt)
+                yield fnt
+
+        uploader = BulkUploader(api, workers=2, max_in_flight=3)
+        results = uploader.upload(source())
+        next(results)
+        expect(len(pulled) <= 4) is True
+        expect(len(list(results))) == 29
+        expect(upload.max_in_flight) == 2
+
+    def rejects_bad_limits(api):
+        with pytest.raises(ValueError):
+            BulkUploader(api, workers=0)
+        with pytest.raises(ValueError):
+            BulkUploader(api, workers=4, max_in_flight=2)
+
+    def batches_by_size_and_count(monkeypatch, api):
+        upload = RecordingUpload()
+        monkeypatch.setattr(api, "_upload_multiple", upload)
+        sizes = (3, 3, 3, 10, 1, 1, 1)
+        files = [(BytesIO(b"x" * n), f"{i}") for i, n in enumerate(sizes)]
+        uploader = BulkUploader(
+            api, workers=1, max_batch_bytes=6, max_batch_files=2
+        )
+        results = list(uploader.upload(files))
+        expect(len(results)) == 7
+        expect([names for names, _ in upload.calls]) == [
+            ["0", "1"],
+            ["2"],
+            ["3"],
+            ["4", "5"],
+            ["6"],
+        ]
+        expect(all(meta.multiple for _, meta in upload.calls)) is True
+
+    def batch_failures_fail_every_file(monkeypatch, api):
+        def upload(endpoint, files, *, transfer_cb=None, metadata=None):
+            raise RuntimeError("too large")
+
+        monkeypatch.setattr(api, "_upload_multiple", upload)
+        uploader = BulkUploader(api, max_batch_files=3)
+        results = list(uploader.upload(files(3)))
+        expect([r.ok for r in results]) == [False, False, False]
+
+    def reports_missing_files_when_batching(monkeypatch, api, tmp_path):
+        upload = RecordingUpload()
+        monkeypatch.setattr(api, "_upload_multiple", upload)
+        existing = tmp_path / "existing.pdf"
+        existing.write_bytes(b"x")
+        paths = [existing, tmp_path / "missing.pdf", existing]
+        uploader = BulkUploader(api, max_batch_files=10, ordered=True)
+        results = list(uploader.upload(paths))
+        expect([r.ok for r in results]) == [True, False, True]
+        expect(isinstance(results[1].exception, FileNotFoundError)) is True
+        expect([names for names, _ in upload.calls]) == [
+            ["existing.pdf"],
+            ["existing.pdf"],
+        ]
@@ -0,0 +1,145 @@
+import pytest
+from expecter import expect
+import datetime
+import requests_mock
+
+from pydocspell import APIWrapper, ResponseCache
+
+BASEURL = "http://docspell.example.org"
+APIURL = f"{BASEURL}/api/v1"
+TAGS = {"count": 1, "items": [{"id": "t1", "name": "invoice"}]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("pydocspell.cache.time.monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def api():
+    return APIWrapper(BASEURL, cache=ResponseCache(maxsize=8, ttl=60))
+
+
+@pytest.mark.cache
+def describe_response_cache():
+    def evicts_least_recently_used():
+        cache = ResponseCache(maxsize=2)
+        for url in ("a", "b"):
+            cache.put(ResponseCache.key(url), url)
+        cache.get(ResponseCache.key("a"))
+        cache.put(ResponseCache.key("c"), "c")
+        expect(cache.get(ResponseCache.key("b"))) is None
+        expect(cache.get(ResponseCache.key("a")).value) == "a"
+
+    def expires_after_ttl(clock):
+        cache = ResponseCache(ttl=10)
+        entry = cache.put(ResponseCache.key("a"), "a")
+        expect(entry.fresh) is True
+        clock.now += 11
+        expect(entry.fresh) is False
+        cache.refresh(entry)
+        expect(entry.fresh) is True
+
+    def keys_by_params():
+        one = ResponseCache.key("a", {"q": "x", "full": True})
+        two = ResponseCache.key("a", {"full": True, "q": "x"})
+        expect(one) == two
+        expect(one) != ResponseCache.key("a")
+
+    def invalidates_by_prefix():
+        cache = ResponseCache()
+        for url in ("x/item/a", "x/item/a/b", "x/item/ab", "x/tag"):
+            cache.put(ResponseCache.key(url), url)
+        cache.invalidate("x/item/a")
+        expect(len(cache)) == 2
+        cache.invalidate()
+        expect(len(cache)) == 0
+
+
+@pytest.mark.cache
+def describe_cached_requests():
+    def serves_fresh_responses_from_cache(api):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{APIURL}/sec/tag", json=TAGS)
+            expect(api.get_tags()) == TAGS
+            expect(api.get_tags()) == TAGS
+            expect(mocker.call_count) == 1
+            api.get_tags("inv")
+            expect(mocker.call_count) == 2
+
+    def hands_out_copies(api):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{APIURL}/sec/tag", json=TAGS)
+            api.get_tags()["items"].clear()
+            expect(api.get_tags()) == TAGS
+
+    def revalidates_stale_responses(api, clock):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(
+                f"{APIURL}/sec/folder",
+                json={"items": []},
+                headers={"ETag": '"f1"'},
+            )
+            api.get_folders()
+            clock.now += 61
+            mocker.get(f"{APIURL}/sec/folder", status_code=304)
+            expect(api.get_folders()) == {"items": []}
+            expect(mocker.last_request.headers["If-None-Match"]) == '"f1"'
+            expect(mocker.call_count) == 2
+            # and fresh again
+            api.get_folders()
+            expect(mocker.call_count) == 2
+
+    def refetches_without_validators(api, clock):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{APIURL}/sec/organization", json={"items": []})
+            api.get_organizations()
+            clock.now += 61
+            mocker.get(f"{APIURL}/sec/organization", json={"items": [1]})
+            expect(api.get_organizations()) == {"items": [1]}
+            headers = mocker.last_request.headers
+            expect("If-None-Match" in headers) is False
+
+    def invalidates_after_mutations(api):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{APIURL}/sec/item/i1", json={"id": "i1"})
+            mocker.put(f"{APIURL}/sec/item/i1/date", json={"success": True})
+            api.get_item("i1")
+            api.set_item_date("i1", datetime.date(2023, 1, 1))
+            api.get_item("i1")
+            expect(mocker.call_count) == 3
+
+    def does_not_cache_errors(api):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{APIURL}/sec/item/i1", status_code=404, json={})
+            api.get_item("i1")
+            expect(len(api.cache)) == 0
+
+    def skips_volatile_endpoints(api):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{APIURL}/sec/queue/state", json={"queued": []})
+            mocker.get(f"{APIURL}/sec/checkfile/abc", json={"exists": False})
+            for _ in range(2):
+                api.get_job_queue()
+                api.check_file_exists("abc")
+            expect(mocker.call_count) == 4
+            expect(len(api.cache)) == 0
+
+    def is_optional():
+        api = APIWrapper(BASEURL)
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{APIURL}/sec/tag", json=TAGS)
+            api.get_tags()
+            api.get_tags()
+            expect(mocker.call_count) == 2
+            api.invalidate_cache()
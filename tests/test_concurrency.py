@@ -0,0 +1,90 @@
+import pytest
+from expecter import expect
+import requests_mock
+
+from pydocspell import AdaptiveLimiter, APIWrapper
+from pydocspell.concurrency import Slot
+
+BASEURL = "http://docspell.example.org"
+
+
+@pytest.mark.concurrency
+def describe_adaptive_limiter():
+    def grows_by_about_one_per_round():
+        limiter = AdaptiveLimiter(initial=4, maximum=8)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(Slot(status=200))
+        expect(limiter.limit) == 5
+
+    def never_exceeds_the_maximum():
+        limiter = AdaptiveLimiter(initial=2, maximum=3)
+        for _ in range(100):
+            limiter.acquire()
+            limiter.release(Slot(status=200))
+        expect(limiter.limit) == 3
+
+    @pytest.mark.parametrize(
+        "slot",
+        (
+            Slot(status=503),
+            Slot(status=429),
+            Slot(status=200, retried=True),
+            Slot(error=ConnectionError()),
+        ),
+    )
+    def halves_on_congestion(slot):
+        limiter = AdaptiveLimiter(initial=8)
+        limiter.acquire()
+        limiter.release(slot)
+        expect(limiter.limit) == 4
+
+    def once_per_cooldown():
+        limiter = AdaptiveLimiter(initial=8, cooldown=60)
+        for _ in range(3):
+            limiter.acquire()
+            limiter.release(Slot(status=503))
+        expect(limiter.limit) == 4
+
+    def not_below_the_minimum():
+        limiter = AdaptiveLimiter(initial=4, minimum=2, cooldown=0)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(Slot(status=503))
+        expect(limiter.limit) == 2
+
+    def on_slow_responses():
+        limiter = AdaptiveLimiter(initial=8, latency_target=1)
+        limiter.acquire()
+        limiter.release(Slot(status=200, latency=2))
+        expect(limiter.limit) == 4
+
+    def blocks_at_the_limit():
+        limiter = AdaptiveLimiter(initial=1, maximum=1)
+        limiter.acquire()
+        with pytest.raises(TimeoutError):
+            limiter.acquire(timeout=0.01)
+        limiter.release()
+        limiter.acquire(timeout=0.01)
+
+    def records_errors_raised_in_a_slot():
+        limiter = AdaptiveLimiter(initial=8)
+        with pytest.raises(ConnectionError):
+            with limiter.slot():
+                raise ConnectionError()
+        expect(limiter.limit) == 4
+        expect(limiter.in_flight) == 0
+
+
+@pytest.mark.concurrency
+def describe_limited_requests():
+    def feed_the_limiter():
+        limiter = AdaptiveLimiter(initial=8)
+        api = APIWrapper(BASEURL, limiter=limiter)
+        with requests_mock.Mocker() as mocker:
+            mocker.get(
+                f"{BASEURL}/api/info/version", status_code=503, text="{}"
+            )
+            api.get_docspell_version()
+        expect(limiter.limit) == 4
+        expect(limiter.in_flight) == 0
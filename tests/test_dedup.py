@@ -0,0 +1,122 @@
+import pytest
+from expecter import expect
+import hashlib
+from io import BytesIO
+
+from pydocspell import APIWrapper, BulkUploader, Deduplicator, HashIndex
+
+BASEURL = "http://docspell.example.org"
+
+KNOWN = b"known file contents"
+UNKNOWN = b"unknown file contents"
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class FakeServer:
+    def __init__(self, present=()):
+        self.present = set(present)
+        self.checks = []
+
+    def __call__(self, sha256sum):
+        self.checks.append(sha256sum)
+        return {"exists": sha256sum in self.present, "items": []}
+
+
+@pytest.fixture
+def server():
+    return FakeServer(present=(sha256(KNOWN),))
+
+
+@pytest.fixture
+def api(monkeypatch, server):
+    api = APIWrapper(BASEURL)
+    monkeypatch.setattr(api, "check_file_exists", server)
+    return api
+
+
+@pytest.mark.dedup
+def describe_hash_index():
+    def unknown_hashes():
+        expect(HashIndex().lookup("deadbeef")) is None
+
+    def positive_results_stick():
+        index = HashIndex(negative_ttl=0)
+        index.add("deadbeef")
+        expect(index.lookup("deadbeef")) is True
+        expect(len(index)) == 1
+
+    def negative_results_expire():
+        index = HashIndex(negative_ttl=3600)
+        index.add("deadbeef", present=False)
+        expect(index.lookup("deadbeef")) is False
+        index = HashIndex(negative_ttl=0)
+        index.add("deadbeef", present=False)
+        expect(index.lookup("deadbeef")) is None
+
+    def persists_across_instances(tmp_path):
+        path = tmp_path / "index.sqlite"
+        with HashIndex(path) as index:
+            index.add("deadbeef")
+        with HashIndex(path) as index:
+            expect(index.lookup("deadbeef")) is True
+
+
+@pytest.mark.dedup
+def describe_deduplicator():
+    def hashes_without_moving_the_file(api):
+        fileobj = BytesIO(KNOWN)
+        expect(Deduplicator(api).hash_file(fileobj)) == sha256(KNOWN)
+        expect(fileobj.tell()) == 0
+
+    def asks_the_server_only_once(api, server):
+        dedup = Deduplicator(api)
+        for _ in range(3):
+            expect(dedup.exists(sha256(KNOWN))) is True
+            expect(dedup.exists(sha256(UNKNOWN))) is False
+        expect(len(server.checks)) == 2
+
+    def filters_present_files(api):
+        files = [(BytesIO(KNOWN), "known"), (BytesIO(UNKNOWN), "unknown")]
+        remaining = list(Deduplicator(api).filter(files))
+        expect([name for _, name in remaining]) == ["unknown"]
+
+    def in_front_of_bulk_uploads(monkeypatch, api, server):
+        uploaded = []
+
+        def upload(endpoint, files, *, transfer_cb=None, metadata=None):
+            uploaded.extend(name for _, name in files)
+            return {"success": True}
+
+        monkeypatch.setattr(api, "_upload_multiple", upload)
+        dedup = Deduplicator(api)
+        files = [(BytesIO(KNOWN), "known"), (BytesIO(UNKNOWN), "unknown")]
+        results = list(BulkUploader(api, dedup=dedup).upload(files))
+        expect(uploaded) == ["unknown"]
+        expect(sorted(r.skipped for r in results)) == [False, True]
+        expect(dedup.index.lookup(sha256(UNKNOWN))) is True
+
+    def hashes_openers(monkeypatch, api):
+        uploaded = []
+
+        def upload(endpoint, files, *, transfer_cb=None, metadata=None):
+            uploaded.extend(fileobj.read() for fileobj, _ in files)
+            return {"success": True}
+
+        monkeypatch.setattr(api, "_upload_multiple", upload)
+        dedup = Deduplicator(api)
+        expect(dedup.check(lambda: BytesIO(KNOWN))) == (sha256(KNOWN), True)
+        files = [(lambda: BytesIO(UNKNOWN), "unknown")]
+        (result,) = BulkUploader(api, dedup=dedup).upload(files)
+        expect(result.ok) is True
+        expect(result.sha256) == sha256(UNKNOWN)
+        expect(uploaded) == [UNKNOWN]
+
+    def filters_present_paths(api, tmp_path):
+        (tmp_path / "known").write_bytes(KNOWN)
+        (tmp_path / "unknown").write_bytes(UNKNOWN)
+        paths = sorted(tmp_path.iterdir())
+        remaining = list(Deduplicator(api).filter_paths(paths))
+        expect(remaining) == [tmp_path / "unknown"]
@@ -0,0 +1,127 @@
+import pytest
+from expecter import expect
+from concurrent import futures
+import requests
+import requests_mock
+
+from pydocspell import APIWrapper, DownloadStatus
+
+BASEURL = "http://docspell.example.org"
+CONTENT = bytes(range(256)) * 64
+
+
+class FakeServer:
+    # serves CONTENT with an ETag, honouring If-None-Match and Range
+    def __init__(self, content=CONTENT, etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.requests = []
+
+    def __call__(self, request, context):
+        self.requests.append(request.headers)
+        context.headers["ETag"] = self.etag
+        if request.headers.get("If-None-Match") == self.etag:
+            context.status_code = 304
+            return b""
+        range_ = request.headers.get("Range")
+        if range_ and request.headers.get("If-Range") == self.etag:
+            start = int(range_.removeprefix("bytes=").rstrip("-"))
+            if start >= len(self.content):
+                context.status_code = 416
+                return b""
+            context.status_code = 206
+            context.headers["Content-Range"] = (
+                f"bytes {start}-{len(self.content) - 1}/{len(self.content)}"
+            )
+            return self.content[start:]
+        return self.content
+
+
+@pytest.fixture
+def api():
+    return APIWrapper(BASEURL)
+
+
+@pytest.fixture
+def server():
+    server = FakeServer()
+    with requests_mock.Mocker() as mocker:
+        mocker.get(
+            f"{BASEURL}/api/v1/sec/attachment/a1/original", content=server
+        )
+        mocker.get(f"{BASEURL}/api/v1/sec/attachment/a1", content=server)
+        yield server
+
+
+@pytest.mark.download
+def describe_downloads():
+    def downloads_to_path(api, server, tmp_path):
+        path = tmp_path / "a1.pdf"
+        result = api.download_original("a1", path, chunk_size=1000)
+        expect(result.status) == DownloadStatus.DOWNLOADED
+        expect(result.size) == len(CONTENT)
+        expect(path.read_bytes()) == CONTENT
+        expect((tmp_path / "a1.pdf.etag").read_text()) == '"v1"'
+        expect((tmp_path / "a1.pdf.part").exists()) is False
+
+    def revalidates_by_etag(api, server, tmp_path):
+        path = tmp_path / "a1.pdf"
+        api.download_attachment("a1", path)
+        result = api.download_attachment("a1", path)
+        expect(result.status) == DownloadStatus.UNCHANGED
+        expect(result.changed) is False
+        expect(server.requests[-1]["If-None-Match"]) == '"v1"'
+        expect(path.read_bytes()) == CONTENT
+
+    def downloads_changed_files_again(api, server, tmp_path):
+        path = tmp_path / "a1.pdf"
+        api.download_attachment("a1", path)
+        server.content, server.etag = b"new", '"v2"'
+        result = api.download_attachment("a1", path)
+        expect(result.status) == DownloadStatus.DOWNLOADED
+        expect(path.read_bytes()) == b"new"
+        expect((tmp_path / "a1.pdf.etag").read_text()) == '"v2"'
+
+    def resumes_interrupted_downloads(api, server, tmp_path):
+        path = tmp_path / "a1.pdf"
+        (tmp_path / "a1.pdf.part").write_bytes(CONTENT[:1000])
+        (tmp_path / "a1.pdf.part.etag").write_text('"v1"')
+        result = api.download_original("a1", path)
+        expect(result.status) == DownloadStatus.RESUMED
+        expect(server.requests[-1]["Range"]) == "bytes=1000-"
+        expect(path.read_bytes()) == CONTENT
+
+    def restarts_when_the_file_changed(api, server, tmp_path):
+        path = tmp_path / "a1.pdf"
+        (tmp_path / "a1.pdf.part").write_bytes(b"x" * 1000)
+        (tmp_path / "a1.pdf.part.etag").write_text('"v0"')
+        result = api.download_original("a1", path)
+        expect(result.status) == DownloadStatus.DOWNLOADED
+        expect(path.read_bytes()) == CONTENT
+
+    def restarts_on_unsatisfiable_range(api, server, tmp_path):
+        path = tmp_path / "a1.pdf"
+        (tmp_path / "a1.pdf.part").write_bytes(CONTENT + b"junk")
+        (tmp_path / "a1.pdf.part.etag").write_text('"v1"')
+        result = api.download_original("a1", path)
+        expect(result.status) == DownloadStatus.DOWNLOADED
+        expect(path.read_bytes()) == CONTENT
+
+    def raises_on_errors(api, tmp_path):
+        with requests_mock.Mocker() as mocker:
+            mocker.get(f"{BASEURL}/api/v1/sec/attachment/a1", status_code=404)
+            with pytest.raises(requests.HTTPError):
+                api.download_attachment("a1", tmp_path / "a1.pdf")
+        expect(list(tmp_path.iterdir())) == []
+
+    def in_parallel(api, server, tmp_path):
+        paths = [tmp_path / f"{i}.pdf" for i in range(16)]
+        with futures.ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(
+                executor.map(
+                    lambda path: api.download_attachment("a1", path), paths
+                )
+            )
+        expect({r.status for r in results}) == {DownloadStatus.DOWNLOADED}
+        for path in paths:
+            expect(path.read_bytes()) == CONTENT
@@ -0,0 +1,97 @@
+import pytest
+from expecter import expect
+import http.server
+import json
+import re
+import threading
+
+from pydocspell import UploadFleet
+
+
+class UploadHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if not self.path.endswith("/open/upload/item/src"):
+            self.send_response(401)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        names = re.findall(rb'filename="([^"]+)"', body)
+        with self.server.lock:
+            self.server.names.extend(n.decode() for n in names)
+        data = json.dumps({"success": True, "message": "ok"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), UploadHandler)
+    server.lock = threading.Lock()
+    server.names = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.baseurl = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(7):
+        path = tmp_path / f"{i}.pdf"
+        path.write_bytes(f"file {i}".encode())
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.fleet
+def describe_upload_fleet():
+    def uploads_from_several_processes(server, files):
+        events = []
+        fleet = UploadFleet(
+            server.baseurl,
+            "src",
+            processes=2,
+            workers=2,
+            shard_size=2,
+            progress_cb=events.append,
+        )
+        results = list(fleet.upload(files))
+        expect(sorted(r.index for r in results)) == list(range(7))
+        expect(all(r.ok for r in results)) is True
+        expect(sorted(server.names)) == sorted(p.name for p in files)
+        expect(len(events)) == 7
+        expect(max(e.done for e in events)) == 7
+        expect(fleet.done) == 7
+
+    def batches_within_processes(server, files):
+        fleet = UploadFleet(
+            server.baseurl,
+            "src",
+            processes=2,
+            shard_size=4,
+            max_batch_files=4,
+        )
+        results = list(fleet.upload(files))
+        expect(len(results)) == 7
+        expect(sorted(server.names)) == sorted(p.name for p in files)
+
+    def reports_failures(server, files):
+        fleet = UploadFleet(server.baseurl, "other", processes=1)
+        results = list(fleet.upload(files[:2]))
+        expect([r.ok for r in results]) == [False, False]
+        expect(results[0].error).contains("NotAuthenticated")
+        expect(fleet.failed) == 2
+
+    def refuses_empty_shards(server):
+        with expect.raises(ValueError):
+            UploadFleet(server.baseurl, "src", shard_size=0)
@@ -0,0 +1,93 @@
+import pytest
+from expecter import expect
+import datetime
+import json
+import requests_mock
+
+from pydocspell import APIWrapper, BulkItemUpdater
+
+BASEURL = "http://docspell.example.org"
+
+
+@pytest.fixture
+def api():
+    return APIWrapper(BASEURL)
+
+
+def itemids(n):
+    return [f"item{i:04d}" for i in range(n)]
+
+
+def multi_ids(request):
+    return json.loads(request.body)["ids"]
+
+
+@pytest.mark.items
+def describe_bulk_item_updater():
+    def rejects_bad_arguments(api):
+        with expect.raises(ValueError):
+            BulkItemUpdater(api, chunk_size=0)
+        with expect.raises(ValueError):
+            BulkItemUpdater(api, workers=4, max_in_flight=2)
+
+    def confirms_in_chunks(api):
+        with requests_mock.Mocker() as mocker:
+            mocker.post(
+                f"{BASEURL}/api/v1/sec/items/confirm",
+                json={"success": True, "message": "Items confirmed"},
+            )
+            updater = BulkItemUpdater(api, chunk_size=100)
+            results = list(updater.confirm(itemids(250)))
+            expect(sorted(r.itemid for r in results)) == itemids(250)
+            expect(all(r.ok for r in results)) is True
+            sizes = sorted(len(multi_ids(r)) for r in mocker.request_history)
+            expect(sizes) == [50, 100, 100]
+
+    def sets_dates(api):
+        with requests_mock.Mocker() as mocker:
+            mocker.put(
+                f"{BASEURL}/api/v1/sec/items/date", json={"success": True}
+            )
+            date = datetime.date(2023, 4, 5)
+            results = list(BulkItemUpdater(api).set_date(itemids(3), date))
+            expect(len(results)) == 3
+            (request,) = mocker.request_history
+            body = json.loads(request.body)
+            expect(body["items"]) == itemids(3)
+            expect(body["date"]) == APIWrapper._date_timestamp(date)
+
+    def falls_back_without_multi_endpoints(api):
+        with requests_mock.Mocker() as mocker:
+            # later matchers take precedence
+            single = mocker.post(requests_mock.ANY, json={"success": True})
+            mocker.post(
+                f"{BASEURL}/api/v1/sec/items/unconfirm", status_code=404
+            )
+            updater = BulkItemUpdater(api, chunk_size=10, workers=2)
+            results = list(updater.unconfirm(itemids(25)))
+            expect(sorted(r.itemid for r in results)) == itemids(25)
+            expect(all(r.ok for r in results)) is True
+            expect(updater.multi) is False
+            expect(single.call_count) == 25
+
+    def reports_partial_failures(api):
+        with requests_mock.Mocker() as mocker:
+            mocker.post(requests_mock.ANY, json={"success": True})
+            mocker.post(
+                f"{BASEURL}/api/v1/sec/items/confirm",
+                json={"success": False, "message": "Item not found"},
+            )
+            mocker.post(
+                f"{BASEURL}/api/v1/sec/item/item0003/confirm",
+                json={"success": False, "message": "Item not found"},
+            )
+            updater = BulkItemUpdater(api, chunk_size=5)
+            results = {r.itemid: r for r in updater.confirm(itemids(5))}
+            expect(len(results)) == 5
+            failed = [i for i, r in results.items() if not r.ok]
+            expect(failed) == ["item0003"]
+            expect(results["item0003"].exception).isinstance(
+                BulkItemUpdater.Failed
+            )
+            # the multi-item endpoint stays in use for other chunks
+            expect(updater.multi) is True
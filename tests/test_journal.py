@@ -0,0 +1,191 @@
+import pytest
+from expecter import expect
+import threading
+
+from pydocspell import (
+    APIWrapper,
+    Deduplicator,
+    HashIndex,
+    ImportJournal,
+    ImportState,
+    JournaledImport,
+)
+from pydocspell import util
+from pydocspell.journal import JournalEntry
+
+BASEURL = "http://docspell.example.org"
+
+
+class RecordingUpload:
+    def __init__(self, fail=()):
+        self._lock = threading.Lock()
+        self.names = []
+        self.fail = set(fail)
+
+    def __call__(self, endpoint, fileobj, name, *, transfer_cb, metadata):
+        with self._lock:
+            self.names.append(name)
+        if name in self.fail:
+            raise RuntimeError(name)
+        return {"success": True, "message": "Files submitted."}
+
+
+class CountingDeduplicator(Deduplicator):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hashed = []
+
+    def check(self, fileobj):
+        self.hashed.append(fileobj.name)
+        return super().check(fileobj)
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = APIWrapper(BASEURL)
+    api.uploads = RecordingUpload()
+    monkeypatch.setattr(api, "_upload_single", api.uploads)
+    monkeypatch.setattr(
+        api, "check_file_exists", lambda sha256: {"exists": False}
+    )
+    return api
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"{i}.pdf"
+        path.write_bytes(f"file {i}".encode())
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def journal(tmp_path):
+    with ImportJournal(tmp_path / "journal.sqlite", commit_every=2) as j:
+        yield j
+
+
+@pytest.mark.journal
+def describe_import_journal():
+    def persists_entries(tmp_path, api, files):
+        path = tmp_path / "journal.sqlite"
+        with ImportJournal(path) as journal:
+            list(JournaledImport(api, journal).run(files))
+        with ImportJournal(path) as journal:
+            expect(len(journal)) == 6
+            entry = journal.get(files[0])
+            expect(entry.state) == ImportState.UPLOADED
+            expect(entry.response["success"]) is True
+
+    def commits_in_batches(tmp_path, files):
+        path = tmp_path / "journal.sqlite"
+        journal = ImportJournal(path, commit_every=3, commit_interval=3600)
+        for i in range(4):
+            journal.record(
+                JournalEntry(
+                    path=f"{i}",
+                    state=ImportState.IN_FLIGHT,
+                    size=0,
+                    mtime_ns=0,
+                )
+            )
+        with ImportJournal(path) as other:
+            expect(len(other)) == 3
+        journal.close()
+        with ImportJournal(path) as other:
+            expect(len(other)) == 4
+
+
+@pytest.mark.journal
+def describe_journaled_import():
+    def uploads_and_records(api, journal, files):
+        results = list(JournaledImport(api, journal, workers=2).run(files))
+        expect(len(results)) == 6
+        expect({r.state for r in results}) == {ImportState.UPLOADED}
+        expect(journal.counts()) == {ImportState.UPLOADED: 6}
+
+    def skips_completed_work_on_restart(api, journal, files):
+        api.uploads.fail = {"2.pdf", "4.pdf"}
+        results = list(JournaledImport(api, journal).run(files))
+        expect(sum(not r.ok for r in results)) == 2
+        expect(journal.counts()[ImportState.FAILED]) == 2
+
+        api.uploads.fail.clear()
+        api.uploads.names.clear()
+        results = list(JournaledImport(api, journal).run(files))
+        expect(sorted(api.uploads.names)) == ["2.pdf", "4.pdf"]
+        journaled = sorted(r.entry.path for r in results if r.journaled)
+        expect(len(journaled)) == 4
+        expect(journal.counts()) == {ImportState.UPLOADED: 6}
+
+    def retries_in_flight_entries(api, journal, files):
+        stat = files[0].stat()
+        journal.record(
+            JournalEntry(
+                path=str(files[0]),
+                state=ImportState.IN_FLIGHT,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+            )
+        )
+        list(JournaledImport(api, journal).run(files[:1]))
+        expect(api.uploads.names) == ["0.pdf"]
+
+    def skips_in_flight_entries_the_server_has(api, journal, files):
+        for path in files[:2]:
+            stat = path.stat()
+            journal.record(
+                JournalEntry(
+                    path=str(path),
+                    state=ImportState.IN_FLIGHT,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                )
+            )
+        taken = {util.sha256_path(files[0])}
+        api.check_file_exists = lambda sha256: {"exists": sha256 in taken}
+        results = list(JournaledImport(api, journal).run(files[:3]))
+        expect(sorted(api.uploads.names)) == ["1.pdf", "2.pdf"]
+        expect(journal.get(files[0]).state) == ImportState.EXISTS
+        expect(all(r.ok for r in results)) is True
+
+    def uploads_changed_files_again(api, journal, files):
+        list(JournaledImport(api, journal).run(files[:1]))
+        files[0].write_bytes(b"changed, and longer")
+        list(JournaledImport(api, journal).run(files[:1]))
+        expect(api.uploads.names) == ["0.pdf", "0.pdf"]
+
+    def reuses_journaled_hashes(api, journal, files):
+        dedup = CountingDeduplicator(api, HashIndex())
+        api.uploads.fail = {"1.pdf"}
+        list(JournaledImport(api, journal, dedup=dedup).run(files))
+        expect(len(dedup.hashed)) == 6
+        entry = journal.get(files[1])
+        expect(entry.state) == ImportState.FAILED
+        expect(entry.sha256) is not None
+
+        api.uploads.fail.clear()
+        dedup.hashed.clear()
+        list(JournaledImport(api, journal, dedup=dedup).run(files))
+        expect(dedup.hashed) == []
+        expect(journal.get(files[1]).state) == ImportState.UPLOADED
+
+    def records_existing_files(api, journal, files, monkeypatch):
+        monkeypatch.setattr(
+            api, "check_file_exists", lambda sha256: {"exists": True}
+        )
+        dedup = Deduplicator(api, HashIndex())
+        results = list(JournaledImport(api, journal, dedup=dedup).run(files))
+        expect({r.state for r in results}) == {ImportState.EXISTS}
+        expect(api.uploads.names) == []
+
+    def records_missing_files(api, journal, files, tmp_path):
+        missing = tmp_path / "missing.pdf"
+        results = list(JournaledImport(api, journal).run([missing, *files]))
+        failed = [r for r in results if not r.ok]
+        expect([r.path for r in failed]) == [str(missing)]
+        expect(failed[0].state) == ImportState.FAILED
+        expect(journal.get(missing).error).contains("FileNotFoundError")
+        expect(len(api.uploads.names)) == 6
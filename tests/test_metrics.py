@@ -0,0 +1,94 @@
+import pytest
+from expecter import expect
+import io
+import requests
+import requests_mock
+
+from pydocspell import APIWrapper, Metrics, PrometheusExporter
+from pydocspell.metrics import endpoint_label
+
+BASEURL = "http://docspell.example.org"
+ITEMID = "7DRnuarqeVc-9QTFof7pocU-VSsreZ2k5oh-zebbFYMnwRQ"
+
+
+@pytest.fixture
+def metrics():
+    return Metrics(buckets=(0.1, 1))
+
+
+@pytest.mark.metrics
+def describe_metrics():
+    def folds_ids_in_endpoints():
+        expect(endpoint_label(f"sec/item/{ITEMID}/date")) == (
+            "sec/item/{id}/date"
+        )
+        expect(endpoint_label("open/upload/item/" + "f" * 64)) == (
+            "open/upload/item/{id}"
+        )
+        expect(endpoint_label("api/info/version")) == "api/info/version"
+
+    def snapshot(metrics):
+        metrics.observe_request(
+            "GET", "sec/queue/state", latency=0.05, status=200, retries=1
+        )
+        metrics.observe_request(
+            "GET", "sec/queue/state", latency=5, error=ConnectionError()
+        )
+        m = metrics.snapshot()["GET", "sec/queue/state"]
+        expect(m["requests"]) == 2
+        expect(m["statuses"]) == {200: 1}
+        expect(m["errors"]) == {"ConnectionError": 1}
+        expect(m["retries"]) == 1
+        expect(m["latency"]["buckets"]) == {0.1: 1, 1: 1, float("inf"): 2}
+
+    def prometheus_text_format(metrics):
+        metrics.observe_request(
+            "PUT", f"sec/item/{ITEMID}/date", latency=0.5, status=200
+        )
+        text = PrometheusExporter(metrics).render()
+        labels = 'method="PUT",endpoint="sec/item/{id}/date"'
+        expect(text).contains(
+            "# TYPE pydocspell_request_duration_seconds histogram\n"
+        )
+        expect(text).contains(
+            f'pydocspell_requests_total{{{labels},status="200"}} 1\n'
+        )
+        expect(text).contains(
+            f'pydocspell_request_duration_seconds_bucket{{{labels},le="1"}}'
+            " 1\n"
+        )
+        expect(text).contains(
+            f'_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1\n'
+        )
+        out = io.StringIO()
+        PrometheusExporter(metrics).write(out)
+        expect(out.getvalue()) == text
+
+
+@pytest.mark.metrics
+def describe_instrumented_requests():
+    def record_requests(metrics):
+        api = APIWrapper(BASEURL, metrics=metrics)
+        with requests_mock.Mocker() as mocker:
+            mocker.post(
+                f"{BASEURL}/api/v1/sec/upload/item",
+                text='{"success": true}',
+            )
+            api.upload(io.BytesIO(b"x" * 1000), "x")
+        m = metrics.snapshot()["POST", "sec/upload/item"]
+        expect(m["requests"]) == 1
+        expect(m["bytes_sent"] > 1000) is True
+        expect(m["bytes_received"]) == len('{"success": true}')
+        expect(m["encode_seconds"] >= 0) is True
+
+    def record_errors(metrics):
+        api = APIWrapper(BASEURL, metrics=metrics)
+        with requests_mock.Mocker() as mocker:
+            mocker.get(
+                f"{BASEURL}/api/info/version",
+                exc=requests.exceptions.ConnectTimeout,
+            )
+            with pytest.raises(requests.exceptions.ConnectTimeout):
+                api.get_docspell_version()
+        m = metrics.snapshot()["GET", "api/info/version"]
+        expect(m["errors"]) == {"ConnectTimeout": 1}
@@ -0,0 +1,206 @@
+import pytest
+from expecter import expect
+import requests
+import requests_mock
+
+from pydocspell import APIWrapper, Metrics, MultiNodeAPIWrapper
+from pydocspell.util import FileDescriptorBudget
+
+NODES = ["http://n1.example.org", "http://n2.example.org"]
+VERSION = {"version": "0.40.0"}
+
+
+def login_response(node):
+    return {
+        "collective": "c",
+        "user": "u",
+        "success": True,
+        "message": "Login successful",
+        "token": f"token-{node}",
+        "validMs": 300000,
+    }
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("pydocspell.multinode.time.monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def server():
+    with requests_mock.Mocker() as mocker:
+        for index, node in enumerate(NODES):
+            apiurl = f"{node}/api/v1"
+            mocker.get(f"{node}/api/info/version", json=VERSION)
+            mocker.post(
+                f"{apiurl}/open/auth/login", json=login_response(index)
+            )
+            mocker.post(f"{apiurl}/sec/auth/logout", json={"success": True})
+            mocker.get(f"{apiurl}/sec/tag", json={"items": [], "node": index})
+            mocker.post(
+                f"{apiurl}/sec/upload/item",
+                json={"success": True, "node": index},
+            )
+            mocker.post(
+                f"{apiurl}/sec/items/confirm",
+                json={"success": True, "node": index},
+            )
+        yield mocker
+
+
+@pytest.fixture
+def api():
+    return MultiNodeAPIWrapper(
+        NODES, strategy="round_robin", auto_refresh=False
+    )
+
+
+def down(server, node, path, method="GET"):
+    server.register_uri(
+        method, f"{node}{path}", exc=requests.exceptions.ConnectTimeout
+    )
+
+
+@pytest.mark.multinode
+def describe_multi_node_api_wrapper():
+    def spreads_requests_round_robin(server, api):
+        seen = [api.get_tags()["node"] for _ in range(4)]
+        expect(sorted(seen)) == [0, 0, 1, 1]
+
+    def prefers_the_least_busy_node(server):
+        api = MultiNodeAPIWrapper(NODES, auto_refresh=False)
+        api.nodes[0]._outstanding = 3
+        expect(api.get_tags()["node"]) == 1
+
+    def logs_into_every_node(server, api):
+        api.login("c", "u", "secret")
+        expect(api.state) == APIWrapper.State.LOGGEDIN
+        tokens = {node.api.auth.token for node in api.nodes}
+        expect(tokens) == {"token-0", "token-1"}
+        for _ in range(2):
+            api.get_tags()
+        sent = {
+            r.headers.get(APIWrapper.AUTH_HEADER)
+            for r in server.request_history
+            if r.path.endswith("/sec/tag")
+        }
+        expect(sent) == {"token-0", "token-1"}
+
+    def checks_health(server, api):
+        down(server, NODES[1], "/api/info/version")
+        expect(api.check_health()) == {NODES[0]: True, NODES[1]: False}
+        expect(api.nodes[0].version) == VERSION
+        expect(api.healthy) == [api.nodes[0]]
+
+    def fails_idempotent_requests_over(server, api):
+        down(server, NODES[0], "/api/v1/sec/tag")
+        down(server, NODES[1], "/api/v1/sec/tag")
+        server.get(f"{NODES[1]}/api/v1/sec/tag", json={"items": [], "node": 1})
+        for _ in range(3):
+            expect(api.get_tags()["node"]) == 1
+        expect(api.healthy) == [api.nodes[1]]
+
+    def fails_uploads_over_only_if_never_sent(server, api):
+        down(server, NODES[1], "/api/v1/sec/upload/item", method="POST")
+        results = {api.upload_multiple([])["node"] for _ in range(2)}
+        expect(results) == {0}
+
+    def does_not_resend_slow_uploads(server, api):
+        server.register_uri(
+            "POST",
+            f"{NODES[1]}/api/v1/sec/upload/item",
+            exc=requests.exceptions.ReadTimeout,
+        )
+        failed = 0
+        for _ in range(2):
+            try:
+                api.upload_multiple([])
+            except requests.exceptions.ReadTimeout:
+                failed += 1
+        expect(failed) == 1
+        uploads = [
+            r for r in server.request_history if r.path.endswith("/item")
+        ]
+        expect(len(uploads)) == 2
+        expect(len(api.healthy)) == 2
+
+    def keeps_slow_nodes_in_rotation(server, api):
+        server.get(
+            f"{NODES[1]}/api/v1/sec/tag", exc=requests.exceptions.ReadTimeout
+        )
+        expect({api.get_tags()["node"] for _ in range(2)}) == {0}
+        expect(len(api.healthy)) == 2
+
+    def does_not_resend_other_requests(server, api):
+        for node in NODES:
+            server.post(
+                f"{node}/api/v1/sec/items/confirm",
+                exc=requests.exceptions.ReadTimeout,
+            )
+        with expect.raises(requests.exceptions.ReadTimeout):
+            api.confirm_items(["i1"])
+        confirms = [
+            r for r in server.request_history if r.path.endswith("/confirm")
+        ]
+        expect(len(confirms)) == 1
+
+    def takes_nodes_back_after_health_check(server, api, clock):
+        api.login("c", "u", "secret")
+        down(server, NODES[0], "/api/v1/sec/tag")
+        api.get_tags()
+        api.get_tags()
+        expect(api.healthy) == [api.nodes[1]]
+        server.get(f"{NODES[0]}/api/v1/sec/tag", json={"items": [], "node": 0})
+        api.nodes[0].api.logout()
+        clock.now += MultiNodeAPIWrapper.DEFAULT_HEALTH_INTERVAL
+        seen = {api.get_tags()["node"] for _ in range(2)}
+        expect(seen) == {0, 1}
+        expect(api.nodes[0].api.state) == APIWrapper.State.LOGGEDIN
+
+    def gives_up_without_healthy_nodes(server, api):
+        for node in NODES:
+            down(server, node, "/api/v1/sec/tag")
+        with expect.raises(MultiNodeAPIWrapper.NoHealthyNode):
+            api.get_tags()
+
+    def refuses_shared_token_stores():
+        with expect.raises(ValueError):
+            MultiNodeAPIWrapper(NODES, token_store=object())
+
+    def builds_uploads_with_the_node_options(server, tmp_path):
+        class CountingBudget(FileDescriptorBudget):
+            acquired = 0
+
+            def acquire(self, **kwargs):
+                self.acquired += 1
+                super().acquire(**kwargs)
+
+        budget, metrics = CountingBudget(1), Metrics()
+        encoded = []
+        metrics.observe_encoding = lambda *args: encoded.append(args)
+        api = MultiNodeAPIWrapper(
+            NODES, auto_refresh=False, fd_budget=budget, metrics=metrics
+        )
+        for node in NODES:
+            # read the body, as a server would
+            server.post(
+                f"{node}/api/v1/sec/upload/item",
+                json=lambda request, context: {
+                    "success": bool(request.body.read())
+                },
+            )
+        path = tmp_path / "a.pdf"
+        path.write_bytes(b"a")
+        expect(api.upload(path)["success"]) is True
+        expect(budget.acquired) == 1
+        expect([args[:2] for args in encoded]) == [("POST", "sec/upload/item")]
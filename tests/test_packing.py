@@ -0,0 +1,157 @@
+import pytest
+from expecter import expect
+from io import BytesIO
+import zipfile
+
+from pydocspell import APIWrapper, ArchivePacker
+from pydocspell.packing import pack_zip
+
+BASEURL = "http://docspell.example.org"
+
+
+class RecordingUpload:
+    def __init__(self, fail=()):
+        self.archives = {}
+        self.metadata = []
+        self._fail = fail
+
+    def __call__(self, endpoint, fileobj, name, *, transfer_cb, metadata):
+        if name in self._fail:
+            raise RuntimeError(name)
+        with zipfile.ZipFile(fileobj) as zf:
+            self.archives[name] = {n: zf.read(n) for n in zf.namelist()}
+        self.metadata.append(metadata)
+        return {"success": True, "endpoint": endpoint}
+
+
+@pytest.fixture
+def api():
+    return APIWrapper(BASEURL)
+
+
+def small_files(n, size=100):
+    return [(BytesIO(bytes([i % 256]) * size), f"{i}.pdf") for i in range(n)]
+
+
+@pytest.mark.packing
+def describe_pack_zip():
+    def packs_files_and_paths(tmp_path):
+        path = tmp_path / "a.txt"
+        path.write_bytes(b"from disk")
+        archive = pack_zip([(BytesIO(b"in memory"), "b.txt"), (path, "a.txt")])
+        with zipfile.ZipFile(archive) as zf:
+            expect(zf.read("b.txt")) == b"in memory"
+            expect(zf.read("a.txt")) == b"from disk"
+
+    def keeps_duplicate_names_apart():
+        archive = pack_zip([(BytesIO(b"1"), "x"), (BytesIO(b"2"), "x")])
+        with zipfile.ZipFile(archive) as zf:
+            expect(zf.namelist()) == ["x", "1-x"]
+
+    def fails_on_missing_files(tmp_path):
+        with expect.raises(OSError):
+            pack_zip([(tmp_path / "missing.pdf", "missing.pdf")])
+
+    def leaves_out_unreadable_files(tmp_path):
+        errors = []
+        archive = pack_zip(
+            [(tmp_path / "missing.pdf", "a"), (BytesIO(b"b"), "b")],
+            errors=errors,
+        )
+        with zipfile.ZipFile(archive) as zf:
+            expect(zf.namelist()) == ["b"]
+        expect([name for name, _ in errors]) == ["a"]
+
+
+@pytest.mark.packing
+def describe_archive_packer():
+    def needs_a_limit(api):
+        with expect.raises(ValueError):
+            ArchivePacker(api, max_bytes=None, max_files=None)
+
+    def packs_by_count(api):
+        packer = ArchivePacker(api, max_files=4)
+        archives = list(packer.archives(small_files(10)))
+        expect([len(members) for _, _, members in archives]) == [4, 4, 2]
+        expect([name for _, name, _ in archives]) == [
+            "pydocspell-000000.zip",
+            "pydocspell-000001.zip",
+            "pydocspell-000002.zip",
+        ]
+
+    def packs_by_size(api):
+        packer = ArchivePacker(api, max_bytes=1000, max_files=None)
+        archives = list(packer.archives(small_files(20)))
+        expect(len(archives)) == 4
+        for archive, _, _ in archives:
+            expect(archive.getbuffer().nbytes <= 1000 + 22) is True
+
+    def uploads_with_flatten_archives(monkeypatch, api):
+        upload = RecordingUpload()
+        monkeypatch.setattr(api, "_upload_single", upload)
+        packer = ArchivePacker(api, max_files=5, workers=2)
+        results = sorted(packer.upload(small_files(12)), key=lambda r: r.index)
+        expect([len(r.members) for r in results]) == [5, 5, 2]
+        expect(all(r.ok for r in results)) is True
+        expect(results[2].members) == ["10.pdf", "11.pdf"]
+        contents = upload.archives["pydocspell-000002.zip"]
+        expect(contents["11.pdf"]) == bytes([11]) * 100
+        for metadata in upload.metadata:
+            expect(metadata.flattenArchives) is True
+            expect(metadata.multiple) is True
+
+    def via_source(monkeypatch, api):
+        upload = RecordingUpload()
+        monkeypatch.setattr(api, "_upload_single", upload)
+        packer = ArchivePacker(api, source="src")
+        (result,) = packer.upload(small_files(3))
+        expect(result.response["endpoint"]) == "open/upload/item/src"
+
+    def reports_failed_archives(monkeypatch, api):
+        upload = RecordingUpload(fail={"pydocspell-000001.zip"})
+        monkeypatch.setattr(api, "_upload_single", upload)
+        packer = ArchivePacker(api, max_files=2)
+        results = {r.name: r for r in packer.upload(small_files(4))}
+        failed = results["pydocspell-000001.zip"]
+        expect(failed.ok) is False
+        expect(failed.members) == ["2.pdf", "3.pdf"]
+
+    def reports_unreadable_files(monkeypatch, api, tmp_path):
+        upload = RecordingUpload()
+        monkeypatch.setattr(api, "_upload_single", upload)
+
+        def opener():
+            raise PermissionError("locked.pdf")
+
+        files = small_files(2) + [
+            (tmp_path / "missing.pdf", "missing.pdf"),
+            (opener, "locked.pdf"),
+            (BytesIO(b"last"), "last.pdf"),
+        ]
+        packer = ArchivePacker(api, max_files=10)
+        results = {r.name: r for r in packer.upload(files)}
+        expect(results["missing.pdf"].ok) is False
+        expect(results["missing.pdf"].members) == ["missing.pdf"]
+        expect(results["locked.pdf"].ok) is False
+        archive = results["pydocspell-000000.zip"]
+        expect(archive.ok) is True
+        expect(archive.members) == ["0.pdf", "1.pdf", "last.pdf"]
+        contents = upload.archives["pydocspell-000000.zip"]
+        expect(sorted(contents)) == ["0.pdf", "1.pdf", "last.pdf"]
+
+    def names_unnamed_files_quietly(monkeypatch, api, caplog):
+        sent = {}
+
+        def upload(endpoint, files, *, transfer_cb, metadata):
+            ((fileobj, name),) = files
+            with zipfile.ZipFile(fileobj) as zf:
+                sent[name] = zf.namelist()
+            return {"success": True}
+
+        monkeypatch.setattr(api, "_upload_multiple", upload)
+        packer = ArchivePacker(api)
+        (result,) = packer.upload([BytesIO(b"a"), (BytesIO(b"b"), "b.pdf")])
+        expect(result.ok) is True
+        expect(result.members) == ["file-0", "b.pdf"]
+        expect(sent["pydocspell-000000.zip"]) == ["file-0", "b.pdf"]
+        expect(caplog.text).does_not_contain("meta[multiple]")
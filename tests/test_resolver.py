@@ -0,0 +1,111 @@
+import pytest
+from expecter import expect
+import requests_mock
+
+from pydocspell import (
+    APIWrapper,
+    BulkUploader,
+    MetadataResolver,
+    ResponseCache,
+    UploadMetadata,
+)
+
+BASEURL = "http://docspell.example.org"
+APIURL = f"{BASEURL}/api/v1"
+FOLDERS = {"items": [{"id": "f1", "name": "Invoices"}]}
+TAGS = {"items": [{"id": "t1", "name": "paid"}, {"id": "t2", "name": "tax"}]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("pydocspell.resolver.time.monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def server():
+    with requests_mock.Mocker() as mocker:
+        mocker.folders = mocker.get(f"{APIURL}/sec/folder", json=FOLDERS)
+        mocker.tags = mocker.get(f"{APIURL}/sec/tag", json=TAGS)
+        yield mocker
+
+
+@pytest.fixture
+def resolver():
+    return MetadataResolver(APIWrapper(BASEURL))
+
+
+@pytest.mark.resolver
+def describe_metadata_resolver():
+    def resolves_names_and_ids(server, resolver):
+        expect(resolver.folder_id("invoices")) == "f1"
+        expect(resolver.folder_id("f1")) == "f1"
+        expect(resolver.tag_id("Paid")) == "t1"
+        expect(server.folders.call_count) == 1
+        expect(server.tags.call_count) == 1
+
+    def rejects_unknown_kinds(resolver):
+        with expect.raises(ValueError):
+            resolver.resolve("colour", "red")
+
+    def refreshes_on_miss(server, resolver, clock):
+        resolver.folder_id("Invoices")
+        server.get(
+            f"{APIURL}/sec/folder",
+            json={"items": [*FOLDERS["items"], {"id": "f2", "name": "New"}]},
+        )
+        # not again right away
+        with expect.raises(MetadataResolver.NotFound):
+            resolver.folder_id("New")
+        clock.now += MetadataResolver.DEFAULT_REFRESH_INTERVAL
+        expect(resolver.folder_id("New")) == "f2"
+        with expect.raises(MetadataResolver.NotFound):
+            resolver.folder_id("Missing")
+
+    def refreshes_past_the_response_cache(server, clock):
+        api = APIWrapper(BASEURL, cache=ResponseCache(ttl=3600))
+        resolver = MetadataResolver(api)
+        resolver.tag_id("paid")
+        server.get(
+            f"{APIURL}/sec/tag", json={"items": [{"id": "t3", "name": "x"}]}
+        )
+        clock.now += MetadataResolver.DEFAULT_REFRESH_INTERVAL
+        expect(resolver.tag_id("x")) == "t3"
+
+    def normalizes_metadata(server, resolver):
+        md = UploadMetadata(folder="INVOICES", tags=["paid", "t2", "Paid"])
+        normalized = resolver.normalize(md)
+        expect(normalized.folder) == "f1"
+        expect(normalized.tags) == ["t1", "t2"]
+        expect(md.folder) == "INVOICES"
+        expect(resolver.normalize(None)) is None
+
+    def lists_problems(server, resolver):
+        md = UploadMetadata(folder="Nope", tags=["paid", "unknown"])
+        problems = resolver.problems(md)
+        expect([(e.kind, e.name) for e in problems]) == [
+            ("folder", "Nope"),
+            ("tag", "unknown"),
+        ]
+        with expect.raises(MetadataResolver.NotFound):
+            resolver.normalize(md)
+
+    def validates_bulk_uploads_up_front(server, resolver):
+        api = APIWrapper(BASEURL)
+        with expect.raises(MetadataResolver.NotFound):
+            BulkUploader(
+                api, metadata=UploadMetadata(folder="x"), resolver=resolver
+            )
+        uploader = BulkUploader(
+            api, metadata=UploadMetadata(tags=["tax"]), resolver=resolver
+        )
+        expect(uploader._metadata.tags) == ["t2"]
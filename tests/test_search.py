@@ -0,0 +1,126 @@
+import pytest
+from expecter import expect
+import json
+import threading
+import time
+import requests_mock
+
+from pydocspell import APIWrapper, ItemSearch
+
+BASEURL = "http://docspell.example.org"
+
+
+class FakeSearch:
+    def __init__(self, total, *, cap=None, fail_at=None):
+        self._total = total
+        self._cap = cap
+        self._fail_at = fail_at
+        self.offsets = []
+        self.fetched = threading.Semaphore(0)
+
+    def __call__(self, query, *, offset, limit, **kwargs):
+        self.offsets.append(offset)
+        self.fetched.release()
+        if offset == self._fail_at:
+            raise RuntimeError(offset)
+        limit = min(limit, self._cap or limit)
+        ids = range(offset, min(offset + limit, self._total))
+        return ({"id": i} for i in ids)
+
+
+@pytest.fixture
+def api():
+    return APIWrapper(BASEURL)
+
+
+@pytest.mark.search
+def describe_item_search():
+    def rejects_bad_arguments(api):
+        with expect.raises(ValueError):
+            ItemSearch(api, "", page_size=0)
+        with expect.raises(ValueError):
+            ItemSearch(api, "", prefetch=0)
+
+    def yields_all_items(monkeypatch, api):
+        search = FakeSearch(250)
+        monkeypatch.setattr(api, "iter_search_items", search)
+        items = list(api.iter_items("tag:invoice", page_size=100))
+        expect([item["id"] for item in items]) == list(range(250))
+        expect(search.offsets) == [0, 100, 200]
+
+    def stops_on_empty_page(monkeypatch, api):
+        search = FakeSearch(200)
+        monkeypatch.setattr(api, "iter_search_items", search)
+        expect(len(list(ItemSearch(api, "", page_size=100)))) == 200
+        expect(search.offsets) == [0, 100, 200]
+
+    def copes_with_capped_page_size(monkeypatch, api):
+        search = FakeSearch(450, cap=200)
+        monkeypatch.setattr(api, "iter_search_items", search)
+        expect(len(list(ItemSearch(api, "", page_size=500)))) == 450
+        expect(search.offsets) == [0, 200, 400]
+
+    def prefetches_while_consuming(monkeypatch, api):
+        search = FakeSearch(1000)
+        monkeypatch.setattr(api, "iter_search_items", search)
+        pages = ItemSearch(api, "", page_size=10, prefetch=2).pages()
+        next(pages)
+        for _ in range(3):
+            expect(search.fetched.acquire(timeout=5)) is True
+        expect(search.offsets[:3]) == [0, 10, 20]
+        time.sleep(0.1)
+        # one page consumed, two queued, one waiting to be queued
+        expect(len(search.offsets)) == 4
+        pages.close()
+
+    def stops_fetching_when_closed(monkeypatch, api):
+        search = FakeSearch(1000)
+        monkeypatch.setattr(api, "iter_search_items", search)
+        with ItemSearch(api, "", page_size=10) as items:
+            for item in items:
+                break
+        time.sleep(0.1)
+        fetched = len(search.offsets)
+        time.sleep(0.1)
+        expect(len(search.offsets)) == fetched
+        expect(fetched) <= 4
+
+    def raises_errors_in_the_consumer(monkeypatch, api):
+        search = FakeSearch(1000, fail_at=20)
+        monkeypatch.setattr(api, "iter_search_items", search)
+        items = []
+        with expect.raises(RuntimeError):
+            for item in ItemSearch(api, "", page_size=10):
+                items.append(item)
+        expect(len(items)) == 20
+
+    def sends_item_queries(api):
+        with requests_mock.Mocker() as mocker:
+            mocker.post(
+                f"{BASEURL}/api/v1/sec/item/search", json={"groups": []}
+            )
+            search = ItemSearch(api, "folder:x", page_size=5, offset=10)
+            expect(list(search)) == []
+            (request,) = mocker.request_history
+            expect(json.loads(request.body)) == {
+                "query": "folder:x",
+                "offset": 10,
+                "limit": 5,
+                "withDetails": False,
+            }
+
+    def yields_items_of_all_groups(api):
+        def groups(request, context):
+            if json.loads(request.body)["offset"]:
+                return {"groups": []}
+            return {
+                "groups": [
+                    {"name": "a", "items": [{"id": 1}, {"id": 2}]},
+                    {"name": "b", "items": [{"id": 3}]},
+                ]
+            }
+
+        with requests_mock.Mocker() as mocker:
+            mocker.post(f"{BASEURL}/api/v1/sec/item/search", json=groups)
+            search = ItemSearch(api, "", page_size=10)
+            expect([item["id"] for item in search]) == [1, 2, 3]
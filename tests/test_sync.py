@@ -0,0 +1,164 @@
+import pytest
+from expecter import expect
+import json
+import os
+import threading
+
+from pydocspell import (
+    APIWrapper,
+    CollectiveMirror,
+    DownloadResult,
+    DownloadStatus,
+    SyncStore,
+)
+
+BASEURL = "http://docspell.example.org"
+DAY = 24 * 3600 * 1000
+
+
+class FakeCollective:
+    def __init__(self):
+        self.items = {}
+        self.queries = []
+        self.downloads = []
+        self.fail = set()
+        self._lock = threading.Lock()
+
+    def add(self, itemid, created, attachments=("a",)):
+        self.items[itemid] = {
+            "id": itemid,
+            "name": itemid,
+            "created": created,
+            "attachments": [
+                {"id": f"{itemid}-{a}", "name": f"{a}.pdf"}
+                for a in attachments
+            ],
+        }
+
+    def iter_search_items(self, query, **kwargs):
+        self.queries.append(query)
+        if kwargs["offset"]:
+            return
+        for itemid in sorted(self.items):
+            item = self.items[itemid]
+            yield {
+                "id": itemid,
+                "name": item["name"],
+                "attachments": item["attachments"],
+                "highlighting": [query],
+            }
+
+    def get_item(self, itemid):
+        if itemid in self.fail:
+            raise RuntimeError(itemid)
+        return self.items[itemid]
+
+    def download_original(self, attachid, path):
+        with self._lock:
+            self.downloads.append(attachid)
+        with open(path, "w") as f:
+            f.write(attachid)
+        return DownloadResult(
+            path=str(path),
+            status=DownloadStatus.DOWNLOADED,
+            size=len(attachid),
+            etag=f'"{attachid}"',
+        )
+
+
+@pytest.fixture
+def collective(monkeypatch):
+    api = APIWrapper(BASEURL)
+    fake = FakeCollective()
+    for name in ("iter_search_items", "get_item", "download_original"):
+        monkeypatch.setattr(api, name, getattr(fake, name))
+    fake.api = api
+    return fake
+
+
+@pytest.mark.sync
+def describe_sync_store():
+    def stores_items_and_state():
+        with SyncStore() as store:
+            item = {"id": "i1", "created": 5, "attachments": [{"id": "a1"}]}
+            download = DownloadResult(
+                path="/x", status=DownloadStatus.DOWNLOADED, size=1, etag="e"
+            )
+            store.put_item(item, {"a1": download})
+            expect("i1" in store) is True
+            expect(len(store)) == 1
+            expect(store.get_item("i1")) == item
+            expect(store.fingerprint("i1")) is None
+            store.put_item(item, {"a1": download}, fingerprint="f")
+            expect(store.fingerprint("i1")) == "f"
+            expect(store.attachments("i1")[0]["etag"]) == "e"
+            expect(store.high_water) is None
+            store.set_state("high_water", 5)
+            expect(store.high_water) == 5
+
+
+@pytest.mark.sync
+def describe_collective_mirror():
+    def mirrors_items_and_attachments(collective, tmp_path):
+        collective.add("i1", 10 * DAY, ("a", "b"))
+        collective.add("i2", 11 * DAY)
+        mirror = CollectiveMirror(collective.api, tmp_path, workers=2)
+        results = list(mirror.sync())
+        expect(sorted(r.itemid for r in results)) == ["i1", "i2"]
+        expect(all(r.ok for r in results)) is True
+        expect(sorted(collective.downloads)) == ["i1-a", "i1-b", "i2-a"]
+        expect((tmp_path / "i1" / "i1-b" / "b.pdf").read_text()) == "i1-b"
+        item = json.loads((tmp_path / "i2" / "item.json").read_text())
+        expect(item["created"]) == 11 * DAY
+        expect(mirror.store.high_water) == 11 * DAY
+        expect(os.path.exists(tmp_path / CollectiveMirror.STORE_NAME)) is True
+
+    def fetches_new_and_changed_items(collective, tmp_path):
+        for itemid in ("i1", "i2", "i3"):
+            collective.add(itemid, 10 * DAY)
+        mirror = CollectiveMirror(collective.api, tmp_path)
+        list(mirror.sync())
+        collective.items["i1"]["name"] = "renamed"
+        collective.add("i2", 10 * DAY, ("a", "b"))
+        collective.add("i4", 12 * DAY)
+        results = list(mirror.sync(changes=True))
+        expect(collective.queries[-1]) == ""
+        changed = sorted(r.itemid for r in results if not r.skipped)
+        expect(changed) == ["i1", "i2", "i4"]
+        expect(mirror.store.get_item("i1")["name"]) == "renamed"
+        results = mirror.sync(changes=True)
+        expect(all(r.skipped for r in results)) is True
+
+    def fetches_only_new_items(collective, tmp_path):
+        collective.add("i1", 10 * DAY)
+        mirror = CollectiveMirror(collective.api, tmp_path)
+        list(mirror.sync())
+        collective.add("i2", 12 * DAY)
+        collective.items["i1"]["name"] = "renamed"
+        results = list(mirror.sync())
+        expect(collective.queries[-1]) == "created>=1970-01-10"
+        expect([r.itemid for r in results if not r.skipped]) == ["i2"]
+        expect(collective.downloads) == ["i1-a", "i2-a"]
+        expect(mirror.store.high_water) == 12 * DAY
+
+    def full_sync_fetches_everything(collective, tmp_path):
+        collective.add("i1", 10 * DAY)
+        mirror = CollectiveMirror(collective.api, tmp_path, query="tag:x")
+        list(mirror.sync())
+        list(mirror.sync(full=True))
+        expect(collective.queries[-1]) == "tag:x"
+        expect(collective.downloads) == ["i1-a", "i1-a"]
+
+    def keeps_the_mark_on_failures(collective, tmp_path):
+        collective.add("i1", 10 * DAY)
+        collective.add("i2", 11 * DAY)
+        collective.fail.add("i1")
+        mirror = CollectiveMirror(collective.api, tmp_path)
+        results = {r.itemid: r for r in mirror.sync()}
+        expect(results["i1"].ok) is False
+        expect(mirror.store.high_water) is None
+        collective.fail.clear()
+        results = {r.itemid: r for r in mirror.sync()}
+        expect(results["i1"].ok) is True
+        expect(results["i2"].skipped) is True
+        expect(mirror.store.high_water) == 11 * DAY
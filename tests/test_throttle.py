@@ -0,0 +1,86 @@
+import pytest
+from expecter import expect
+import threading
+
+from pydocspell import APIWrapper, QueueThrottle
+
+BASEURL = "http://docspell.example.org"
+
+
+class FakeQueue:
+    def __init__(self, *backlogs):
+        self._backlogs = list(backlogs)
+        self.samples = 0
+
+    def __call__(self):
+        self.samples += 1
+        if len(self._backlogs) > 1:
+            backlog = self._backlogs.pop(0)
+        else:
+            backlog = self._backlogs[0]
+        return {"progress": [{}] * 2, "queued": [{}] * (backlog - 2)}
+
+
+@pytest.fixture
+def api():
+    return APIWrapper(BASEURL)
+
+
+@pytest.mark.throttle
+def describe_queue_throttle():
+    def counts_running_and_waiting_jobs(monkeypatch, api):
+        monkeypatch.setattr(api, "get_job_queue", FakeQueue(12))
+        throttle = QueueThrottle(api)
+        expect(throttle.sample()) == 12
+
+    def pauses_at_high_and_resumes_at_low_water(monkeypatch, api):
+        monkeypatch.setattr(api, "get_job_queue", FakeQueue(10, 8, 5, 4))
+        throttle = QueueThrottle(api, high_water=10, low_water=4)
+        throttle.sample()
+        expect(throttle.paused) is True
+        throttle.sample()
+        throttle.sample()
+        expect(throttle.paused) is True
+        throttle.sample()
+        expect(throttle.paused) is False
+
+    def waits_until_the_queue_drained(monkeypatch, api):
+        queue = FakeQueue(20, 15, 3)
+        monkeypatch.setattr(api, "get_job_queue", queue)
+        throttle = QueueThrottle(api, high_water=10, interval=0)
+        throttle.wait()
+        expect(queue.samples) == 3
+        expect(throttle.paused) is False
+
+    def times_out(monkeypatch, api):
+        monkeypatch.setattr(api, "get_job_queue", FakeQueue(20))
+        throttle = QueueThrottle(api, high_water=10, interval=0.01)
+        with pytest.raises(TimeoutError):
+            throttle.wait(timeout=0.05)
+
+    def keeps_state_when_sampling_fails(monkeypatch, api):
+        def broken():
+            raise APIWrapper.NotAuthenticated("GET sec/queue/state")
+
+        monkeypatch.setattr(api, "get_job_queue", broken)
+        throttle = QueueThrottle(api)
+        expect(throttle.sample()) is None
+        expect(throttle.paused) is False
+
+    def holds_back_uploads(monkeypatch, api):
+        monkeypatch.setattr(api, "get_job_queue", FakeQueue(20))
+        sent = threading.Event()
+
+        def send(*args, **kwargs):
+            sent.set()
+            return {"success": True}
+
+        monkeypatch.setattr(api, "_request", send)
+        throttle = api.throttle_uploads(high_water=10, interval=0.01)
+        thread = threading.Thread(
+            target=api.upload_multiple, args=([],), daemon=True
+        )
+        thread.start()
+        expect(sent.wait(0.1)) is False
+        throttle.stop()
+        expect(sent.wait(1)) is True
@@ -1,4 +1,10 @@
+import pytest
 from expecter import expect
+from concurrent import futures
+import hashlib
+from io import BytesIO
+import threading
+import time
 
 from pydocspell import util
 
@@ -6,3 +12,231 @@ from pydocspell import util
 def describe_unique_ids():
     def with_defaults():
         expect(len(util.make_unique_id())) == 47
+
+
+def describe_hashing():
+    @pytest.fixture
+    def files(tmp_path):
+        ret = {}
+        for i, size in enumerate((0, 10, 2048, 100_000)):
+            path = tmp_path / f"file{i}"
+            data = bytes(range(256)) * (size // 256) + b"x" * (size % 256)
+            path.write_bytes(data)
+            ret[path] = hashlib.sha256(data).hexdigest()
+        return ret
+
+    def single_path(files):
+        for path, digest in files.items():
+            expect(util.sha256_path(path)) == digest
+
+    def in_order_with_a_pool(files):
+        with util.HashingService(processes=2, threshold=1024) as hasher:
+            result = list(hasher.hash_paths(files, ordered=True))
+        expect(result) == list(files.items())
+
+    def as_completed_with_a_pool(files):
+        with util.HashingService(processes=2, threshold=1024) as hasher:
+            result = dict(hasher.hash_paths(iter(files)))
+        expect(result) == files
+
+    def small_files_skip_the_pool(files):
+        hasher = util.HashingService(processes=2)
+        expect(dict(hasher.hash_paths(files))) == files
+        expect(hasher._pool) is None
+
+    def skips_paths_it_cannot_hash(files, tmp_path):
+        missing = tmp_path / "missing"
+        paths = [missing, *files, tmp_path]
+        errors = []
+        with util.HashingService(processes=2, threshold=1024) as hasher:
+            result = list(
+                hasher.hash_paths(paths, ordered=True, errors=errors)
+            )
+            expect(result) == list(files.items())
+            expect([path for path, _ in errors]) == [missing, tmp_path]
+            expect(dict(hasher.hash_paths(paths))) == files
+
+    def creates_a_single_pool(monkeypatch):
+        created = []
+        barrier = threading.Barrier(8)
+
+        class Pool:
+            def __init__(self, processes):
+                created.append(self)
+                time.sleep(0.01)
+
+        def get_pool():
+            barrier.wait()
+            return hasher._get_pool()
+
+        monkeypatch.setattr(util.hashing.futures, "ProcessPoolExecutor", Pool)
+        hasher = util.HashingService(processes=2)
+        with futures.ThreadPoolExecutor(8) as executor:
+            pools = set(executor.map(lambda _: get_pool(), range(8)))
+        expect(len(created)) == 1
+        expect(pools) == set(created)
+
+
+def sized_files(*sizes):
+    return [(BytesIO(b"x" * size), f"{i}") for i, size in enumerate(sizes)]
+
+
+def batch_names(batches):
+    return [[name for _, name in batch] for batch in batches]
+
+
+def describe_batching():
+    def by_file_count():
+        files = sized_files(1, 1, 1, 1, 1)
+        batches = util.batched_by_size(files, max_files=2)
+        expect(batch_names(batches)) == [["0", "1"], ["2", "3"], ["4"]]
+
+    def by_total_bytes():
+        files = sized_files(4, 4, 4, 9, 1)
+        batches = util.batched_by_size(files, max_bytes=8)
+        expect(batch_names(batches)) == [["0", "1"], ["2"], ["3"], ["4"]]
+
+    def by_both():
+        files = sized_files(1, 1, 1, 6, 1)
+        batches = util.batched_by_size(files, max_bytes=8, max_files=2)
+        expect(batch_names(batches)) == [["0", "1"], ["2", "3"], ["4"]]
+
+    def without_limits():
+        files = sized_files(1, 2, 3)
+        expect(len(list(util.batched_by_size(files)))) == 1
+
+    def of_paths(tmp_path):
+        files = []
+        for i, size in enumerate((4, 4, 4)):
+            path = tmp_path / f"{i}"
+            path.write_bytes(b"x" * size)
+            files.append((path, f"{i}"))
+        batches = util.batched_by_size(files, max_bytes=8)
+        expect(batch_names(batches)) == [["0", "1"], ["2"]]
+
+
+def describe_lazy_files():
+    @pytest.fixture
+    def path(tmp_path):
+        path = tmp_path / "lazy"
+        path.write_bytes(b"0123456789")
+        return path
+
+    def opens_on_first_read_and_closes_at_eof(path):
+        f = util.LazyFile(path)
+        expect(f.name) == "lazy"
+        expect(f.len) == 10
+        expect(f.closed) is True
+        expect(f.read(4)) == b"0123"
+        expect(f.closed) is False
+        expect(f.len) == 6
+        expect(f.read()) == b"456789"
+        expect(f.closed) is True
+
+    def rewinds(path):
+        f = util.LazyFile(path)
+        f.read()
+        f.seek(0)
+        expect(f.read()) == b"0123456789"
+
+    def from_an_opener(path):
+        f = util.LazyFile(lambda: open(path, "rb"), "opened")
+        expect(f.size) == 10
+        expect(f.read()) == b"0123456789"
+
+    def within_a_budget(path):
+        budget = util.FileDescriptorBudget(1)
+        first = util.LazyFile(path, budget=budget)
+        second = util.LazyFile(path, budget=budget)
+        first.read(1)
+        with pytest.raises(TimeoutError):
+            budget.acquire(timeout=0)
+        first.close()
+        expect(second.read()) == b"0123456789"
+        budget.acquire(timeout=0)
+
+
+def describe_replayable_multipart():
+    def rewinds_file_fields(tmp_path):
+        path = tmp_path / "field"
+        path.write_bytes(b"0123456789")
+        with open(path, "rb") as f:
+            f.read(2)
+            enc = util.ReplayableMultipartEncoder([("file", ("f", f))])
+            first = enc.read()
+            expect(enc.tell()) == len(first)
+            enc.seek(0)
+            expect(enc.read()) == first
+        expect(first).contains(b"23456789")
+        expect(first).does_not_contain(b"0123")
+
+    def reports_progress(tmp_path):
+        seen = []
+        enc = util.ReplayableMultipartEncoder(
+            [("meta", "{}")], callback=lambda m: seen.append(m.bytes_read)
+        )
+        enc.read()
+        expect(seen[-1]) == enc.len
+
+    def refuses_partial_seeks():
+        enc = util.ReplayableMultipartEncoder([("meta", "{}")])
+        enc.read(3)
+        with pytest.raises(OSError):
+            enc.seek(1)
+
+
+def describe_tracing():
+    def redacts_secrets():
+        payload = {"account": "c/u", "password": "hunter2"}
+        text = str(util.short_repr(payload))
+        expect(text).contains("c/u")
+        expect(text).does_not_contain("hunter2")
+
+    def truncates_large_payloads():
+        text = str(util.short_repr({"items": ["x" * 10_000] * 1000}))
+        expect(len(text) < 1000) is True
+
+    def is_lazy():
+        class Exploding:
+            def __repr__(self):
+                raise AssertionError("repr was built")
+
+        util.short_repr(Exploding())
+
+
+def describe_json_records():
+    DOC = (
+        b'{"groups": [{"name": "a", "items": [{"id": 1}, {"id": 2}]},'
+        b' {"name": "b", "items": [{"id": 3, "tags": [{"id": 4}]}]}],'
+        b' "count": 3}'
+    )
+
+    @pytest.fixture(params=[True, False], ids=["incremental", "parsed"])
+    def incremental(request):
+        return request.param
+
+    def selects_records(incremental):
+        records = util.iter_records(
+            BytesIO(DOC), "groups.item.items.item", incremental=incremental
+        )
+        expect([r["id"] for _, r in records]) == [1, 2, 3]
+
+    def with_several_prefixes(incremental):
+        records = util.iter_records(
+            BytesIO(DOC), "groups.item.name", "count", incremental=incremental
+        )
+        expect(sorted(records)) == [
+            ("count", 3),
+            ("groups.item.name", "a"),
+            ("groups.item.name", "b"),
+        ]
+
+    def whole_document_without_prefix(incremental):
+        ((prefix, doc),) = util.iter_records(
+            BytesIO(DOC), incremental=incremental
+        )
+        expect(doc["count"]) == 3
+
+    def rejects_invalid_json(incremental):
+        with pytest.raises(ValueError):
+            list(util.iter_records(BytesIO(b""), incremental=incremental))
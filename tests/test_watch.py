@@ -0,0 +1,235 @@
+import pytest
+from expecter import expect
+import threading
+import time
+
+from pydocspell import APIWrapper, UploadMetadata, WatchIngest
+from pydocspell import watch as watchmod
+
+BASEURL = "http://docspell.example.org"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingUpload:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def __call__(self, endpoint, file_and_name_tuples, **kwargs):
+        self.metadata = kwargs.get("metadata")
+        if self.fail:
+            raise RuntimeError(endpoint)
+        self.batches.append(
+            (endpoint, sorted(name for _, name in file_and_name_tuples))
+        )
+        return {"success": True, "message": "Files submitted."}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = APIWrapper(BASEURL)
+    api.uploads = RecordingUpload()
+    monkeypatch.setattr(api, "_upload_multiple", api.uploads)
+    return api
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def inbox(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    return inbox
+
+
+def arrive(watch, inbox, name, content=b"content"):
+    path = inbox / name
+    path.write_bytes(content)
+    watch.notice(path)
+    return path
+
+
+@pytest.mark.watch
+def describe_watch_ingest():
+    def waits_for_the_quiet_period(api, clock, inbox):
+        watch = WatchIngest(
+            api, [inbox], delete=True, quiet=2, max_wait=0, clock=clock
+        )
+        arrive(watch, inbox, "a.pdf")
+        clock.now += 1
+        expect(watch.process()) == []
+        clock.now += 1
+        results = watch.process()
+        expect(len(results)) == 1
+        expect(api.uploads.batches) == [("sec/upload/item", ["a.pdf"])]
+
+    def restarts_the_quiet_period_on_writes(api, clock, inbox):
+        watch = WatchIngest(
+            api, [inbox], delete=True, quiet=2, max_wait=0, clock=clock
+        )
+        path = arrive(watch, inbox, "a.pdf")
+        clock.now += 1.5
+        watch.touch(path)
+        clock.now += 1.5
+        expect(watch.process()) == []
+        clock.now += 0.5
+        expect(len(watch.process())) == 1
+
+    def batches_settled_files(api, clock, inbox):
+        watch = WatchIngest(
+            api,
+            [inbox],
+            delete=True,
+            quiet=0,
+            max_wait=5,
+            max_batch_files=2,
+            clock=clock,
+        )
+        for name in "abc":
+            arrive(watch, inbox, f"{name}.pdf")
+        results = watch.process()
+        expect([r.paths for r in results]) == [
+            [str(inbox / "a.pdf"), str(inbox / "b.pdf")]
+        ]
+        expect(watch.pending) == 1
+        clock.now += 5
+        watch.process()
+        expect(api.uploads.batches[-1]) == ("sec/upload/item", ["c.pdf"])
+        expect(watch.pending) == 0
+
+    def uploads_via_source(api, clock, inbox):
+        watch = WatchIngest(
+            api,
+            [inbox],
+            source="src",
+            delete=True,
+            quiet=0,
+            max_wait=0,
+            clock=clock,
+        )
+        arrive(watch, inbox, "a.pdf")
+        watch.process()
+        expect(api.uploads.batches) == [("open/upload/item/src", ["a.pdf"])]
+
+    def uploads_each_file_as_an_item(api, clock, inbox):
+        watch = WatchIngest(
+            api,
+            [inbox],
+            metadata=UploadMetadata(folder="f1"),
+            delete=True,
+            quiet=0,
+            max_wait=0,
+            clock=clock,
+        )
+        arrive(watch, inbox, "a.pdf")
+        arrive(watch, inbox, "b.pdf")
+        watch.process()
+        expect(api.uploads.metadata.multiple) is True
+        expect(api.uploads.metadata.folder) == "f1"
+
+    def ignores_temporary_files(api, clock, inbox):
+        watch = WatchIngest(api, [inbox], delete=True, quiet=0, clock=clock)
+        arrive(watch, inbox, ".a.pdf")
+        arrive(watch, inbox, "b.pdf.part")
+        expect(watch.pending) == 0
+
+    def moves_uploaded_files(api, clock, inbox, tmp_path):
+        done = tmp_path / "done"
+        watch = WatchIngest(
+            api, [inbox], done_dir=done, quiet=0, max_wait=0, clock=clock
+        )
+        (inbox / "sub").mkdir()
+        path = arrive(watch, inbox, "sub/a.pdf")
+        (done / "sub").mkdir(parents=True)
+        (done / "sub" / "a.pdf").write_bytes(b"older")
+        watch.process()
+        expect(path.exists()) is False
+        expect((done / "sub" / "a.1.pdf").read_bytes()) == b"content"
+
+    def deletes_uploaded_files(api, clock, inbox):
+        watch = WatchIngest(
+            api, [inbox], delete=True, quiet=0, max_wait=0, clock=clock
+        )
+        path = arrive(watch, inbox, "a.pdf")
+        watch.process()
+        expect(path.exists()) is False
+
+    def keeps_and_retries_failed_files(api, clock, inbox):
+        watch = WatchIngest(
+            api,
+            [inbox],
+            delete=True,
+            quiet=0,
+            max_wait=0,
+            retry_delay=30,
+            clock=clock,
+        )
+        path = arrive(watch, inbox, "a.pdf")
+        api.uploads.fail = True
+        (result,) = watch.process()
+        expect(result.ok) is False
+        expect(path.exists()) is True
+        api.uploads.fail = False
+        clock.now += 10
+        expect(watch.process()) == []
+        clock.now += 20
+        expect(len(watch.process())) == 1
+        expect(path.exists()) is False
+
+    def skips_files_gone_meanwhile(api, clock, inbox):
+        watch = WatchIngest(
+            api, [inbox], delete=True, quiet=0, max_wait=0, clock=clock
+        )
+        arrive(watch, inbox, "a.pdf").unlink()
+        expect(watch.process()) == []
+
+    def scans_for_existing_files(api, clock, inbox, tmp_path):
+        done = inbox / "done"
+        done.mkdir()
+        (done / "old.pdf").write_bytes(b"old")
+        (inbox / "a.pdf").write_bytes(b"a")
+        watch = WatchIngest(api, [inbox], done_dir=done, clock=clock)
+        watch.scan()
+        expect(watch.pending) == 1
+
+    def refuses_to_move_and_delete(api, inbox, tmp_path):
+        with expect.raises(ValueError):
+            WatchIngest(api, [inbox], done_dir=tmp_path, delete=True)
+
+    def refuses_to_leave_files_in_place(api, inbox):
+        with expect.raises(ValueError):
+            WatchIngest(api, [inbox])
+
+
+@pytest.mark.watch
+@pytest.mark.skipif(watchmod.pyinotify is None, reason="needs pyinotify")
+def describe_watch_ingest_run():
+    def uploads_files_written_to_the_directory(api, inbox, tmp_path):
+        done = tmp_path / "done"
+        watch = WatchIngest(api, [inbox], done_dir=done, quiet=0.1, max_wait=0)
+        thread = threading.Thread(target=watch.run)
+        thread.start()
+        try:
+            time.sleep(0.2)
+            (inbox / "a.pdf").write_bytes(b"a")
+            (tmp_path / "b.pdf").write_bytes(b"b")
+            (tmp_path / "b.pdf").rename(inbox / "b.pdf")
+            deadline = time.monotonic() + 5
+            while len(list(done.glob("*.pdf"))) < 2:
+                expect(time.monotonic()) < deadline
+                time.sleep(0.05)
+        finally:
+            watch.stop()
+            thread.join()
+        names = sorted(n for _, batch in api.uploads.batches for n in batch)
+        expect(names) == ["a.pdf", "b.pdf"]